@@ -0,0 +1,300 @@
+"""
+Request parsing and response building shared by the Flask server
+(currency_api) and the ASGI server (currency_api_async).
+
+Nothing here imports a web framework. Helpers take the converter and the
+already-read request parts, return plain payloads or (status, body,
+headers) triples, and raise ApiError for a client error; each server
+only adds its own glue: reading the request, awaiting or calling the
+converter, and wrapping the result in its Response type.
+"""
+import time
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+from currency_converter import CurrencyConverter
+from hedged_provider import backup_urls_from_env
+from history_archive import retention_from_env
+from http_cache import CachedRate, ResponseCache, make_cached_rate, not_modified, static_response
+from metrics import server_timing
+from quote import Quote
+from rate_events import RateStream, parse_pairs
+from rate_tables import BINARY_MIMETYPE, JSON_MIMETYPE, RateTableCache, TableVersion, negotiate
+
+# Seconds between keep-alive comments on idle rate streams
+STREAM_HEARTBEAT = 15.0
+STREAM_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+ENDPOINTS = {
+    "/convert": "POST - Convert currencies",
+    "/convert/batch": "POST - Convert many amounts in one request",
+    "/currencies": "GET - List supported currencies",
+    "/history": "GET - Get conversion history (?limit, cursor, from_currency, to_currency, since, until)",
+    "/stats/volume": "GET - Conversion volume per pair per hour or day",
+    "/stats/top-pairs": "GET - Most converted currency pairs",
+    "/metrics": "GET - Prometheus metrics",
+    "/metrics/spans": "GET - Recent request spans, POST - Switch span tracing",
+    "/rate/<from_curr>/<to_curr>": "GET - Get exchange rate",
+    "/rates/<base>": "GET - Whole rate table for a base (JSON, or binary with Accept: application/x-currency-rates; ?since=<version> for a delta)",
+    "/rates/stream": "GET - Server-Sent Events as rates change (?pairs=USD_EUR,GBP_JPY to follow only those pairs)",
+    "/swap": "POST - Convert in the opposite direction"
+}
+
+Reply = Tuple[int, bytes, Dict[str, str]]
+
+
+class ApiError(Exception):
+    """A client error, answered as {"error": message} with status."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+    def payload(self) -> dict:
+        return {"error": self.message}
+
+
+def converter_from_env(environ: Mapping[str, str]) -> CurrencyConverter:
+    """The converter a server runs with, configured from the environment."""
+    return CurrencyConverter(
+        api_key=environ.get('API KEY HANO-for security reasons wont post them here'),
+        write_behind=environ.get('CURRENCY_WRITE_BEHIND', '0') == '1',
+        # With a shared snapshot, one publisher process keeps rates fresh for every worker
+        background_refresh=not environ.get('CURRENCY_RATE_SNAPSHOT'),
+        trace_spans=environ.get('CURRENCY_TRACE_SPANS', '0') == '1',
+        rate_snapshot=environ.get('CURRENCY_RATE_SNAPSHOT') or None,
+        history_retention=retention_from_env(environ),
+        backup_urls=backup_urls_from_env(environ)
+    )
+
+
+def rate_cache_from_env(converter: CurrencyConverter, environ: Mapping[str, str]) -> ResponseCache:
+    """Recently served rates, answered without the converter while fresh."""
+    cache = ResponseCache(int(environ.get('CURRENCY_RATE_CACHE_SIZE', '1024')))
+    converter.metrics.add_collector(cache.collect_metrics)
+    return cache
+
+
+def index_response(message: str, routes: Sequence[str]):
+    """The static / response, listing the routes a server has."""
+    return static_response({
+        "message": message,
+        "endpoints": {route: ENDPOINTS[route] for route in routes}
+    })
+
+
+def currencies_response(converter: CurrencyConverter):
+    """The static /currencies response."""
+    currencies = converter.get_supported_currencies()
+    return static_response({"currencies": currencies, "count": len(currencies)})
+
+
+def static_reply(body_and_headers, request_headers) -> Reply:
+    """A precomputed response, or 304 if the client already has it."""
+    body, headers = body_and_headers
+    if not_modified(request_headers, headers["ETag"]):
+        return 304, b"", {k: v for k, v in headers.items() if k != "Content-Type"}
+    return 200, body, headers
+
+
+def observe_request(converter: CurrencyConverter, request, start: float, trace) -> Optional[str]:
+    """Record a request's latency per route; returns the Server-Timing header when traced."""
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    converter.metrics.histogram(
+        "currency_http_request_seconds", "API request latency in seconds",
+        route=route, method=request.method
+    ).observe(time.perf_counter() - start)
+
+    spans = converter.metrics.end_trace(trace, f"{request.method} {request.path}")
+    return server_timing(spans) if spans else None
+
+
+def check_currencies(converter: CurrencyConverter, *codes):
+    """Raise ApiError if any currency code is unsupported."""
+    unsupported = converter.unsupported_currencies(*codes)
+    if unsupported:
+        raise ApiError(f"Unsupported currency code: {', '.join(map(str, unsupported))}")
+
+
+def parse_conversion(converter: CurrencyConverter, data) -> Tuple[float, str, str]:
+    """Validate a /convert or /swap body; returns (amount, from_currency, to_currency)."""
+    if not data:
+        raise ApiError("No data provided")
+
+    amount = data.get('amount')
+    from_currency = data.get('from_currency')
+    to_currency = data.get('to_currency')
+
+    if not all([amount, from_currency, to_currency]):
+        raise ApiError("Missing required parameters")
+
+    check_currencies(converter, from_currency, to_currency)
+
+    try:
+        return float(amount), from_currency, to_currency
+    except (TypeError, ValueError):
+        raise ApiError("Invalid amount")
+
+
+def convert_payload(quote: Optional[Quote]) -> dict:
+    """The /convert response for a quote."""
+    if quote is None:
+        raise ApiError("Conversion failed")
+    return quote.payload()
+
+
+def swap_payload(swapped: Optional[Quote]) -> dict:
+    """
+    The /swap response. One lookup answers both directions: swapped is
+    the quote for the reversed pair and the original is it inverted.
+    """
+    if swapped is None:
+        raise ApiError("Conversion failed")
+    return {
+        "original": swapped.swapped().payload(),
+        "swapped": swapped.payload()
+    }
+
+
+def _pair_args(converter: CurrencyConverter, args) -> List[Optional[str]]:
+    """The optional from_currency/to_currency filter of a query."""
+    pair = [args.get('from_currency'), args.get('to_currency')]
+    check_currencies(converter, *[code for code in pair if code])
+    return pair
+
+
+def history_query(converter: CurrencyConverter, args) -> tuple:
+    """Positional arguments for converter.query_history from /history's query string."""
+    return (
+        args.get('limit', default=10, type=int),
+        args.get('cursor'),
+        *_pair_args(converter, args),
+        args.get('since'),
+        args.get('until')
+    )
+
+
+def history_payload(history, next_cursor: Optional[str]) -> dict:
+    history_list = [
+        {
+            "amount": amount,
+            "from_currency": from_curr,
+            "to_currency": to_curr,
+            "result": result,
+            "date": date
+        }
+        for amount, from_curr, to_curr, result, date in history
+    ]
+    return {
+        "history": history_list,
+        "count": len(history_list),
+        "next_cursor": next_cursor
+    }
+
+
+def volume_query(converter: CurrencyConverter, args) -> tuple:
+    """Positional arguments for converter.get_volume_stats from /stats/volume's query string."""
+    return (
+        args.get('granularity', 'day'),
+        *_pair_args(converter, args),
+        args.get('since'),
+        args.get('until'),
+        args.get('limit', default=100, type=int)
+    )
+
+
+def volume_payload(granularity: str, buckets) -> dict:
+    return {
+        "granularity": granularity,
+        "buckets": [
+            {
+                "bucket": bucket,
+                "from_currency": from_curr,
+                "to_currency": to_curr,
+                "conversions": conversions,
+                "total_amount": total_amount,
+                "total_result": total_result
+            }
+            for bucket, from_curr, to_curr, conversions, total_amount, total_result in buckets
+        ]
+    }
+
+
+def top_pairs_query(args) -> tuple:
+    """Positional arguments for converter.get_top_pairs from /stats/top-pairs' query string."""
+    return (
+        args.get('limit', default=10, type=int),
+        args.get('since'),
+        args.get('until')
+    )
+
+
+def top_pairs_payload(pairs) -> dict:
+    return {
+        "pairs": [
+            {
+                "from_currency": from_curr,
+                "to_currency": to_curr,
+                "conversions": conversions,
+                "total_amount": total_amount,
+                "total_result": total_result
+            }
+            for from_curr, to_curr, conversions, total_amount, total_result in pairs
+        ]
+    }
+
+
+def trace_spans_payload(converter: CurrencyConverter, data=None) -> dict:
+    """/metrics/spans: switch tracing if data (a POST body) is given, then show recent spans."""
+    if data is not None:
+        if not isinstance(data.get('enabled'), bool):
+            raise ApiError("Expected {\"enabled\": true|false}")
+        converter.metrics.spans_enabled = data['enabled']
+
+    return {
+        "enabled": converter.metrics.spans_enabled,
+        "traces": list(converter.metrics.traces)
+    }
+
+
+def cache_rate(converter: CurrencyConverter, rate_cache: ResponseCache, from_currency: str,
+               to_currency: str, resolved, version: int) -> CachedRate:
+    """Store a /rate lookup (rate, age, path) resolved against version."""
+    if resolved is None:
+        raise ApiError("Rate not available", 404)
+
+    rate, rate_age, path = resolved
+    return rate_cache.put((from_currency, to_currency), make_cached_rate(
+        from_currency, to_currency, rate, rate_age, path, converter.rate_ttl, version
+    ))
+
+
+def table_mimetype(accept) -> str:
+    """The /rates/<base> encoding for an Accept header."""
+    mimetype = negotiate(accept)
+    if mimetype is None:
+        raise ApiError(f"Supported formats: {JSON_MIMETYPE}, {BINARY_MIMETYPE}", 406)
+    return mimetype
+
+
+def cache_table(converter: CurrencyConverter, rate_tables: RateTableCache, base_currency: str,
+                resolved, version: int) -> TableVersion:
+    """Store a /rates/<base> lookup (rates, updated) resolved against version."""
+    if resolved is None:
+        raise ApiError("Rates not available", 404)
+
+    rates, updated = resolved
+    return rate_tables.put(base_currency, rates, updated, converter.rate_ttl, version)
+
+
+def open_stream(converter: CurrencyConverter, args, request_headers) -> RateStream:
+    """Validate a /rates/stream request; the stream subscribes once its body is read."""
+    try:
+        pairs = parse_pairs(args.get('pairs'))
+    except ValueError as e:
+        raise ApiError(str(e))
+
+    if pairs:
+        check_currencies(converter, *sorted({code for pair in pairs for code in pair}))
+
+    return RateStream(converter, pairs, request_headers.get('Last-Event-ID'))
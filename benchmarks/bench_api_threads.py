@@ -0,0 +1,90 @@
+"""
+Measure how Flask API throughput scales with the number of client threads.
+
+Starts currency_api on a threaded WSGI server backed by a temporary,
+pre-populated database (no network access), then drives /rate and
+/convert from 1, 2, 4 and 8 client threads.
+
+Usage: python benchmarks/bench_api_threads.py [--requests 400] [--threads 1 2 4 8]
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.serving import make_server
+
+import currency_api
+from currency_converter import CurrencyConverter
+
+RATES = {"USD": 1.0, "EUR": 0.92, "GBP": 0.79, "JPY": 151.2, "CHF": 0.88}
+
+
+def worker(port: int, count: int, errors: list):
+    """Issue count requests over one keep-alive connection."""
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    body = json.dumps({"amount": 10, "from_currency": "EUR", "to_currency": "JPY"})
+    for i in range(count):
+        if i % 2:
+            conn.request("POST", "/convert", body, {"Content-Type": "application/json"})
+        else:
+            conn.request("GET", "/rate/GBP/CHF")
+        response = conn.getresponse()
+        response.read()
+        if response.status != 200:
+            errors.append(response.status)
+    conn.close()
+
+
+def run(port: int, threads: int, total: int) -> tuple:
+    """Return (requests per second, error count) for one thread count."""
+    errors = []
+    per_thread = total // threads
+    workers = [
+        threading.Thread(target=worker, args=(port, per_thread, errors))
+        for _ in range(threads)
+    ]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return per_thread * threads / elapsed, len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API thread scaling benchmark")
+    parser.add_argument("--requests", type=int, default=400, help="Requests per run")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        converter = CurrencyConverter(db_path=os.path.join(tmp, "bench.db"))
+        converter.cache_rates("USD", RATES)
+        currency_api.converter = converter
+
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        server = make_server("127.0.0.1", 0, currency_api.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        print(f"{args.requests} requests per run against /rate and /convert")
+        print("-" * 50)
+        try:
+            for threads in args.threads:
+                rps, errors = run(server.server_port, threads, args.requests)
+                print(f"{threads:2d} threads: {rps:9.1f} req/s, {errors} errors")
+        finally:
+            server.shutdown()
+            converter.close()
+
+
+if __name__ == "__main__":
+    main()
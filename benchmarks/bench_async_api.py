@@ -0,0 +1,156 @@
+"""
+Load test: sync Flask API vs async ASGI API under a slow rate provider.
+
+Both servers run against the local stub provider with injected latency
+and with rate_ttl=0, so every request has to revalidate its base table
+upstream. The Flask app is served by a fixed pool of worker threads, as
+it would be under a threaded WSGI server; the ASGI app runs on hypercorn.
+Reports requests per second and p50/p99 latency for each.
+
+Usage: python benchmarks/bench_async_api.py [--latency 0.2] [--concurrency 64] [--requests 1000]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from hypercorn.asyncio import serve
+from hypercorn.config import Config
+from werkzeug.serving import BaseWSGIServer
+
+from stub_provider import USD_RATES, StubProvider
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """WSGI server that handles requests on a fixed number of threads."""
+
+    def __init__(self, host, port, app, workers):
+        super().__init__(host, port, app)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def load(url: str, concurrency: int, total: int):
+    """Drive GET /rate requests over rotating bases; returns (rps, latencies, errors)."""
+    bases = list(USD_RATES)
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                path = f"/rate/{bases[i % len(bases)]}/USD"
+                start = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+
+    return total / elapsed, sorted(latencies), errors
+
+
+def report(label: str, rps: float, latencies, errors: int):
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000
+    print(f"{label:6s} {rps:9.1f} req/s   p50 {p50:8.1f} ms   p99 {p99:8.1f} ms   {errors} errors")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync vs async API load test")
+    parser.add_argument("--latency", type=float, default=0.2, help="Provider latency in seconds")
+    parser.add_argument("--concurrency", type=int, default=64, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per server")
+    parser.add_argument("--workers", type=int, default=8, help="Flask worker threads")
+    args = parser.parse_args()
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    tmp = tempfile.mkdtemp()
+    # The API modules create their converter at import time; keep its
+    # database out of the working tree
+    os.chdir(tmp)
+
+    import currency_api
+    import currency_api_async
+    from currency_converter import CurrencyConverter
+    from rate_provider import AsyncRateProviderClient
+
+    with StubProvider(latency=args.latency) as stub:
+        print(f"Provider latency {args.latency * 1000:.0f} ms, {args.concurrency} clients, "
+              f"{args.requests} requests per server")
+        print("-" * 70)
+
+        # Sync Flask app on a fixed thread pool
+        currency_api.converter = CurrencyConverter(
+            db_path=os.path.join(tmp, "sync.db"), base_url=stub.base_url,
+            rate_ttl=0, max_staleness=0
+        )
+        port = free_port()
+        server = PooledWSGIServer("127.0.0.1", port, currency_api.app, args.workers)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        report("flask", *asyncio.run(load(f"http://127.0.0.1:{port}", args.concurrency, args.requests)))
+        server.shutdown()
+        currency_api.converter.close()
+
+        # Async app on hypercorn
+        currency_api_async.converter = CurrencyConverter(
+            db_path=os.path.join(tmp, "async.db"), base_url=stub.base_url,
+            rate_ttl=0, max_staleness=0
+        )
+        currency_api_async.provider = AsyncRateProviderClient(stub.base_url, pool_size=args.concurrency)
+        port = free_port()
+        config = Config()
+        config.bind = [f"127.0.0.1:{port}"]
+        config.accesslog = None
+        config.loglevel = "WARNING"
+        loop = asyncio.new_event_loop()
+        stopped = asyncio.Event()
+
+        def run_server():
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(serve(currency_api_async.app, config, shutdown_trigger=stopped.wait))
+
+        thread = threading.Thread(target=run_server, daemon=True)
+        thread.start()
+        time.sleep(0.5)
+        report("async", *asyncio.run(load(f"http://127.0.0.1:{port}", args.concurrency, args.requests)))
+        loop.call_soon_threadsafe(stopped.set)
+        thread.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Tail latency of upstream fetches: one provider vs a hedged pair.
+
+Two local stub providers stand in for the primary and backup sources.
+The primary is fast but answers --tail-rate of its requests
+--tail-latency late; the backup is a little slower and steady. Cases:
+
+single:       the primary alone
+hedged:       primary plus backup, hedging after the primary's adaptive delay
+primary down: the primary answers every request with 503, so its circuit
+              opens and fetches go straight to the backup
+
+Usage: python benchmarks/bench_hedged_fetch.py [--fetches 500] [--tail-rate 0.03]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hedged_provider import HedgedProvider, source_clients
+from rate_provider import RateProviderClient
+from stub_provider import StubProvider
+
+
+def percentile_ms(samples, q):
+    samples = sorted(samples)
+    return samples[min(int(q * len(samples)), len(samples) - 1)] * 1000
+
+
+def run_case(name, urls, fetches, stubs):
+    provider = HedgedProvider(source_clients(RateProviderClient, urls[0], backup_urls=urls[1:]))
+    before = [stub.requests for stub in stubs]
+    samples = []
+    for _ in range(fetches):
+        start = time.perf_counter()
+        provider.fetch("USD")
+        samples.append(time.perf_counter() - start)
+    sent = [stub.requests - count for stub, count in zip(stubs, before)]
+    provider.close()
+    print(f"{name:13s} {percentile_ms(samples, 0.5):8.1f} {percentile_ms(samples, 0.95):8.1f} "
+          f"{percentile_ms(samples, 0.99):8.1f} {max(samples) * 1000:8.1f} "
+          f"{provider.hedged:7d} {sent[0]:8d} {sent[1]:7d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hedged fetch benchmark")
+    parser.add_argument("--fetches", type=int, default=500, help="Fetches per case")
+    parser.add_argument("--latency", type=float, default=0.005, help="Primary latency in seconds")
+    parser.add_argument("--backup-latency", type=float, default=0.015, help="Backup latency in seconds")
+    parser.add_argument("--tail-rate", type=float, default=0.03, help="Fraction of slow primary responses")
+    parser.add_argument("--tail-latency", type=float, default=0.5, help="Extra seconds for a slow response")
+    args = parser.parse_args()
+
+    primary = StubProvider(latency=args.latency, jitter=args.latency,
+                           tail_rate=args.tail_rate, tail_latency=args.tail_latency)
+    backup = StubProvider(latency=args.backup_latency, jitter=args.latency)
+    with primary, backup:
+        stubs = (primary, backup)
+        print(f"{args.fetches} USD fetches, primary {args.latency * 1000:.0f} ms "
+              f"({args.tail_rate:.0%} +{args.tail_latency * 1000:.0f} ms), "
+              f"backup {args.backup_latency * 1000:.0f} ms")
+        print(f"{'case':13s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'max ms':>8s} "
+              f"{'hedges':>7s} {'primary':>8s} {'backup':>7s}")
+        run_case("single", [primary.base_url], args.fetches, stubs)
+        run_case("hedged", [primary.base_url, backup.base_url], args.fetches, stubs)
+        primary.failure_rate = 1.0
+        run_case("primary down", [primary.base_url, backup.base_url], args.fetches, stubs)
+
+
+if __name__ == "__main__":
+    main()
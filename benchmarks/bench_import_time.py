@@ -0,0 +1,98 @@
+"""
+Cold-start gate for the headless entry points.
+
+Imports each module in a fresh interpreter under `python -X importtime`,
+reports the cumulative import time (best of several runs) and fails if
+it exceeds the budget or if a module that should load lazily (tkinter,
+requests, numpy, ...) was pulled in at import time.
+
+Usage: python benchmarks/bench_import_time.py [--runs 5] [--budget-ms MS]
+Exits 1 on a regression, so it can run as a CI step.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# module -> packages that must not be imported when it is loaded
+GATES = {
+    "currency_converter": ("tkinter", "requests", "numpy", "asyncio", "httpx"),
+    "currency_cli": ("tkinter", "requests", "numpy", "asyncio", "httpx"),
+    "currency_api": ("tkinter", "numpy", "asyncio", "httpx"),
+}
+
+# module -> cumulative import budget in ms; the API's includes Flask and
+# opening the database
+BUDGETS_MS = {
+    "currency_converter": 100.0,
+    "currency_cli": 100.0,
+    "currency_api": 400.0,
+}
+
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)$")
+
+
+def measure(module: str):
+    """Import module once in a fresh interpreter; returns (total_us, loaded modules)."""
+    # The API modules create their converter (and its database) at import
+    # time, so keep the working directory out of the source tree
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    with tempfile.TemporaryDirectory() as tmp:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=tmp, env=env, capture_output=True, text=True
+        )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+
+    total = None
+    loaded = set()
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if not match:
+            continue
+        name = match.group(4)
+        loaded.add(name.split(".")[0])
+        if name == module:
+            total = int(match.group(2))
+    return total, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time regression gate")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per module (best is reported)")
+    parser.add_argument("--budget-ms", type=float,
+                        help="Override the cumulative import budget for every module")
+    parser.add_argument("modules", nargs="*", default=list(GATES), help="Modules to check")
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        try:
+            runs = [measure(module) for _ in range(args.runs)]
+        except RuntimeError as e:
+            # e.g. currency_api on a machine without flask installed
+            print(f"{module:20s} skipped: {str(e).splitlines()[0]}")
+            continue
+
+        best = min(total for total, _ in runs) / 1000
+        forbidden = sorted(set(GATES.get(module, ())) & runs[0][1])
+        budget = args.budget_ms or BUDGETS_MS.get(module, 100.0)
+        status = "ok"
+        if best > budget:
+            status = f"FAIL (over {budget:.0f} ms budget)"
+            failed = True
+        if forbidden:
+            status = f"FAIL (eagerly imports {', '.join(forbidden)})"
+            failed = True
+        print(f"{module:20s} {best:8.1f} ms   {status}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark rate provider fetch latency against the local stub provider.
+
+cold: a new client per fetch (new connection, no validators)
+warm: one pooled client, full 200 responses
+revalidated: one pooled client, unchanged table answered with 304
+
+Usage: python benchmarks/bench_provider_fetch.py [--repeat 50] [--rates 160]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_provider import RateProviderClient
+from stub_provider import StubProvider, make_tables
+
+
+def median_ms(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Provider fetch benchmark")
+    parser.add_argument("--repeat", type=int, default=50, help="Fetches per case")
+    parser.add_argument("--rates", type=int, default=160, help="Rates per table")
+    parser.add_argument("--latency", type=float, default=0.0, help="Injected server latency")
+    args = parser.parse_args()
+
+    with StubProvider(tables=make_tables(args.rates), latency=args.latency) as stub:
+        cold = []
+        for _ in range(args.repeat):
+            client = RateProviderClient(stub.base_url)
+            start = time.perf_counter()
+            client.fetch("USD")
+            cold.append(time.perf_counter() - start)
+            client.close()
+
+        client = RateProviderClient(stub.base_url)
+        client.fetch("USD")
+        warm = []
+        for _ in range(args.repeat):
+            client._validators.clear()
+            start = time.perf_counter()
+            client.fetch("USD")
+            warm.append(time.perf_counter() - start)
+
+        client.fetch("USD")
+        revalidated = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            table = client.fetch("USD")
+            revalidated.append(time.perf_counter() - start)
+        assert table.not_modified
+        client.close()
+
+    print(f"USD table with {args.rates} rates, median of {args.repeat} fetches")
+    print("-" * 50)
+    print(f"cold:        {median_ms(cold):8.3f} ms")
+    print(f"warm:        {median_ms(warm):8.3f} ms")
+    print(f"revalidated: {median_ms(revalidated):8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
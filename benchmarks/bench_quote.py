@@ -0,0 +1,88 @@
+"""
+Cost of answering one /convert request: convert() plus a second rate
+lookup for the response (the old path) vs a single quote().
+
+Caches the USD table only, so USD->EUR is a direct rate and EUR->JPY is
+chained through USD. History writes are left out of both paths to
+isolate the lookup. Reports per request the matrix lookups made (from
+the converter's currency_rate_lookups_total counters), the time, and
+the peak memory allocated while answering it. The peak is the same for
+both paths, since each lookup frees its generator frame and tuples
+before the next starts; the second lookup's allocations show up in the
+time instead.
+
+Usage: python benchmarks/bench_quote.py [--requests 20000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from currency_converter import CurrencyConverter
+from stub_provider import make_tables
+
+
+def convert_then_resolve(converter, amount, from_currency, to_currency):
+    """What /convert did before quote(): the result, then the rate again for the response."""
+    rate = converter.get_exchange_rate(from_currency, to_currency)
+    result = amount * rate
+    rate, rate_age = converter.resolve_rate(from_currency, to_currency)
+    return result, rate, rate_age
+
+
+def single_quote(converter, amount, from_currency, to_currency):
+    return converter.quote(amount, from_currency, to_currency, save_history=False)
+
+
+def lookups(converter) -> float:
+    return (converter._lookup_hit.value + converter._lookup_stale.value
+            + converter._lookup_miss.value)
+
+
+def peak_bytes(func, converter, pair, repeat: int = 200) -> int:
+    """Median peak of memory allocated during one call."""
+    samples = []
+    tracemalloc.start()
+    for _ in range(repeat):
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        func(converter, 100.0, *pair)
+        samples.append(tracemalloc.get_traced_memory()[1] - start)
+    tracemalloc.stop()
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def run_case(name, func, converter, pair, requests):
+    func(converter, 100.0, *pair)  # Warm up
+    before = lookups(converter)
+    start = time.perf_counter()
+    for _ in range(requests):
+        func(converter, 100.0, *pair)
+    elapsed = time.perf_counter() - start
+    per_request = (lookups(converter) - before) / requests
+    print(f"{'->'.join(pair):8s} {name:22s} {per_request:8.1f} {elapsed / requests * 1e6:8.2f} "
+          f"{peak_bytes(func, converter, pair):10d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-lookup quote benchmark")
+    parser.add_argument("--requests", type=int, default=20000, help="Requests per case")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        converter = CurrencyConverter(db_path=os.path.join(tmp, "quote.db"))
+        converter.cache_rates("USD", make_tables()["USD"])
+        print(f"{'pair':8s} {'path':22s} {'lookups':>8s} {'us/req':>8s} {'peak bytes':>10s}")
+        for pair in (("USD", "EUR"), ("EUR", "JPY")):
+            run_case("convert + resolve_rate", convert_then_resolve, converter, pair, args.requests)
+            run_case("quote", single_quote, converter, pair, args.requests)
+        converter.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark the cost of caching one provider response (a cache miss).
+
+Compares the old per-row path (one INSERT and commit per rate via
+cache_rate) with the bulk cache_rates path, under the previous SQLite
+defaults and under the WAL tuning set up in initialize_database.
+
+Usage: python benchmarks/bench_rate_ingestion.py [--rates 160] [--repeat 20]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from currency_converter import CurrencyConverter
+
+
+def make_table(size: int):
+    """Build a canned rate table with the given number of currencies."""
+    return {f"C{i:03d}": 1.0 + i / 100 for i in range(size)}
+
+
+def time_miss(converter: CurrencyConverter, rates, bulk: bool, repeat: int) -> float:
+    """Return the median seconds to cache one full table."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if bulk:
+            converter.cache_rates("USD", rates)
+        else:
+            for curr, rate in rates.items():
+                converter.cache_rate(f"USD_{curr}", rate)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rate ingestion benchmark")
+    parser.add_argument("--rates", type=int, default=160, help="Rates per response")
+    parser.add_argument("--repeat", type=int, default=20, help="Samples per case")
+    args = parser.parse_args()
+
+    rates = make_table(args.rates)
+    cases = [
+        ("per-row, DELETE/FULL", "DELETE", "FULL", False),
+        ("per-row, WAL/NORMAL", "WAL", "NORMAL", False),
+        ("bulk,    DELETE/FULL", "DELETE", "FULL", True),
+        ("bulk,    WAL/NORMAL", "WAL", "NORMAL", True),
+    ]
+
+    print(f"Caching {args.rates} rates, median of {args.repeat} runs")
+    print("-" * 50)
+    for label, journal_mode, synchronous, bulk in cases:
+        with tempfile.TemporaryDirectory() as tmp:
+            converter = CurrencyConverter(
+                db_path=os.path.join(tmp, "bench.db"),
+                journal_mode=journal_mode,
+                synchronous=synchronous
+            )
+            elapsed = time_miss(converter, rates, bulk, args.repeat)
+            converter.close()
+        print(f"{label}: {elapsed * 1000:9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Worker start-up cost: loading rates from SQLite vs mapping a shared snapshot.
+
+Caches every table from the stub provider's canned set (padded to
+--rates codes each) in a database, publishes the same rates as a shared
+snapshot, then times building a new CurrencyConverter both ways. Also
+reports the snapshot size, which is the memory all workers share
+instead of each holding its own copy.
+
+Usage: python benchmarks/bench_shared_rates.py [--rates 160 1000] [--repeat 10]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from currency_converter import CurrencyConverter
+from stub_provider import make_tables
+
+
+def median_ms(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2] * 1000
+
+
+def time_startup(repeat: int, **kwargs) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        converter = CurrencyConverter(**kwargs)
+        samples.append(time.perf_counter() - start)
+        converter.close()
+    return median_ms(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared snapshot start-up benchmark")
+    parser.add_argument("--rates", type=int, nargs="+", default=[160, 1000], help="Rates per table")
+    parser.add_argument("--repeat", type=int, default=10, help="Start-ups per case")
+    args = parser.parse_args()
+
+    print(f"{'rates':>6s} {'tables':>6s} {'sqlite load':>12s} {'snapshot':>10s} {'snapshot size':>14s}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.rates:
+            db_path = os.path.join(tmp, f"rates_{size}.db")
+            snapshot = os.path.join(tmp, f"rates_{size}.snap")
+            tables = make_tables(size)
+
+            publisher = CurrencyConverter(db_path=db_path, publish_snapshot=snapshot)
+            for base, rates in tables.items():
+                publisher.cache_rates(base, rates)
+            publisher.close()
+
+            sqlite_ms = time_startup(args.repeat, db_path=db_path)
+            snapshot_ms = time_startup(args.repeat, db_path=db_path, rate_snapshot=snapshot)
+            print(f"{size:6d} {len(tables):6d} {sqlite_ms:9.2f} ms {snapshot_ms:7.2f} ms "
+                  f"{os.path.getsize(snapshot) / 1024:11.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""
+Benchmark suite for the converter's hot paths, against the local stub
+provider (no network access needed).
+
+Cases:
+  rate.*     get_exchange_rate on a cache hit, on a miss that downloads a
+             changed table, and on a miss answered with 304
+  convert.*  convert throughput with synchronous history, with
+             write-behind history, and without history
+  cache.*    cache_rates for one table and load_cached_rates for all
+             tables, at several table sizes and with --bases base tables
+             stored; a cross rate first looked up after a publish, through
+             a chain of --bases tables
+  api.*      Flask /rate and /convert throughput at several client thread
+             counts (skipped if Flask is not installed)
+
+Results are written as JSON with the commit and environment, so runs can
+be compared between commits:
+
+    python benchmarks/bench_suite.py --output before.json
+    git checkout my-branch
+    python benchmarks/bench_suite.py --output after.json --compare before.json
+
+--compare prints the change for every metric and exits 1 if any metric
+regressed by more than --threshold percent.
+
+Usage: python benchmarks/bench_suite.py [--quick] [--only rate convert] [--output FILE] [--compare FILE]
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from currency_converter import CurrencyConverter
+from rate_engine import RateMatrix
+from stub_provider import StubProvider, make_tables
+
+CASES = ("rate", "convert", "cache", "api")
+
+
+class Results:
+    """Collects metrics as name -> {value, unit, better}."""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def add(self, name: str, value: float, unit: str, better: str = "lower"):
+        self.metrics[name] = {"value": round(value, 3), "unit": unit, "better": better}
+        print(f"  {name:38s} {value:12.2f} {unit}")
+
+    def latency(self, name: str, samples):
+        """Record median and p99 of per-call samples (seconds) in microseconds."""
+        samples = sorted(samples)
+        self.add(f"{name}.p50", samples[len(samples) // 2] * 1e6, "us")
+        self.add(f"{name}.p99", samples[min(int(len(samples) * 0.99), len(samples) - 1)] * 1e6, "us")
+
+
+def timed(fn, repeat: int):
+    """Call fn repeat times; return per-call durations in seconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_rate(results: Results, stub: StubProvider, tmp: str, scale: int):
+    converter = CurrencyConverter(db_path=os.path.join(tmp, "rate.db"), base_url=stub.base_url)
+    try:
+        converter.get_exchange_rate("USD", "EUR")
+        results.latency("rate.hit.direct", timed(lambda: converter.get_exchange_rate("USD", "EUR"), scale * 20))
+        results.latency("rate.hit.cross", timed(lambda: converter.get_exchange_rate("GBP", "JPY"), scale * 20))
+
+        usd = dict(stub.tables["USD"])
+        samples = []
+        for i in range(scale // 5):
+            # A changed table forces a full download, parse and store
+            usd["EUR"] *= 1.000001
+            stub.set_table("USD", dict(usd))
+            converter.rates = RateMatrix()
+            samples += timed(lambda: converter.get_exchange_rate("USD", "EUR"), 1)
+        results.latency("rate.miss.download", samples)
+
+        samples = []
+        for _ in range(scale // 5):
+            # Unchanged table: the provider answers 304 from the stored ETag
+            converter.rates = RateMatrix()
+            samples += timed(lambda: converter.get_exchange_rate("USD", "EUR"), 1)
+        results.latency("rate.miss.revalidated", samples)
+    finally:
+        converter.close()
+
+
+def bench_convert(results: Results, stub: StubProvider, tmp: str, scale: int):
+    count = scale * 10
+
+    for label, write_behind in (("sync_history", False), ("write_behind", True)):
+        converter = CurrencyConverter(db_path=os.path.join(tmp, f"convert_{label}.db"),
+                                      base_url=stub.base_url, write_behind=write_behind)
+        try:
+            converter.convert(1.0, "USD", "EUR")
+            start = time.perf_counter()
+            for i in range(count):
+                converter.convert(float(i), "USD", "EUR")
+            if converter.history_writer is not None:
+                converter.history_writer.flush()
+            results.add(f"convert.{label}", count / (time.perf_counter() - start), "ops/s", "higher")
+        finally:
+            converter.close()
+
+    converter = CurrencyConverter(db_path=os.path.join(tmp, "convert_none.db"), base_url=stub.base_url)
+    try:
+        converter.get_exchange_rate("USD", "EUR")
+        start = time.perf_counter()
+        for i in range(count * 10):
+            float(i) * converter.get_exchange_rate("USD", "EUR")
+        results.add("convert.no_history", count * 10 / (time.perf_counter() - start), "ops/s", "higher")
+    finally:
+        converter.close()
+
+
+def bench_cache(results: Results, tmp: str, scale: int, sizes):
+    for size in sizes:
+        tables = make_tables(size)
+        converter = CurrencyConverter(db_path=os.path.join(tmp, f"cache_{size}.db"))
+        try:
+            samples = []
+            for _ in range(max(scale // 10, 3)):
+                for base, rates in tables.items():
+                    samples += timed(lambda: converter.cache_rates(base, rates), 1)
+            samples.sort()
+            results.add(f"cache.cache_rates.{size}", samples[len(samples) // 2] * 1000, "ms")
+
+            samples = timed(converter.load_cached_rates, max(scale // 10, 3))
+            samples.sort()
+            results.add(f"cache.load_cached_rates.{size}x{len(tables)}",
+                        samples[len(samples) // 2] * 1000, "ms")
+        finally:
+            converter.close()
+
+
+def many_tables(bases: int, size: int):
+    """bases tables of size rates each; with bases <= size every table quotes every base."""
+    usd = make_tables(max(size, bases))["USD"]
+    codes = list(usd)[:bases]
+    return {base: {code: rate / usd[base] for code, rate in list(usd.items())[:size]} for base in codes}
+
+
+def bench_many_bases(results: Results, tmp: str, scale: int, bases: int):
+    tables = many_tables(bases, 160)
+    converter = CurrencyConverter(db_path=os.path.join(tmp, f"bases_{bases}.db"))
+    try:
+        for base, rates in tables.items():
+            converter.cache_rates(base, rates)
+        samples = []
+        for _ in range(max(scale // 20, 2)):
+            for base, rates in tables.items():
+                samples += timed(lambda: converter.cache_rates(base, rates), 1)
+        samples.sort()
+        results.add(f"cache.cache_rates.160x{bases}", samples[len(samples) // 2] * 1000, "ms")
+
+        samples = timed(converter.load_cached_rates, max(scale // 20, 3))
+        samples.sort()
+        results.add(f"cache.load_cached_rates.160x{bases}", samples[len(samples) // 2] * 1000, "ms")
+    finally:
+        converter.close()
+
+    # B0 -> B1 -> ... with a private code per table: P0 to the last P needs every leg
+    matrix = RateMatrix()
+    for i in range(bases):
+        rates = {f"P{i}": 2.0}
+        if i + 1 < bases:
+            rates[f"B{i + 1}"] = 1.0
+        matrix.set_base_rates(f"B{i}", rates)
+    samples = []
+    for _ in range(max(scale // 10, 3)):
+        matrix.set_base_rates(f"B{bases // 2}", {f"P{bases // 2}": 2.0, f"B{bases // 2 + 1}": 1.0})
+        samples += timed(lambda: matrix.route("P0", f"P{bases - 1}"), 1)
+    samples.sort()
+    results.add(f"cache.cross_route_first.{bases}", samples[len(samples) // 2] * 1000, "ms")
+
+
+def bench_api(results: Results, stub: StubProvider, tmp: str, scale: int, threads):
+    try:
+        from werkzeug.serving import make_server
+        import currency_api
+    except ImportError as e:
+        print(f"  skipped: {e}")
+        return
+    from bench_api_threads import run
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    converter = CurrencyConverter(db_path=os.path.join(tmp, "api.db"), base_url=stub.base_url)
+    converter.get_exchange_rate("USD", "EUR")
+    currency_api.converter = converter
+    server = make_server("127.0.0.1", 0, currency_api.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        for count in threads:
+            rps, errors = run(server.server_port, count, scale * 4)
+            results.add(f"api.threads_{count}", rps, "req/s", "higher")
+            if errors:
+                print(f"  {errors} errors at {count} threads")
+    finally:
+        server.shutdown()
+        converter.close()
+
+
+def environment() -> dict:
+    """Describe the commit and machine the run was made on."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                    cwd=ROOT, capture_output=True, text=True).stdout.strip())
+    except OSError:
+        commit, dirty = None, None
+    return {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(current: dict, baseline_path: str, threshold: float) -> bool:
+    """Print per-metric changes against a baseline run; return True if anything regressed."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    print(f"\nCompared with {baseline['environment'].get('commit')} ({baseline_path}):")
+    regressed = False
+    for name, metric in current["metrics"].items():
+        before = baseline["metrics"].get(name)
+        if before is None or not before["value"]:
+            continue
+        change = (metric["value"] - before["value"]) / before["value"] * 100
+        worse = change > threshold if metric["better"] == "lower" else change < -threshold
+        regressed = regressed or worse
+        flag = "  REGRESSION" if worse else ""
+        print(f"  {name:38s} {before['value']:12.2f} -> {metric['value']:12.2f} {metric['unit']:6s}"
+              f" {change:+7.1f}%{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Converter benchmark suite")
+    parser.add_argument("--only", nargs="+", choices=CASES, default=list(CASES),
+                        help="Run only these case groups")
+    parser.add_argument("--quick", action="store_true", help="Fewer iterations, for a smoke run")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[24, 160, 1000],
+                        help="Rates per table for the cache cases")
+    parser.add_argument("--bases", type=int, default=100,
+                        help="Stored base tables for the many-bases cache cases")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 8],
+                        help="Client threads for the API cases")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", metavar="BASELINE", help="Compare with an earlier --output file")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Percent change counted as a regression in --compare")
+    args = parser.parse_args()
+    # Resolve before the suite changes directory
+    output = args.output and os.path.abspath(args.output)
+    baseline = args.compare and os.path.abspath(args.compare)
+
+    scale = 20 if args.quick else 100
+    results = Results()
+
+    with tempfile.TemporaryDirectory() as tmp, StubProvider() as stub:
+        # The API module builds a converter at import; keep its database out of the tree
+        os.chdir(tmp)
+        for case in args.only:
+            print(f"{case}:")
+            if case == "rate":
+                bench_rate(results, stub, tmp, scale)
+            elif case == "convert":
+                bench_convert(results, stub, tmp, scale)
+            elif case == "cache":
+                bench_cache(results, tmp, scale, args.sizes)
+                bench_many_bases(results, tmp, scale, args.bases)
+            elif case == "api":
+                bench_api(results, stub, tmp, scale, args.threads)
+
+    run = {"environment": environment(), "scale": scale, "metrics": results.metrics}
+    if output:
+        with open(output, "w") as f:
+            json.dump(run, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    if baseline and compare(run, baseline, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Local stand-in for api.exchangerate-api.com.
+
+Serves canned rate tables at /latest/<BASE> with ETag and Last-Modified
+headers and answers conditional requests with 304. Latency and failures
+can be injected to exercise retries, timeouts and hedging: tail_rate of
+the requests take tail_latency extra, modelling a provider's slow p99.
+
+Usage as a library:
+
+    with StubProvider(latency=0.05) as stub:
+        converter = CurrencyConverter(base_url=stub.base_url)
+
+Usage from the shell: python benchmarks/stub_provider.py --port 8000 --latency 0.2
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+# Currencies in the canned tables; rates are derived from USD values
+USD_RATES = {
+    "USD": 1.0, "EUR": 0.92, "GBP": 0.79, "JPY": 151.2, "AUD": 1.52, "CAD": 1.36,
+    "CHF": 0.88, "CNY": 7.24, "INR": 83.3, "SGD": 1.34, "MYR": 4.72, "IDR": 15700.0,
+    "KRW": 1340.0, "THB": 36.4, "VND": 24600.0, "PHP": 56.1, "BRL": 4.97, "RUB": 91.5,
+    "ZAR": 18.7, "AED": 3.67, "MXN": 16.9, "TRY": 32.1, "NZD": 1.64, "HKD": 7.82,
+}
+
+
+def make_tables(size: Optional[int] = None) -> Dict[str, Dict[str, float]]:
+    """
+    Build a rate table for every base from USD_RATES.
+    size pads each table with synthetic codes (X000, X001, ...) to that many rates.
+    """
+    usd = dict(USD_RATES)
+    if size is not None:
+        for i in range(max(size - len(usd), 0)):
+            usd[f"X{i:03d}"] = 1.0 + i / 100
+    return {
+        base: {code: rate / base_rate for code, rate in usd.items()}
+        for base, base_rate in usd.items() if base in USD_RATES
+    }
+
+
+class StubProvider:
+    """Threaded HTTP server serving canned rate tables."""
+
+    def __init__(self, tables: Optional[Dict[str, Dict[str, float]]] = None,
+                 host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 jitter: float = 0.0, failure_rate: float = 0.0,
+                 tail_rate: float = 0.0, tail_latency: float = 0.0):
+        self.tables = tables if tables is not None else make_tables()
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.fail_next = 0
+        self.requests = 0
+        self.not_modified = 0
+        self.last_modified = formatdate(time.time(), usegmt=True)
+        self._bodies = {}
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are separate writes; avoid delayed-ACK stalls
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                stub.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        """URL to pass as the converter's base_url."""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/latest/"
+
+    def set_table(self, base: str, rates: Dict[str, float]):
+        """Replace one table; its ETag and Last-Modified change."""
+        self.tables[base] = rates
+        self._bodies.pop(base, None)
+        self.last_modified = formatdate(time.time(), usegmt=True)
+
+    def _body(self, base: str):
+        """Return the encoded body and ETag for a base, cached per table."""
+        cached = self._bodies.get(base)
+        if cached is None:
+            body = json.dumps({"base": base, "rates": self.tables[base]}).encode()
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            cached = self._bodies[base] = (body, etag)
+        return cached
+
+    def handle(self, request: BaseHTTPRequestHandler):
+        """Serve one request, applying injected latency and failures."""
+        self.requests += 1
+        delay = self.latency + random.uniform(0, self.jitter)
+        if self.tail_rate and random.random() < self.tail_rate:
+            delay += self.tail_latency
+        if delay:
+            time.sleep(delay)
+
+        if self.fail_next > 0 or random.random() < self.failure_rate:
+            self.fail_next = max(self.fail_next - 1, 0)
+            self._send(request, 503, b'{"error": "injected failure"}')
+            return
+
+        base = request.path.split("?")[0].rstrip("/").rsplit("/", 1)[-1]
+        if base not in self.tables:
+            self._send(request, 404, b'{"error": "unsupported code"}')
+            return
+
+        body, etag = self._body(base)
+        headers = {"ETag": etag, "Last-Modified": self.last_modified}
+        if request.headers.get("If-None-Match") == etag:
+            self.not_modified += 1
+            self._send(request, 304, b"", headers)
+            return
+        self._send(request, 200, body, headers)
+
+    @staticmethod
+    def _send(request, status: int, body: bytes, headers: Optional[Dict[str, str]] = None):
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            request.send_header(name, value)
+        request.end_headers()
+        if body:
+            request.wfile.write(body)
+
+    def start(self) -> "StubProvider":
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Shut the server down."""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "StubProvider":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub exchange rate provider")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="Fraction of requests delayed by --tail-latency")
+    parser.add_argument("--tail-latency", type=float, default=0.0, help="Extra seconds for tail requests")
+    args = parser.parse_args()
+
+    stub = StubProvider(port=args.port, latency=args.latency, jitter=args.jitter,
+                        failure_rate=args.failure_rate, tail_rate=args.tail_rate,
+                        tail_latency=args.tail_latency)
+    print(f"Serving rate tables at {stub.base_url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
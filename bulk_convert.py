@@ -0,0 +1,249 @@
+import csv
+import io
+import json
+import multiprocessing
+import sys
+import threading
+import time
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+import numpy as np
+
+from rate_engine import RateMatrix
+
+# Columns appended to every output row
+RESULT_FIELDS = ("rate", "result", "error")
+
+
+class RateSnapshot:
+    """
+    Frozen copy of the converter's rate tables for one bulk run.
+
+    Every row in the run is converted against the same rates and no
+    network I/O happens while streaming. Tables keep the time they were
+    fetched (updated, base -> datetime; now if missing), so routes prefer
+    the fresher tables as they do in the converter. The snapshot pickles
+    as plain dicts, so worker processes can rebuild it cheaply.
+    """
+
+    def __init__(self, tables: Dict[str, Dict[str, float]],
+                 updated: Optional[Dict[str, datetime]] = None):
+        self.tables = tables
+        self.updated = updated or {}
+        self.matrix = RateMatrix()
+        for base, rates in tables.items():
+            self.matrix.set_base_rates(base, rates, self.updated.get(base))
+        self._pairs: Dict[Tuple[str, str], Optional[float]] = {}
+
+    @classmethod
+    def capture(cls, converter, pivot: str = "USD") -> "RateSnapshot":
+        """
+        Take a snapshot, making sure the pivot table is loaded and fresh
+        first. Tables past the converter's max_staleness are refetched, or
+        left out if that fails, so no row converts at an expired rate.
+        """
+        converter.resolve_rate(pivot, "EUR" if pivot != "EUR" else "USD")
+        matrix = converter.rates
+        tables, updated = {}, {}
+        for code in [code for code in list(matrix.codes) if matrix.has_base(code)]:
+            age = matrix.age(code)
+            if age is not None and age > converter.max_staleness:
+                table = converter.get_base_table(code)
+                if table is None:
+                    continue
+                tables[code], updated[code] = table
+            else:
+                tables[code] = matrix.base_rates(code)
+                updated[code] = matrix.updated[matrix.index[code]]
+        return cls(tables, updated)
+
+    def rate(self, from_currency: str, to_currency: str) -> Optional[float]:
+        """Return the snapshot rate for a pair, resolving each pair once."""
+        pair = (from_currency, to_currency)
+        try:
+            return self._pairs[pair]
+        except KeyError:
+            rate = self._pairs[pair] = self.matrix.rate(from_currency, to_currency)
+            return rate
+
+    def __getstate__(self):
+        return self.tables, self.updated
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+
+def read_rows(stream: TextIO, fmt: str) -> Iterator[dict]:
+    """Yield input rows as dicts from a CSV (with header) or NDJSON stream."""
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = {"error": "Invalid JSON"}
+        yield row if isinstance(row, dict) else {"error": "Invalid row"}
+
+
+def convert_chunk(rows: List[dict], snapshot: RateSnapshot) -> Tuple[List[dict], List[tuple]]:
+    """
+    Convert one chunk of rows against the snapshot.
+    Returns the rows with rate/result/error filled in, plus history records
+    (amount, from, to, result) for the rows that converted.
+    """
+    amounts = np.full(len(rows), np.nan)
+    rates = np.full(len(rows), np.nan)
+    errors: List[Optional[str]] = [None] * len(rows)
+
+    for i, row in enumerate(rows):
+        if row.get("error"):
+            errors[i] = row["error"]
+            continue
+        from_currency = row.get("from_currency")
+        to_currency = row.get("to_currency")
+        try:
+            amounts[i] = float(row.get("amount"))
+        except (TypeError, ValueError):
+            errors[i] = "Invalid amount"
+            continue
+        rate = snapshot.rate(from_currency, to_currency) if from_currency and to_currency else None
+        if rate is None:
+            errors[i] = "Rate not available"
+            continue
+        rates[i] = rate
+
+    # One vectorized multiply per chunk
+    results = amounts * rates
+
+    history = []
+    out = []
+    for row, amount, rate, result, error in zip(rows, amounts.tolist(), rates.tolist(),
+                                                results.tolist(), errors):
+        row = dict(row)
+        if error is None:
+            row.update(rate=rate, result=result, error="")
+            history.append((amount, row["from_currency"], row["to_currency"], result))
+        else:
+            row.update(rate="", result="", error=error)
+        out.append(row)
+    return out, history
+
+
+def format_rows(rows: List[dict], fmt: str, fieldnames: Optional[List[str]] = None) -> str:
+    """Serialize converted rows for output."""
+    if fmt == "ndjson":
+        return "".join(json.dumps(row) + "\n" for row in rows)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction="ignore", lineterminator="\n")
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def chunked(rows: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    """Group rows into lists of at most size."""
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# Per-process state for sharded runs
+_worker_snapshot: Optional[RateSnapshot] = None
+_worker_format = None
+_worker_fields = None
+
+
+def _init_worker(snapshot: RateSnapshot, fmt: str, fieldnames: Optional[List[str]]):
+    global _worker_snapshot, _worker_format, _worker_fields
+    _worker_snapshot, _worker_format, _worker_fields = snapshot, fmt, fieldnames
+
+
+def _convert_in_worker(chunk: List[dict]) -> Tuple[str, List[tuple], int]:
+    rows, history = convert_chunk(chunk, _worker_snapshot)
+    failed = sum(1 for row in rows if row["error"])
+    return format_rows(rows, _worker_format, _worker_fields), history, failed
+
+
+def stream_convert(converter, source: TextIO, sink: TextIO, fmt: str = "csv",
+                   chunk_size: int = 10000, jobs: int = 1, save_history: bool = True) -> dict:
+    """
+    Convert every row from source and write the results to sink as they
+    are produced. Memory use is bounded by chunk_size (times 2 * jobs when
+    sharding across worker processes). Returns run statistics.
+    """
+    snapshot = RateSnapshot.capture(converter)
+    rows = read_rows(source, fmt)
+
+    fieldnames = None
+    if fmt == "csv":
+        first = next(rows, None)
+        if first is None:
+            return {"rows": 0, "failed": 0, "seconds": 0.0, "rows_per_sec": 0.0}
+        fieldnames = list(first) + [field for field in RESULT_FIELDS if field not in first]
+        csv.DictWriter(sink, fieldnames=fieldnames, lineterminator="\n").writeheader()
+        rows = _prepend(first, rows)
+
+    start = time.perf_counter()
+    total = failed = 0
+
+    if jobs > 1:
+        # Bound the chunks in flight so a huge input is not read ahead into memory
+        in_flight = threading.BoundedSemaphore(jobs * 2)
+
+        def feed():
+            for chunk in chunked(rows, chunk_size):
+                in_flight.acquire()
+                yield chunk
+
+        with multiprocessing.Pool(jobs, _init_worker, (snapshot, fmt, fieldnames)) as pool:
+            for text, history, chunk_failed in pool.imap(_convert_in_worker, feed()):
+                in_flight.release()
+                sink.write(text)
+                total += len(history) + chunk_failed
+                failed += chunk_failed
+                if save_history:
+                    converter.save_conversion_history_many(history)
+    else:
+        for chunk in chunked(rows, chunk_size):
+            converted, history = convert_chunk(chunk, snapshot)
+            sink.write(format_rows(converted, fmt, fieldnames))
+            total += len(converted)
+            failed += len(converted) - len(history)
+            if save_history:
+                converter.save_conversion_history_many(history)
+
+    sink.flush()
+    seconds = time.perf_counter() - start
+    return {
+        "rows": total,
+        "failed": failed,
+        "seconds": seconds,
+        "rows_per_sec": total / seconds if seconds else 0.0
+    }
+
+
+def _prepend(first: dict, rows: Iterator[dict]) -> Iterator[dict]:
+    yield first
+    yield from rows
+
+
+def detect_format(path: Optional[str], default: str = "csv") -> str:
+    """Guess the input format from a file extension."""
+    if path and path.lower().endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return default
+
+
+def open_input(path: Optional[str]) -> TextIO:
+    """Open a file for streaming, or stdin for '-' or None."""
+    if not path or path == "-":
+        return sys.stdin
+    return open(path, newline="", encoding="utf-8")
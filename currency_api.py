@@ -1,143 +1,262 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
-from currency_converter import CurrencyConverter
+from api_common import (
+    STREAM_HEADERS, STREAM_HEARTBEAT, ApiError, cache_rate, cache_table, check_currencies,
+    convert_payload, converter_from_env, currencies_response, history_payload, history_query,
+    index_response, observe_request, open_stream, parse_conversion, rate_cache_from_env,
+    static_reply, swap_payload, table_mimetype, top_pairs_payload, top_pairs_query,
+    trace_spans_payload, volume_payload, volume_query
+)
+from http_cache import not_modified
+from rate_tables import RateTableCache
 import os
+import time
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
 # Initialize converter
-API_KEY = os.environ.get('API KEY HANO-for security reasons wont post them here')
-converter = CurrencyConverter(api_key=API_KEY)
+converter = converter_from_env(os.environ)
+
+# Recently served rates, answered without the converter while fresh
+rate_cache = rate_cache_from_env(converter, os.environ)
+# Whole base tables served, with a few earlier versions kept for deltas
+rate_tables = RateTableCache()
+
+@app.before_request
+def start_request_timing():
+    g.request_start = time.perf_counter()
+    g.trace = converter.metrics.begin_trace()
+
+@app.after_request
+def record_request_timing(response):
+    """Observe request latency per route and attach spans when tracing."""
+    timing = observe_request(converter, request, g.request_start, g.pop('trace', None))
+    if timing:
+        response.headers["Server-Timing"] = timing
+    return response
+
+@app.teardown_request
+def end_abandoned_trace(error):
+    # after_request is skipped when a view raises
+    converter.metrics.end_trace(g.pop('trace', None), f"{request.method} {request.path}")
+
+@app.errorhandler(ApiError)
+def api_error(e):
+    return jsonify(e.payload()), e.status
+
+def send_static(body_and_headers):
+    """Serve a precomputed response, or 304 if the client already has it."""
+    status, body, headers = static_reply(body_and_headers, request.headers)
+    return Response(body, status=status, headers=headers)
+
+INDEX_RESPONSE = index_response("Currency Converter API", [
+    "/convert", "/convert/batch", "/currencies", "/history", "/stats/volume", "/stats/top-pairs",
+    "/metrics", "/metrics/spans", "/rate/<from_curr>/<to_curr>", "/rates/<base>", "/rates/stream", "/swap"
+])
+
+CURRENCIES_RESPONSE = currencies_response(converter)
 
 @app.route('/')
 def index():
-    return jsonify({
-        "message": "Currency Converter API",
-        "endpoints": {
-            "/convert": "POST - Convert currencies",
-            "/currencies": "GET - List supported currencies",
-            "/history": "GET - Get conversion history",
-            "/rate/<from_curr>/<to_curr>": "GET - Get exchange rate"
-        }
-    })
+    return send_static(INDEX_RESPONSE)
 
 @app.route('/convert', methods=['POST'])
 def convert_currency():
     """Convert currency API endpoint."""
-    data = request.json
+    amount, from_currency, to_currency = parse_conversion(converter, request.get_json(silent=True))
+    
+    try:
+        quote = converter.quote(amount, from_currency, to_currency)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
     
-    if not data:
-        return jsonify({"error": "No data provided"}), 400
+    return jsonify(convert_payload(quote))
+
+@app.route('/convert/batch', methods=['POST'])
+def convert_batch():
+    """Convert many amounts in one request, with a per-item error array."""
+    data = request.json
     
-    amount = data.get('amount')
-    from_currency = data.get('from_currency')
-    to_currency = data.get('to_currency')
+    if not data or not isinstance(data.get('items'), list):
+        return jsonify({"error": "No items provided"}), 400
     
-    if not all([amount, from_currency, to_currency]):
-        return jsonify({"error": "Missing required parameters"}), 400
+    items = data['items']
+    errors = [None] * len(items)
+    valid = []
     
-    try:
-        amount = float(amount)
-        result = converter.convert(amount, from_currency, to_currency)
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors[i] = "Invalid item"
+            continue
         
-        if result is None:
-            return jsonify({"error": "Conversion failed"}), 400
+        amount = item.get('amount')
+        from_currency = item.get('from_currency')
+        to_currency = item.get('to_currency')
         
-        return jsonify({
-            "amount": amount,
-            "from_currency": from_currency,
-            "to_currency": to_currency,
-            "result": result,
-            "rate": converter.get_exchange_rate(from_currency, to_currency)
-        })
-    
-    except ValueError:
-        return jsonify({"error": "Invalid amount"}), 400
+        if amount is None or not from_currency or not to_currency:
+            errors[i] = "Missing required parameters"
+            continue
+        
+        unsupported = converter.unsupported_currencies(from_currency, to_currency)
+        if unsupported:
+            errors[i] = f"Unsupported currency code: {', '.join(map(str, unsupported))}"
+            continue
+        
+        try:
+            valid.append((i, float(amount), from_currency, to_currency))
+        except (TypeError, ValueError):
+            errors[i] = "Invalid amount"
+    
+    results = [None] * len(items)
+    
+    try:
+        if valid:
+            indexes, amounts, from_currencies, to_currencies = zip(*valid)
+            converted = converter.convert_many(amounts, from_currencies, to_currencies)
+            
+            for i, amount, from_currency, to_currency, result in zip(
+                    indexes, amounts, from_currencies, to_currencies, converted.tolist()):
+                if result != result:
+                    errors[i] = "Conversion failed"
+                    continue
+                results[i] = {
+                    "amount": amount,
+                    "from_currency": from_currency,
+                    "to_currency": to_currency,
+                    "result": result
+                }
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+    
+    return jsonify({
+        "results": results,
+        "errors": errors,
+        "count": len(items),
+        "failed": sum(1 for error in errors if error is not None)
+    })
 
 @app.route('/currencies', methods=['GET'])
 def get_currencies():
     """Get list of supported currencies."""
-    return jsonify({
-        "currencies": converter.get_supported_currencies(),
-        "count": len(converter.get_supported_currencies())
-    })
+    return send_static(CURRENCIES_RESPONSE)
 
 @app.route('/history', methods=['GET'])
 def get_history():
-    """Get conversion history."""
-    limit = request.args.get('limit', default=10, type=int)
-    history = converter.get_conversion_history(limit=limit)
-    
-    history_list = []
-    for record in history:
-        amount, from_curr, to_curr, result, date = record
-        history_list.append({
-            "amount": amount,
-            "from_currency": from_curr,
-            "to_currency": to_curr,
-            "result": result,
-            "date": date
-        })
-    
-    return jsonify({"history": history_list, "count": len(history_list)})
+    """Get a page of conversion history; pass next_cursor back as ?cursor= for the next."""
+    query = history_query(converter, request.args)
+    try:
+        history, next_cursor = converter.query_history(*query)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    return jsonify(history_payload(history, next_cursor))
+
+@app.route('/stats/volume', methods=['GET'])
+def get_volume_stats():
+    """Conversion volume per pair per hour or day, read from the rollups."""
+    query = volume_query(converter, request.args)
+    try:
+        buckets = converter.get_volume_stats(*query)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    return jsonify(volume_payload(query[0], buckets))
+
+@app.route('/stats/top-pairs', methods=['GET'])
+def get_top_pairs():
+    """Most converted currency pairs, read from the rollups."""
+    try:
+        pairs = converter.get_top_pairs(*top_pairs_query(request.args))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    return jsonify(top_pairs_payload(pairs))
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus metrics."""
+    return Response(converter.metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+@app.route('/metrics/spans', methods=['GET', 'POST'])
+def trace_spans():
+    """Show recent request spans; POST {"enabled": true|false} to switch tracing."""
+    data = (request.get_json(silent=True) or {}) if request.method == 'POST' else None
+    return jsonify(trace_spans_payload(converter, data))
 
 @app.route('/rate/<from_currency>/<to_currency>', methods=['GET'])
 def get_rate(from_currency, to_currency):
-    """Get exchange rate between two currencies."""
-    rate = converter.get_exchange_rate(from_currency, to_currency)
+    """
+    Get exchange rate between two currencies. Responses carry ETag,
+    Last-Modified and a Cache-Control max-age of the rate's remaining
+    freshness; a conditional request for a cached rate gets a 304.
+    """
+    # Read before resolving, so a table stored meanwhile invalidates the entry
+    version = converter.rates_version()
+    cached = rate_cache.get((from_currency, to_currency), version)
     
-    if rate is None:
-        return jsonify({"error": "Rate not available"}), 404
+    if cached is None:
+        check_currencies(converter, from_currency, to_currency)
+        resolved = converter.resolve_route(from_currency, to_currency)
+        cached = cache_rate(converter, rate_cache, from_currency, to_currency, resolved, version)
     
-    return jsonify({
-        "from_currency": from_currency,
-        "to_currency": to_currency,
-        "rate": rate
-    })
+    if not_modified(request.headers, cached.etag, cached.last_modified):
+        return Response(status=304, headers=cached.headers())
+    
+    return jsonify(cached.payload()), 200, cached.headers()
 
-@app.route('/swap', methods=['POST'])
-def swap_currencies():
-    """Swap currencies in a conversion."""
-    data = request.json
+@app.route('/rates/stream', methods=['GET'])
+def stream_rates():
+    """
+    Push rate changes as Server-Sent Events. Reconnecting clients send
+    Last-Event-ID and receive the events they missed. Each open stream
+    holds a worker thread here; for thousands of idle clients serve the
+    stream from currency_api_async (or under gevent workers).
+    """
+    stream = open_stream(converter, request.args, request.headers)
     
-    if not data:
-        return jsonify({"error": "No data provided"}), 400
+    def generate():
+        try:
+            yield from stream.open()
+            while True:
+                yield from stream.wait(STREAM_HEARTBEAT)
+        finally:
+            stream.close()
     
-    amount = data.get('amount')
-    from_currency = data.get('from_currency')
-    to_currency = data.get('to_currency')
+    return Response(generate(), mimetype='text/event-stream', headers=STREAM_HEADERS)
+
+@app.route('/rates/<base_currency>', methods=['GET'])
+def get_rates(base_currency):
+    """
+    Get the whole rate table for a base currency in one response. Send
+    Accept: application/x-currency-rates for the packed binary encoding
+    and ?since=<version> for only the rates changed since that version.
+    """
+    mimetype = table_mimetype(request.accept_mimetypes)
     
-    if not all([amount, from_currency, to_currency]):
-        return jsonify({"error": "Missing required parameters"}), 400
+    version = converter.rates_version()
+    table = rate_tables.get(base_currency, version)
+    
+    if table is None:
+        check_currencies(converter, base_currency)
+        resolved = converter.get_base_table(base_currency)
+        table = cache_table(converter, rate_tables, base_currency, resolved, version)
+    
+    status, body, headers = rate_tables.respond(table, mimetype, request.args.get('since'), request.headers)
+    return Response(body, status=status, headers=headers)
+
+@app.route('/swap', methods=['POST'])
+def swap_currencies():
+    """Swap currencies in a conversion."""
+    amount, from_currency, to_currency = parse_conversion(converter, request.get_json(silent=True))
     
     try:
-        amount = float(amount)
-        result = converter.convert(amount, to_currency, from_currency)
-        
-        if result is None:
-            return jsonify({"error": "Conversion failed"}), 400
-        
-        return jsonify({
-            "original": {
-                "amount": amount,
-                "from_currency": from_currency,
-                "to_currency": to_currency
-            },
-            "swapped": {
-                "amount": amount,
-                "from_currency": to_currency,
-                "to_currency": from_currency,
-                "result": result
-            }
-        })
-    
-    except ValueError:
-        return jsonify({"error": "Invalid amount"}), 400
+        # One lookup answers both directions
+        swapped = converter.quote(amount, to_currency, from_currency)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+    
+    return jsonify(swap_payload(swapped))
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,256 @@
+"""
+Asyncio (ASGI) variant of currency_api.py.
+
+Serves the same routes on an event loop, so a slow rate provider does not
+tie up a worker thread per request. Upstream fetches use an async HTTP
+client and SQLite work runs in worker threads. Rate resolution, caching
+and storage are shared with the sync server through CurrencyConverter,
+and request parsing and response bodies through api_common.
+
+Run with: hypercorn currency_api_async:app --bind 127.0.0.1:5001
+"""
+import asyncio
+import os
+import time
+
+from quart import Quart, Response, g, jsonify, request
+from quart_cors import cors
+
+from api_common import (
+    STREAM_HEADERS, STREAM_HEARTBEAT, ApiError, cache_rate, cache_table, check_currencies,
+    convert_payload, converter_from_env, currencies_response, history_payload, history_query,
+    index_response, observe_request, open_stream, parse_conversion, rate_cache_from_env,
+    static_reply, swap_payload, table_mimetype, top_pairs_payload, top_pairs_query,
+    trace_spans_payload, volume_payload, volume_query
+)
+from http_cache import not_modified
+from quote import Quote
+from rate_tables import RateTableCache
+from rate_provider import RateProviderError
+
+app = Quart(__name__)
+app = cors(app)  # Enable CORS for all routes
+
+# Initialize converter
+converter = converter_from_env(os.environ)
+# Shares the refresher's sources, circuit breakers and metrics
+provider = converter.async_provider()
+
+# Recently served rates, answered without the converter while fresh
+rate_cache = rate_cache_from_env(converter, os.environ)
+# Whole base tables served, with a few earlier versions kept for deltas
+rate_tables = RateTableCache()
+
+async def fetch_base_rates(base_currency):
+    """Fetch a base table upstream, one in-flight request per base."""
+    return await converter.flights.do_async(base_currency, _fetch_base_rates, base_currency)
+
+async def _fetch_base_rates(base_currency):
+    start = time.perf_counter()
+    try:
+        with converter.metrics.span("upstream"):
+            table = await provider.fetch(base_currency)
+    except RateProviderError as e:
+        converter.record_fetch_latency(None, time.perf_counter() - start)
+        converter.record_fetch_error(base_currency, e)
+        return None
+    converter.record_fetch_latency(table, time.perf_counter() - start)
+
+    # Database writes stay off the event loop
+    return await asyncio.to_thread(converter.ingest_table, table)
+
+async def quote(amount, from_currency, to_currency):
+    """Async CurrencyConverter.quote: a Quote or None. History is written off the event loop."""
+    resolved = await resolve_route(from_currency, to_currency)
+    if resolved is None:
+        return None
+    converted = Quote.from_route(amount, from_currency, to_currency, *resolved)
+    await asyncio.to_thread(
+        converter.save_conversion_history, amount, from_currency, to_currency, converted.result
+    )
+    return converted
+
+async def resolve_route(from_currency, to_currency):
+    """Async CurrencyConverter.resolve_route: (rate, age, path) or None."""
+    return await run_steps(converter.resolution_steps(from_currency, to_currency))
+
+async def run_steps(steps):
+    """Drive a converter resolution generator, fetching every base it yields."""
+    try:
+        base = next(steps)
+        while True:
+            base = steps.send(await fetch_base_rates(base))
+    except StopIteration as done:
+        return done.value
+
+@app.before_request
+async def start_request_timing():
+    g.request_start = time.perf_counter()
+    g.trace = converter.metrics.begin_trace()
+
+@app.after_request
+async def record_request_timing(response):
+    """Observe request latency per route and attach spans when tracing."""
+    timing = observe_request(converter, request, g.request_start, g.pop('trace', None))
+    if timing:
+        response.headers["Server-Timing"] = timing
+    return response
+
+@app.teardown_request
+async def end_abandoned_trace(error):
+    # after_request is skipped when a view raises
+    converter.metrics.end_trace(g.pop('trace', None), f"{request.method} {request.path}")
+
+@app.errorhandler(ApiError)
+async def api_error(e):
+    return jsonify(e.payload()), e.status
+
+def send_static(body_and_headers):
+    """Serve a precomputed response, or 304 if the client already has it."""
+    status, body, headers = static_reply(body_and_headers, request.headers)
+    return Response(body, status=status, headers=headers)
+
+INDEX_RESPONSE = index_response("Currency Converter API (async)", [
+    "/convert", "/currencies", "/history", "/stats/volume", "/stats/top-pairs", "/metrics",
+    "/metrics/spans", "/rate/<from_curr>/<to_curr>", "/rates/<base>", "/rates/stream", "/swap"
+])
+
+CURRENCIES_RESPONSE = currencies_response(converter)
+
+@app.route('/')
+async def index():
+    return send_static(INDEX_RESPONSE)
+
+@app.route('/convert', methods=['POST'])
+async def convert_currency():
+    """Convert currency API endpoint."""
+    amount, from_currency, to_currency = parse_conversion(converter, await request.get_json(silent=True))
+    return jsonify(convert_payload(await quote(amount, from_currency, to_currency)))
+
+@app.route('/currencies', methods=['GET'])
+async def get_currencies():
+    """Get list of supported currencies."""
+    return send_static(CURRENCIES_RESPONSE)
+
+@app.route('/history', methods=['GET'])
+async def get_history():
+    """Get a page of conversion history; pass next_cursor back as ?cursor= for the next."""
+    query = history_query(converter, request.args)
+    try:
+        history, next_cursor = await asyncio.to_thread(converter.query_history, *query)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(history_payload(history, next_cursor))
+
+@app.route('/stats/volume', methods=['GET'])
+async def get_volume_stats():
+    """Conversion volume per pair per hour or day, read from the rollups."""
+    query = volume_query(converter, request.args)
+    try:
+        buckets = await asyncio.to_thread(converter.get_volume_stats, *query)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(volume_payload(query[0], buckets))
+
+@app.route('/stats/top-pairs', methods=['GET'])
+async def get_top_pairs():
+    """Most converted currency pairs, read from the rollups."""
+    try:
+        pairs = await asyncio.to_thread(converter.get_top_pairs, *top_pairs_query(request.args))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(top_pairs_payload(pairs))
+
+@app.route('/metrics', methods=['GET'])
+async def get_metrics():
+    """Prometheus metrics."""
+    return Response(converter.metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+@app.route('/metrics/spans', methods=['GET', 'POST'])
+async def trace_spans():
+    """Show recent request spans; POST {"enabled": true|false} to switch tracing."""
+    data = (await request.get_json(silent=True) or {}) if request.method == 'POST' else None
+    return jsonify(trace_spans_payload(converter, data))
+
+@app.route('/rate/<from_currency>/<to_currency>', methods=['GET'])
+async def get_rate(from_currency, to_currency):
+    """
+    Get exchange rate between two currencies. Responses carry ETag,
+    Last-Modified and a Cache-Control max-age of the rate's remaining
+    freshness; a conditional request for a cached rate gets a 304.
+    """
+    # Read before resolving, so a table stored meanwhile invalidates the entry
+    version = converter.rates_version()
+    cached = rate_cache.get((from_currency, to_currency), version)
+
+    if cached is None:
+        check_currencies(converter, from_currency, to_currency)
+        resolved = await resolve_route(from_currency, to_currency)
+        cached = cache_rate(converter, rate_cache, from_currency, to_currency, resolved, version)
+
+    if not_modified(request.headers, cached.etag, cached.last_modified):
+        return Response("", status=304, headers=cached.headers())
+
+    return jsonify(cached.payload()), 200, cached.headers()
+
+@app.route('/rates/stream', methods=['GET'])
+async def stream_rates():
+    """
+    Push rate changes as Server-Sent Events. Streams wait on a shared
+    asyncio.Event, so thousands of idle clients cost no threads.
+    """
+    stream = open_stream(converter, request.args, request.headers)
+
+    async def generate():
+        try:
+            for message in stream.open():
+                yield message.encode()
+            while True:
+                for message in await stream.wait_async(STREAM_HEARTBEAT):
+                    yield message.encode()
+        finally:
+            stream.close()
+
+    response = Response(generate(), mimetype='text/event-stream', headers=STREAM_HEADERS)
+    # Streams stay open until the client leaves
+    response.timeout = None
+    return response
+
+@app.route('/rates/<base_currency>', methods=['GET'])
+async def get_rates(base_currency):
+    """
+    Get the whole rate table for a base currency in one response. Send
+    Accept: application/x-currency-rates for the packed binary encoding
+    and ?since=<version> for only the rates changed since that version.
+    """
+    mimetype = table_mimetype(request.accept_mimetypes)
+
+    version = converter.rates_version()
+    table = rate_tables.get(base_currency, version)
+
+    if table is None:
+        check_currencies(converter, base_currency)
+        resolved = await run_steps(converter.base_table_steps(base_currency))
+        table = cache_table(converter, rate_tables, base_currency, resolved, version)
+
+    status, body, headers = rate_tables.respond(table, mimetype, request.args.get('since'), request.headers)
+    return Response(body, status=status, headers=headers)
+
+@app.route('/swap', methods=['POST'])
+async def swap_currencies():
+    """Swap currencies in a conversion."""
+    amount, from_currency, to_currency = parse_conversion(converter, await request.get_json(silent=True))
+    # One lookup answers both directions
+    return jsonify(swap_payload(await quote(amount, to_currency, from_currency)))
+
+@app.after_serving
+async def shutdown():
+    """Release upstream connections and flush queued history."""
+    await provider.close()
+    await asyncio.to_thread(converter.close)
+
+if __name__ == '__main__':
+    app.run(port=5001)
\ No newline at end of file
@@ -1,57 +1,158 @@
 import sys
 import argparse
 from currency_converter import CurrencyConverter
+from history_archive import HistoryMaintenance, RetentionPolicy
+
+def history_count(value):
+    """Parse --history: a number of records, or 'all' to stream everything."""
+    if value == "all":
+        return None
+    count = int(value)
+    if count < 1:
+        raise argparse.ArgumentTypeError("must be a positive number or 'all'")
+    return count
 
 def main():
     parser = argparse.ArgumentParser(description="Currency Converter CLI")
-    parser.add_argument("amount", type=float, help="Amount to convert")
-    parser.add_argument("from_currency", help="Source currency code (e.g., USD)")
-    parser.add_argument("to_currency", help="Target currency code (e.g., EUR)")
+    parser.add_argument("amount", type=float, nargs="?", help="Amount to convert")
+    parser.add_argument("from_currency", nargs="?", help="Source currency code (e.g., USD)")
+    parser.add_argument("to_currency", nargs="?", help="Target currency code (e.g., EUR)")
     parser.add_argument("--api-key", help="API key for exchange rate service")
     parser.add_argument("--list-currencies", action="store_true", 
                        help="List all supported currencies")
-    parser.add_argument("--history", type=int, nargs="?", const=10,
-                       help="Show conversion history (optional: number of records)")
-    
+    parser.add_argument("--history", type=history_count, nargs="?", const=10, default=False,
+                       metavar="N|all",
+                       help="Show conversion history (optional: number of records, or 'all')")
+    parser.add_argument("--pair", nargs=2, metavar=("FROM", "TO"),
+                       help="Only show history for this currency pair")
+    parser.add_argument("--since", help="Only show history on or after this date (ISO 8601)")
+    parser.add_argument("--until", help="Only show history before this date (ISO 8601)")
+    parser.add_argument("--bulk", nargs="?", const="-", metavar="FILE",
+                       help="Stream rows (amount, from_currency, to_currency) from FILE or stdin")
+    parser.add_argument("--format", choices=["csv", "ndjson"],
+                       help="Bulk input/output format (default: from extension, else csv)")
+    parser.add_argument("--chunk-size", type=int, default=10000,
+                       help="Rows converted per chunk in bulk mode")
+    parser.add_argument("--jobs", type=int, default=1,
+                       help="Worker processes for bulk mode")
+    parser.add_argument("--no-history", action="store_true",
+                       help="Do not record bulk conversions in history")
+    parser.add_argument("--prune", action="store_true",
+                       help="Move history outside the retention limits to monthly archives, then exit")
+    parser.add_argument("--max-age-days", type=float,
+                       help="With --prune: keep this many days of history in the live table")
+    parser.add_argument("--max-rows", type=int,
+                       help="With --prune: keep at most this many rows in the live table")
+    parser.add_argument("--keep-months", type=int,
+                       help="With --prune: delete archives older than this many months")
+    parser.add_argument("--compact", action="store_true",
+                       help="Rebuild the database file (enables incremental vacuum), then exit")
+    parser.add_argument("--stats", action="store_true",
+                       help="Print cache, upstream and SQLite timing stats when done")
+
     args = parser.parse_args()
-    
+
+    maintenance = args.prune or args.compact
+    if args.bulk is None and not args.list_currencies and args.history is False and not maintenance \
+            and None in (args.amount, args.from_currency, args.to_currency):
+        parser.error("amount, from_currency and to_currency are required")
+
     converter = CurrencyConverter(api_key=args.api_key)
-    
+    try:
+        run(args, parser, converter)
+    finally:
+        if args.stats:
+            # Stats go to stderr so they never mix with bulk output
+            print("\nStats:", file=sys.stderr)
+            for line in converter.metrics.summary():
+                print(f"  {line}", file=sys.stderr)
+
+def run(args, parser, converter):
+    """Carry out the requested action."""
+    if args.bulk is not None:
+        # numpy and the streaming machinery are only needed in bulk mode
+        from bulk_convert import detect_format, open_input, stream_convert
+
+        fmt = args.format or detect_format(args.bulk)
+        source = open_input(args.bulk)
+        try:
+            stats = stream_convert(
+                converter, source, sys.stdout, fmt=fmt,
+                chunk_size=args.chunk_size, jobs=args.jobs,
+                save_history=not args.no_history
+            )
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        converter.close()
+        print(f"Converted {stats['rows']} rows ({stats['failed']} failed) in "
+              f"{stats['seconds']:.2f}s: {stats['rows_per_sec']:.0f} rows/sec", file=sys.stderr)
+        return
+
+    if args.prune or args.compact:
+        if args.prune:
+            policy = RetentionPolicy(args.max_age_days, args.max_rows, args.keep_months)
+            archived, dropped, vacuumed = HistoryMaintenance(
+                converter.db_path, converter.archive, policy._replace(pause=0),
+                journal_mode=converter.journal_mode
+            ).run_once()
+            print(f"Archived {archived} history rows, dropped {dropped} archive months, "
+                  f"released {vacuumed} pages")
+        if args.compact:
+            converter.compact()
+            print("Database compacted")
+        return
+
     if args.list_currencies:
         print("\nSupported Currencies:")
         print("-" * 30)
         for currency in converter.get_supported_currencies():
             print(currency)
         return
-    
-    if args.history:
-        history = converter.get_conversion_history(limit=args.history)
-        if not history:
-            print("No conversion history found.")
-        else:
-            print("\nConversion History:")
-            print("-" * 60)
+
+    if args.history is not False:
+        from_currency, to_currency = args.pair or (None, None)
+        try:
+            # Stream page by page so 'all' never holds the whole table in memory
+            history = converter.iter_history(
+                page_size=min(args.history or 1000, 1000),
+                from_currency=from_currency, to_currency=to_currency,
+                since=args.since, until=args.until
+            )
+            count = 0
             for record in history:
+                if count == 0:
+                    print("\nConversion History:")
+                    print("-" * 60)
                 amount, from_curr, to_curr, result, date = record
                 print(f"{date}: {amount:.2f} {from_curr} → {result:.2f} {to_curr}")
+                count += 1
+                if count == args.history:
+                    break
+        except ValueError as e:
+            parser.error(str(e))
+        if count == 0:
+            print("No conversion history found.")
         return
-    
+
     # Perform conversion
     try:
-        result = converter.convert(args.amount, args.from_currency, args.to_currency)
-        
-        if result is not None:
-            print(f"\n{args.amount:.2f} {args.from_currency} = {result:.2f} {args.to_currency}")
-            
-            # Show rate
-            rate = converter.get_exchange_rate(args.from_currency, args.to_currency)
-            if rate:
-                print(f"Exchange Rate: 1 {args.from_currency} = {rate:.4f} {args.to_currency}")
+        quote = converter.quote(args.amount, args.from_currency, args.to_currency)
+
+        if quote is not None:
+            print(f"\n{args.amount:.2f} {args.from_currency} = {quote.result:.2f} {args.to_currency}")
+
+            # Show both rates, and the currencies the rate was chained through if not direct
+            print(f"Exchange Rate: 1 {args.from_currency} = {quote.rate:.4f} {args.to_currency}")
+            if quote.inverse is not None:
+                print(f"Inverse Rate: 1 {args.to_currency} = {quote.inverse:.4f} {args.from_currency}")
+            if len(quote.path) > 2:
+                print(f"Via: {' -> '.join(quote.path)}")
         else:
             print(f"Error: Could not convert {args.from_currency} to {args.to_currency}")
             print("Please check currency codes and try again.")
             sys.exit(1)
-    
+
     except Exception as e:
         print(f"Error: {e}")
         sys.exit(1)
@@ -0,0 +1,64 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable
+
+# Active ISO 4217 alphabetic codes, including funds and precious metals
+ISO_4217_CODES = frozenset("""
+AED AFN ALL AMD ANG AOA ARS AUD AWG AZN BAM BBD BDT BGN BHD BIF BMD BND BOB BOV
+BRL BSD BTN BWP BYN BZD CAD CDF CHE CHF CHW CLF CLP CNY COP COU CRC CUC CUP CVE
+CZK DJF DKK DOP DZD EGP ERN ETB EUR FJD FKP GBP GEL GHS GIP GMD GNF GTQ GYD HKD
+HNL HTG HUF IDR ILS INR IQD IRR ISK JMD JOD JPY KES KGS KHR KMF KPW KRW KWD KYD
+KZT LAK LBP LKR LRD LSL LYD MAD MDL MGA MKD MMK MNT MOP MRU MUR MVR MWK MXN MXV
+MYR MZN NAD NGN NIO NOK NPR NZD OMR PAB PEN PGK PHP PKR PLN PYG QAR RON RSD RUB
+RWF SAR SBD SCR SDG SEK SGD SHP SLE SLL SOS SRD SSP STN SVC SYP SZL THB TJS TMT
+TND TOP TRY TTD TWD TZS UAH UGX USD USN UYI UYU UYW UZS VED VES VND VUV WST XAF
+XAG XAU XBA XBB XBC XBD XCD XCG XDR XOF XPD XPF XPT XSU XUA YER ZAR ZMW ZWG ZWL
+""".split())
+
+
+def is_iso_code(code) -> bool:
+    """Return True if code is an active ISO 4217 currency code."""
+    return isinstance(code, str) and code in ISO_4217_CODES
+
+
+class NegativeCache:
+    """
+    Remembers failed lookups (unknown codes, unresolvable pairs) for ttl
+    seconds so they fail fast instead of going back to the provider.
+    The oldest entries are evicted once max_entries is reached, so a
+    client sending garbage cannot grow it without bound.
+    """
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self._entries: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, key: Hashable):
+        """Record a failure for key."""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = time.monotonic() + self.ttl
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: Hashable):
+        """Forget a recorded failure."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __contains__(self, key: Hashable) -> bool:
+        expires = self._entries.get(key)
+        if expires is None:
+            return False
+        if expires < time.monotonic():
+            self.discard(key)
+            return False
+        self.hits += 1
+        return True
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,176 +1,971 @@
-import requests
-import json
 from datetime import datetime
-import sqlite3
-from typing import Optional, Dict, Tuple
-import tkinter as tk
-from tkinter import ttk, messagebox
-import sys
+from typing import Optional, Dict, Iterator, List, Sequence, Tuple, Union
+import base64
+import logging
+import threading
+import time
+
+from currency_codes import NegativeCache, is_iso_code
+from db_pool import ConnectionPool
+from hedged_provider import AsyncHedgedProvider, HedgedProvider, source_clients
+from history_archive import HistoryArchive, HistoryMaintenance, RetentionPolicy, merge_pages, month_bounds
+from history_rollups import create_rollup_tables, insert_history, top_pairs, volume
+from history_writer import HistoryWriter
+from metrics import Metrics
+from quote import Quote
+from rate_engine import RateMatrix
+from rate_events import RateEventBus
+from rate_provider import (DEFAULT_BASE_URL, AsyncRateProviderClient, RateProviderClient,
+                           RateProviderError, RateTable)
+from rate_refresher import RateRefresher
+from shared_rates import SnapshotReader, write_snapshot
+from single_flight import SingleFlight
+
+# Values accepted by SQLite's journal_mode and synchronous pragmas
+JOURNAL_MODES = ("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF")
+SYNCHRONOUS_LEVELS = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+# Largest page query_history will return
+MAX_HISTORY_PAGE = 1000
+
+logger = logging.getLogger(__name__)
 
 class CurrencyConverter:
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, db_path: str = 'currency_converter.db',
+                 journal_mode: str = "WAL", synchronous: str = "NORMAL",
+                 write_behind: bool = False, pool_size: int = 8,
+                 rate_ttl: float = 3600.0, max_staleness: float = 86400.0,
+                 background_refresh: bool = False, base_url: str = DEFAULT_BASE_URL,
+                 negative_ttl: float = 300.0, trace_spans: bool = False,
+                 rate_snapshot: Optional[str] = None, publish_snapshot: Optional[str] = None,
+                 history_retention: Optional[RetentionPolicy] = None,
+                 backup_urls: Sequence[str] = ()):
         """
         Initialize the currency converter.
         If no API key provided, uses free API with limitations.
+        journal_mode and synchronous tune the SQLite database; WAL with
+        NORMAL syncs once per checkpoint instead of once per commit.
+        write_behind moves history inserts to a background thread.
+        pool_size caps the SQLite connections shared by request threads.
+        Rates are fresh for rate_ttl seconds and never served past
+        max_staleness; background_refresh serves stale rates while a
+        scheduler thread refetches them and renews hot bases ahead of expiry.
+        base_url points the pooled provider client at another rate source.
+        Unknown codes and unresolvable pairs are not retried upstream for
+        negative_ttl seconds.
+        Counters and latency histograms are kept in metrics; trace_spans
+        turns on per-request timing spans (also switchable at runtime via
+        metrics.spans_enabled).
+        rate_snapshot makes the converter read rates from a shared,
+        memory-mapped snapshot file (see shared_rates.py) instead of
+        loading them from SQLite, and follow it as it is replaced;
+        publish_snapshot makes it write that file whenever its rates change.
+        history_retention bounds the live history table; older rows move to
+        monthly archive databases in the background (see history_archive.py)
+        and history queries read across both.
+        backup_urls lists further rate sources, in order of preference: a
+        fetch the primary has not answered within its adaptive hedge delay
+        is also sent to the next source, and a failing source is skipped
+        by its circuit breaker (see hedged_provider.py).
         """
+        journal_mode = journal_mode.upper()
+        synchronous = synchronous.upper()
+        if journal_mode not in JOURNAL_MODES:
+            raise ValueError(f"journal_mode must be one of {', '.join(JOURNAL_MODES)}")
+        if synchronous not in SYNCHRONOUS_LEVELS:
+            raise ValueError(f"synchronous must be one of {', '.join(SYNCHRONOUS_LEVELS)}")
+        if max_staleness < rate_ttl:
+            raise ValueError("max_staleness must not be shorter than rate_ttl")
+        
         self.api_key = api_key
-        self.base_url = "https://api.exchangerate-api.com/v4/latest/"
-        self.rates = {}
+        # Created on first fetch so runs served from cache never import requests
+        self._base_url = base_url
+        self.backup_urls = list(backup_urls)
+        self._provider = None
+        # Asyncio transport to the same sources, for the ASGI server
+        self._async_provider = None
+        self._provider_lock = threading.Lock()
+        self.db_path = db_path
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.pool_size = pool_size
+        self.rate_ttl = rate_ttl
+        self.max_staleness = max_staleness
+        self.rates = RateMatrix()
         self.last_update = None
+        self.history_writer = None
+        self.history_maintenance = None
+        self.archive = HistoryArchive(db_path)
+        self.refresher = None
+        self.flights = SingleFlight()
+        self.unknown_codes = NegativeCache(ttl=negative_ttl)
+        self.failed_pairs = NegativeCache(ttl=negative_ttl)
+        self.metrics = Metrics(spans_enabled=trace_spans)
+        self._init_metrics()
+        self.snapshot = SnapshotReader(rate_snapshot) if rate_snapshot else None
+        # Rate changes for streaming clients; followers check the snapshot while anyone listens
+        self.events = RateEventBus(poll=self.sync_snapshot if self.snapshot is not None else None)
+        self.publish_snapshot = publish_snapshot
+        self._publish_lock = threading.Lock()
         self.initialize_database()
-        self.load_cached_rates()
+        # Workers following a shared snapshot skip the SQLite rate load
+        if self.snapshot is None or not self.sync_snapshot():
+            self.load_cached_rates()
+        
+        if background_refresh:
+            self.refresher = RateRefresher(
+                self.fetch_base_rates,
+                lambda base: self.rates.age(base),
+                ttl=rate_ttl
+            )
+            self.refresher.start()
+        
+        if write_behind:
+            self.enable_write_behind()
+        
+        if history_retention is not None:
+            self.enable_history_maintenance(history_retention)
+    
+    def _init_metrics(self):
+        """Create the hot-path metrics up front so updating them is just an increment."""
+        m = self.metrics
+        lookups = "Rate lookups by how the in-memory matrix answered"
+        self._lookup_hit = m.counter("currency_rate_lookups_total", lookups, result="hit")
+        self._lookup_stale = m.counter("currency_rate_lookups_total", lookups, result="stale")
+        self._lookup_miss = m.counter("currency_rate_lookups_total", lookups, result="miss")
+        self._cross_rates = m.counter(
+            "currency_cross_rate_lookups_total", "Rates resolved through one or more pivot currencies' tables"
+        )
+        self._usd_fallbacks = m.counter(
+            "currency_usd_fallbacks_total", "Misses that fell back to fetching the USD table"
+        )
+        fetch = "Upstream rate table fetch latency in seconds"
+        self._fetch_ok = m.histogram("currency_upstream_fetch_seconds", fetch, outcome="ok")
+        self._fetch_not_modified = m.histogram("currency_upstream_fetch_seconds", fetch,
+                                               outcome="not_modified")
+        self._fetch_error = m.histogram("currency_upstream_fetch_seconds", fetch, outcome="error")
+        commit = "SQLite write transaction latency in seconds"
+        self._commit_rates = m.histogram("currency_sqlite_commit_seconds", commit, op="cache_rates")
+        self._commit_touch = m.histogram("currency_sqlite_commit_seconds", commit, op="touch_rates")
+        self._commit_history = m.histogram("currency_sqlite_commit_seconds", commit, op="history")
+        self._commit_history_batch = m.histogram("currency_sqlite_commit_seconds", commit,
+                                                 op="history_batch")
+        m.add_collector(self._collect_metrics)
+    
+    def _collect_metrics(self):
+        """Scrape-time samples for state other objects already track."""
+        samples = [
+            ("currency_rate_bases", "gauge", "Base currency tables held in memory", {},
+             len(self.rates.vectors)),
+            ("currency_negative_cache_hits_total", "counter", "Lookups answered by a negative cache",
+             {"cache": "unknown_codes"}, self.unknown_codes.hits),
+            ("currency_negative_cache_hits_total", "counter", "Lookups answered by a negative cache",
+             {"cache": "failed_pairs"}, self.failed_pairs.hits),
+        ]
+        for key, value in self.flights.stats().items():
+            samples.append(("currency_upstream_flights_total", "counter",
+                            "Upstream fetches executed or coalesced into one in flight",
+                            {"result": key}, value))
+        if self._provider is not None:
+            providers = [p for p in (self._provider, self._async_provider) if p is not None]
+            samples += [
+                ("currency_upstream_requests_total", "counter", "HTTP requests sent to the provider",
+                 {}, sum(p.requests_sent for p in providers)),
+                ("currency_upstream_not_modified_total", "counter", "Provider 304 responses",
+                 {}, sum(p.not_modified for p in providers)),
+            ]
+            # Sources are shared, so this covers fetches over either transport
+            samples += self._provider.collect_metrics()
+        samples += self.events.collect_metrics()
+        if self.snapshot is not None:
+            samples.append(("currency_rate_snapshot_reloads_total", "counter",
+                            "Shared rate snapshots mapped by this process", {}, self.snapshot.reloads))
+        writer = self.history_writer
+        if writer is not None:
+            samples += [
+                ("currency_history_queue_rows", "gauge", "History rows queued by the write-behind writer",
+                 {}, len(writer.pending_rows())),
+                ("currency_history_rows_total", "counter", "History rows handled by the write-behind writer",
+                 {"result": "written"}, writer.written),
+                ("currency_history_rows_total", "counter", "History rows handled by the write-behind writer",
+                 {"result": "dropped"}, writer.dropped),
+            ]
+        maintenance = self.history_maintenance
+        if maintenance is not None:
+            samples += [
+                ("currency_history_archived_rows_total", "counter",
+                 "History rows moved from the live table to monthly archives", {}, maintenance.archived),
+                ("currency_history_archives_dropped_total", "counter",
+                 "Monthly history archives deleted by retention", {}, maintenance.dropped_months),
+                ("currency_sqlite_vacuumed_pages_total", "counter",
+                 "Pages released by incremental vacuum", {}, maintenance.vacuumed_pages),
+            ]
+        return samples
     
     def initialize_database(self):
         """Initialize SQLite database for storing rates and history."""
-        self.conn = sqlite3.connect('currency_converter.db')
-        self.cursor = self.conn.cursor()
-        
-        # Create tables if they don't exist
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS exchange_rates (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                currency_pair TEXT UNIQUE,
-                rate REAL,
-                last_updated TIMESTAMP
-            )
-        ''')
-        
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS conversion_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                amount REAL,
-                from_currency TEXT,
-                to_currency TEXT,
-                result REAL,
-                conversion_date TIMESTAMP
-            )
-        ''')
+        self.pool = ConnectionPool(self.db_path, size=self.pool_size, synchronous=self.synchronous)
         
-        self.conn.commit()
+        with self.pool.connection() as conn:
+            # Lets history pruning hand space back in small steps; only takes
+            # effect on a new database (see compact() for existing ones)
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            
+            # Tune durability vs. commit cost
+            conn.execute(f"PRAGMA journal_mode={self.journal_mode}")
+            
+            # Create tables if they don't exist
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS exchange_rates (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    currency_pair TEXT UNIQUE,
+                    rate REAL,
+                    last_updated TIMESTAMP
+                )
+            ''')
+            
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS conversion_history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    amount REAL,
+                    from_currency TEXT,
+                    to_currency TEXT,
+                    result REAL,
+                    conversion_date TIMESTAMP
+                )
+            ''')
+            
+            # History is read newest first, optionally for one pair; id breaks
+            # ties between rows written in the same batch
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_history_date
+                ON conversion_history (conversion_date, id)
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_history_pair_date
+                ON conversion_history (from_currency, to_currency, conversion_date, id)
+            ''')
+            
+            # Per-pair hourly/daily totals, maintained as history is written
+            create_rollup_tables(conn)
+            
+            conn.commit()
+        
+        # Every later connection gets the journal mode too: MEMORY and OFF
+        # only last per connection. Not applied before this point, since
+        # switching to WAL first would stop auto_vacuum taking effect.
+        self.pool.journal_mode = self.journal_mode
     
     def load_cached_rates(self):
-        """Load cached exchange rates from database."""
-        self.cursor.execute("SELECT currency_pair, rate FROM exchange_rates")
-        rows = self.cursor.fetchall()
-        self.rates = {row[0]: row[1] for row in rows}
+        """Load cached exchange rates from database into a fresh rate matrix."""
+        with self.pool.connection() as conn:
+            rows = conn.execute("SELECT currency_pair, rate, last_updated FROM exchange_rates").fetchall()
+        
+        # Group rows into one table per base currency
+        tables = {}
+        for currency_pair, rate, last_updated in rows:
+            from_currency, _, to_currency = currency_pair.partition("_")
+            if not to_currency or rate is None:
+                continue
+            table, updated = tables.get(from_currency, ({}, None))
+            table[to_currency] = rate
+            row_updated = self._parse_timestamp(last_updated)
+            if row_updated and (updated is None or row_updated > updated):
+                updated = row_updated
+            tables[from_currency] = (table, updated)
+        
+        rates = RateMatrix()
+        for base, (table, updated) in tables.items():
+            rates.set_base_rates(base, table, updated)
+        
+        # Publish the new matrix in one step so readers never see a partial load
+        self.rates = rates
+    
+    @staticmethod
+    def _parse_timestamp(value) -> Optional[datetime]:
+        """Parse a timestamp column written by sqlite3's datetime adapter."""
+        if isinstance(value, datetime):
+            return value
+        try:
+            return datetime.fromisoformat(value) if value else None
+        except (TypeError, ValueError):
+            return None
+    
+    def sync_snapshot(self) -> bool:
+        """Switch to the shared snapshot if a new one was published; True if it switched."""
+        matrix = self.snapshot.poll()
+        if matrix is None:
+            return False
+        
+        # Carry over tables this process fetched itself that are newer than
+        # the snapshot's (snapshot vectors are memoryviews, local ones arrays)
+        old = self.rates
+        for idx, vector in list(old.vectors.items()):
+            if isinstance(vector, memoryview):
+                continue
+            base = old.codes[idx]
+            updated = old.updated[idx]
+            new_idx = matrix.index.get(base)
+            if new_idx is None or new_idx not in matrix.updated or matrix.updated[new_idx] < updated:
+                matrix.set_base_rates(base, old.base_rates(base), updated)
+        
+        self.rates = matrix
+        for idx, updated in list(matrix.updated.items()):
+            base = matrix.codes[idx]
+            old_idx = old.index.get(base)
+            if old_idx is None or old.updated.get(old_idx) != updated:
+                self.announce_rates(base, old.base_rates(base) if self.events.subscribers else None, matrix)
+        return True
+    
+    def rates_version(self) -> int:
+        """
+        Version of the rates lookups would use now; it changes whenever a
+        table is stored or a new shared snapshot is picked up.
+        """
+        if self.snapshot is not None:
+            self.sync_snapshot()
+        return self.rates.version
+    
+    def announce_rates(self, base_currency: str, previous: Optional[Dict[str, float]], matrix: RateMatrix):
+        """
+        Publish a rate event if a base table now differs from previous.
+        Callers pass previous=None when nobody was subscribed, to skip
+        copying the table.
+        """
+        if previous is None or not self.events.subscribers:
+            self.events.skip()
+            return
+        from rate_tables import diff_tables, table_version
+        
+        current = matrix.base_rates(base_currency)
+        changed, _ = diff_tables(previous, current)
+        if not changed:
+            return
+        self.events.publish(
+            base_currency, matrix.updated[matrix.index[base_currency]], table_version(current),
+            table_version(previous) if previous else None, changed
+        )
+    
+    def publish_rates(self):
+        """Write the current rates to the shared snapshot file, if publishing."""
+        if not self.publish_snapshot:
+            return
+        with self._publish_lock:
+            write_snapshot(self.publish_snapshot, self.rates, time.time_ns())
     
     def get_exchange_rate(self, from_currency: str, to_currency: str) -> Optional[float]:
         """
         Get exchange rate between two currencies.
         Returns rate or None if not available.
         """
-        # If same currency
-        if from_currency == to_currency:
-            return 1.0
-        
-        # Check cache first
-        pair = f"{from_currency}_{to_currency}"
-        if pair in self.rates:
-            return self.rates[pair]
-        
-        # Try to get from API
-        rate = self.fetch_rate_from_api(from_currency, to_currency)
-        if rate:
-            self.cache_rate(pair, rate)
-            return rate
-        
-        # Try reverse rate
-        reverse_pair = f"{to_currency}_{from_currency}"
-        if reverse_pair in self.rates:
-            return 1 / self.rates[reverse_pair]
-        
-        # Try through USD
-        if from_currency != "USD" and to_currency != "USD":
-            usd_from = self.get_exchange_rate(from_currency, "USD")
-            usd_to = self.get_exchange_rate("USD", to_currency)
-            if usd_from and usd_to:
-                rate = usd_from * usd_to
-                self.cache_rate(pair, rate)
-                return rate
+        resolved = self.resolve_rate(from_currency, to_currency)
+        return resolved[0] if resolved is not None else None
+    
+    def resolve_rate(self, from_currency: str, to_currency: str) -> Optional[Tuple[float, float]]:
+        """
+        Get (rate, age in seconds) between two currencies, or None.
+        Rates older than rate_ttl are served immediately while a background
+        refresh runs (or refreshed inline when background refresh is off).
+        Rates older than max_staleness are never served.
+        """
+        resolved = self.run_steps(self.resolution_steps(from_currency, to_currency))
+        return resolved[:2] if resolved is not None else None
+    
+    def resolve_route(self, from_currency: str, to_currency: str) -> Optional[Tuple[float, float, Tuple[str, ...]]]:
+        """
+        Like resolve_rate, but returns (rate, age, path), where path lists
+        the currencies the rate was chained through, e.g. ("GBP", "USD", "JPY").
+        """
+        return self.run_steps(self.resolution_steps(from_currency, to_currency))
+    
+    def get_base_table(self, base_currency: str) -> Optional[Tuple[Dict[str, float], datetime]]:
+        """
+        Get (rates, updated) for a whole base table, or None. Freshness is
+        handled as in resolve_rate.
+        """
+        return self.run_steps(self.base_table_steps(base_currency))
+    
+    def run_steps(self, steps):
+        """Drive a resolution generator, fetching every base it yields."""
+        try:
+            base = next(steps)
+            while True:
+                base = steps.send(self.fetch_base_rates(base))
+        except StopIteration as done:
+            return done.value
+    
+    def resolution_steps(self, from_currency: str, to_currency: str):
+        """
+        Rate resolution logic shared by the sync and async servers.
+        A generator that yields each base currency it needs fetched and
+        expects the fetched rates (or None) to be sent back; its return
+        value is (rate, age, path) or None. It does no network I/O itself.
+        """
+        tried = set()
+        stale = None
+        
+        if self.snapshot is not None:
+            self.sync_snapshot()
+        
+        # Direct, inverse or cross rate (through any chain of cached tables)
+        # from the in-memory matrix
+        route = self.rates.route(from_currency, to_currency)
+        if route is not None:
+            rate, path, base, updated = route
+            age = self._age(updated)
+            if self.refresher is not None:
+                self.refresher.touch(base)
+            if len(path) > 2:
+                self._cross_rates.inc()
+            if age <= self.rate_ttl:
+                self._lookup_hit.inc()
+                return rate, age, path
+            self._lookup_stale.inc()
+            if age <= self.max_staleness:
+                if self.refresher is not None:
+                    # Stale-while-revalidate
+                    self.refresher.request(base)
+                    return rate, age, path
+                stale = (rate, age, path)
+            
+            # Refresh the oldest table the expired rate depends on; if the
+            # route still depends on an expired table, refresh that one next
+            while base not in tried:
+                tried.add(base)
+                if (yield base) is None:
+                    break
+                route = self.rates.route(from_currency, to_currency)
+                if route is None:
+                    break
+                rate, path, base, updated = route
+                age = self._age(updated)
+                if age <= self.rate_ttl:
+                    return rate, age, path
+                if age <= self.max_staleness:
+                    stale = (rate, age, path)
+            if stale is not None:
+                return stale
+        else:
+            self._lookup_miss.inc()
         
+        # Fail fast on bad codes and recently failed pairs, before any network I/O
+        if self.unsupported_currencies(from_currency, to_currency):
+            return None
+        if (from_currency, to_currency) in self.failed_pairs:
+            return None
+        
+        # Fetch the source table, then fall back to the USD table as a pivot
+        transient = False
+        for base in (from_currency, "USD"):
+            if base in tried:
+                continue
+            tried.add(base)
+            if base == "USD":
+                if self.rates.has_base("USD"):
+                    continue
+                self._usd_fallbacks.inc()
+            if (yield base) is not None:
+                route = self.rates.route(from_currency, to_currency)
+                # A cross route may still lead through another expired table
+                if route is not None and self._age(route.updated) <= self.max_staleness:
+                    return route.rate, self._age(route.updated), route.path
+            elif base not in self.unknown_codes:
+                transient = True
+        
+        # Only remember the failure if the provider answered definitively
+        if not transient:
+            self.failed_pairs.add((from_currency, to_currency))
         return None
     
+    def base_table_steps(self, base_currency: str):
+        """
+        resolution_steps for a whole base table: yields the base if it has
+        to be fetched and returns (rates, updated) or None.
+        """
+        if self.snapshot is not None:
+            self.sync_snapshot()
+        
+        stale = None
+        matrix = self.rates
+        idx = matrix.index.get(base_currency)
+        updated = matrix.updated.get(idx) if idx is not None else None
+        if updated is not None:
+            age = self._age(updated)
+            if self.refresher is not None:
+                self.refresher.touch(base_currency)
+            table = (matrix.base_rates(base_currency), updated)
+            if age <= self.rate_ttl:
+                return table
+            if age <= self.max_staleness:
+                if self.refresher is not None:
+                    # Stale-while-revalidate
+                    self.refresher.request(base_currency)
+                    return table
+                stale = table
+        elif self.unsupported_currencies(base_currency):
+            return None
+        
+        if (yield base_currency) is not None:
+            matrix = self.rates
+            idx = matrix.index.get(base_currency)
+            if idx is not None and idx in matrix.updated:
+                return matrix.base_rates(base_currency), matrix.updated[idx]
+        return stale
+    
+    def unsupported_currencies(self, *codes: str) -> List[str]:
+        """
+        Return the codes that cannot be converted: neither ISO 4217 nor
+        served by the provider, or recently rejected by the provider.
+        """
+        return [
+            code for code in codes
+            if not isinstance(code, str)
+            or (not is_iso_code(code) and code not in self.rates.index)
+            or code in self.unknown_codes
+        ]
+    
+    @property
+    def provider(self) -> HedgedProvider:
+        """Pooled provider clients for the primary and backup sources, created on first use."""
+        if self._provider is None:
+            with self._provider_lock:
+                if self._provider is None:
+                    self._provider = HedgedProvider(source_clients(
+                        RateProviderClient, self._base_url, self.api_key, self.backup_urls
+                    ))
+        return self._provider
+    
+    def async_provider(self) -> AsyncHedgedProvider:
+        """
+        Asyncio provider for the same sources as provider, created on first
+        use. The two share circuit breakers, latency windows and metrics,
+        so a source that fails over one transport is skipped by both.
+        The caller closes it.
+        """
+        sources = self.provider.sources
+        with self._provider_lock:
+            if self._async_provider is None:
+                self._async_provider = AsyncHedgedProvider(
+                    source_clients(AsyncRateProviderClient, self._base_url, self.api_key, self.backup_urls),
+                    sources=sources
+                )
+        return self._async_provider
+    
+    @property
+    def base_url(self) -> str:
+        """Primary provider URL that base currency codes are appended to."""
+        return self._base_url
+    
+    @base_url.setter
+    def base_url(self, value: str):
+        self._base_url = value
+        for provider in (self._provider, self._async_provider):
+            if provider is not None:
+                provider.base_url = value
+    
+    @staticmethod
+    def _age(updated: datetime) -> float:
+        """Return the age of a rate table in seconds."""
+        return max((datetime.now() - updated).total_seconds(), 0.0)
+    
     def fetch_rate_from_api(self, from_currency: str, to_currency: str) -> Optional[float]:
         """
         Fetch exchange rate from API.
         Uses free API (no key needed for basic usage).
         """
+        rates = self.fetch_base_rates(from_currency)
+        if rates is None:
+            return None
+        return rates.get(to_currency)
+    
+    def fetch_base_rates(self, base_currency: str) -> Optional[Dict[str, float]]:
+        """
+        Fetch the full rate table for a base currency and cache it.
+        Returns the rates keyed by currency code, or None on failure.
+        Concurrent fetches of the same base share a single upstream request.
+        """
+        return self.flights.do(base_currency, self._fetch_base_rates, base_currency)
+    
+    def _fetch_base_rates(self, base_currency: str) -> Optional[Dict[str, float]]:
+        """Download and store one base table (called once per in-flight base)."""
+        start = time.perf_counter()
         try:
-            if self.api_key:
-                # If you have a paid API key
-                url = f"{self.base_url}{from_currency}?api_key={self.api_key}"
-            else:
-                # Free API (limited requests)
-                url = f"{self.base_url}{from_currency}"
-            
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            if to_currency in data.get('rates', {}):
-                rate = data['rates'][to_currency]
-                self.last_update = datetime.now()
-                
-                # Cache all rates from this response
-                for curr, curr_rate in data['rates'].items():
-                    pair = f"{from_currency}_{curr}"
-                    self.cache_rate(pair, curr_rate)
-                
-                return rate
-        
-        except requests.exceptions.RequestException as e:
-            print(f"API Error: {e}")
+            with self.metrics.span("upstream"):
+                table = self.provider.fetch(base_currency)
+        except RateProviderError as e:
+            self.record_fetch_latency(None, time.perf_counter() - start)
+            self.record_fetch_error(base_currency, e)
+            return None
         
-        return None
+        self.record_fetch_latency(table, time.perf_counter() - start)
+        return self.ingest_table(table)
     
-    def cache_rate(self, currency_pair: str, rate: float):
-        """Cache exchange rate in database."""
-        self.rates[currency_pair] = rate
-        
-        self.cursor.execute('''
-            INSERT OR REPLACE INTO exchange_rates 
-            (currency_pair, rate, last_updated) 
-            VALUES (?, ?, ?)
-        ''', (currency_pair, rate, datetime.now()))
+    def record_fetch_latency(self, table: Optional[RateTable], seconds: float):
+        """Observe one upstream fetch; table is None if it failed."""
+        if table is None:
+            self._fetch_error.observe(seconds)
+        elif table.not_modified:
+            self._fetch_not_modified.observe(seconds)
+        else:
+            self._fetch_ok.observe(seconds)
+    
+    def record_fetch_error(self, base_currency: str, error: Exception):
+        """Log a failed fetch and negative-cache codes the provider rejected."""
+        logger.warning("API Error: %s", error)
+        if getattr(error, 'status', None) in (400, 404):
+            # Provider does not know this base currency
+            self.unknown_codes.add(base_currency)
+    
+    def ingest_table(self, table: RateTable) -> Dict[str, float]:
+        """Store a fetched base table in the rate matrix and the database."""
+        self.last_update = datetime.now()
+        matrix = self.rates
+        previous = matrix.base_rates(table.base) if self.events.subscribers else None
+        matrix.set_base_rates(table.base, table.rates, self.last_update)
+        if not table.not_modified:
+            self.announce_rates(table.base, previous, matrix)
+        
+        if table.not_modified:
+            # Revalidated: only the timestamps need to move
+            self.touch_cached_rates(table.base, self.last_update)
+        else:
+            # Cache all rates from this response in one transaction
+            self.cache_rates(table.base, table.rates, update_matrix=False)
         
-        self.conn.commit()
+        self.publish_rates()
+        return table.rates
     
-    def convert(self, amount: float, from_currency: str, to_currency: str) -> Optional[float]:
-        """Convert amount from one currency to another."""
-        rate = self.get_exchange_rate(from_currency, to_currency)
+    def touch_cached_rates(self, base_currency: str, updated: datetime):
+        """Mark a cached base table as revalidated at the given time."""
+        with self.metrics.span("db_touch"), self._commit_touch.time(), \
+                self.pool.connection() as conn, conn:
+            prefix = f"{base_currency}_"
+            conn.execute('''
+                UPDATE exchange_rates SET last_updated = ?
+                WHERE substr(currency_pair, 1, ?) = ?
+            ''', (updated, len(prefix), prefix))
+    
+    def cache_rate(self, currency_pair: str, rate: float, update_matrix: bool = True):
+        """Cache exchange rate in database."""
+        if update_matrix:
+            from_currency, _, to_currency = currency_pair.partition("_")
+            matrix = self.rates
+            previous = matrix.base_rates(from_currency) if self.events.subscribers else None
+            matrix.set_rate(from_currency, to_currency, rate)
+            self.announce_rates(from_currency, previous, matrix)
+        
+        with self.pool.connection() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO exchange_rates 
+                (currency_pair, rate, last_updated) 
+                VALUES (?, ?, ?)
+            ''', (currency_pair, rate, datetime.now()))
+            
+            conn.commit()
+    
+    def cache_rates(self, base_currency: str, rates: Dict[str, float],
+                    update_matrix: bool = True):
+        """Cache a full rate table for one base currency in a single transaction."""
+        now = datetime.now()
+        if update_matrix:
+            matrix = self.rates
+            previous = matrix.base_rates(base_currency) if self.events.subscribers else None
+            matrix.set_base_rates(base_currency, rates, now)
+            self.announce_rates(base_currency, previous, matrix)
+        
+        with self.metrics.span("db_rates"), self._commit_rates.time(), \
+                self.pool.connection() as conn, conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO exchange_rates 
+                (currency_pair, rate, last_updated) 
+                VALUES (?, ?, ?)
+            ''', [(f"{base_currency}_{curr}", curr_rate, now)
+                  for curr, curr_rate in rates.items()])
+        
+        if update_matrix:
+            self.publish_rates()
+    
+    def quote(self, amount: float, from_currency: str, to_currency: str,
+              save_history: bool = True) -> Optional[Quote]:
+        """
+        Convert amount with a single rate lookup. Returns a Quote with the
+        result, the rate and its inverse, the rate's age and route, or None
+        if no rate is available. The conversion is saved to history unless
+        save_history is False.
+        """
+        resolved = self.resolve_route(from_currency, to_currency)
         
-        if rate is None:
+        if resolved is None:
             return None
         
-        result = amount * rate
+        quote = Quote.from_route(amount, from_currency, to_currency, *resolved)
         
-        # Save to history
-        self.save_conversion_history(amount, from_currency, to_currency, result)
+        if save_history:
+            self.save_conversion_history(amount, from_currency, to_currency, quote.result)
         
-        return result
+        return quote
+    
+    def convert(self, amount: float, from_currency: str, to_currency: str) -> Optional[float]:
+        """Convert amount from one currency to another."""
+        quote = self.quote(amount, from_currency, to_currency)
+        return quote.result if quote is not None else None
+    
+    def convert_many(self, amounts: Sequence[float], from_currencies: Sequence[str],
+                     to_currencies: Sequence[str], save_history: bool = True) -> "np.ndarray":
+        """
+        Convert many amounts in one call.
+        Each distinct currency pair is resolved once and all amounts are
+        multiplied in a single vectorized step. Returns an array of results
+        with NaN where the pair could not be resolved.
+        """
+        import numpy as np
+        
+        amounts = np.asarray(amounts, dtype=float)
+        if not len(amounts) == len(from_currencies) == len(to_currencies):
+            raise ValueError("amounts, from_currencies and to_currencies must have the same length")
+        
+        # Resolve every distinct pair once
+        pair_rates = {}
+        for pair in zip(from_currencies, to_currencies):
+            if pair not in pair_rates:
+                rate = self.get_exchange_rate(*pair)
+                pair_rates[pair] = np.nan if rate is None else rate
+        
+        rates = np.fromiter(
+            (pair_rates[pair] for pair in zip(from_currencies, to_currencies)),
+            dtype=float,
+            count=len(amounts)
+        )
+        results = amounts * rates
+        
+        if save_history:
+            ok = ~np.isnan(results)
+            self.save_conversion_history_many([
+                (amount, from_currency, to_currency, result)
+                for amount, from_currency, to_currency, result, valid
+                in zip(amounts.tolist(), from_currencies, to_currencies, results.tolist(), ok.tolist())
+                if valid
+            ])
+        
+        return results
+    
+    def enable_write_behind(self, batch_size: int = 500, flush_interval: float = 1.0,
+                            max_queue: int = 10000, backpressure: str = "block"):
+        """
+        Queue history rows in memory and write them from a background thread.
+        See HistoryWriter for the durability window and backpressure policies.
+        """
+        if self.history_writer is None:
+            self.history_writer = HistoryWriter(
+                self.db_path,
+                batch_size=batch_size,
+                flush_interval=flush_interval,
+                max_queue=max_queue,
+                backpressure=backpressure,
+                synchronous=self.synchronous,
+                journal_mode=self.journal_mode,
+                commit_histogram=self._commit_history_batch
+            )
+    
+    def enable_history_maintenance(self, policy: RetentionPolicy, interval: float = 600.0):
+        """Apply a retention policy to the history every interval seconds in the background."""
+        if self.history_maintenance is not None:
+            self.history_maintenance.stop()
+        self.history_maintenance = HistoryMaintenance(self.db_path, self.archive, policy, interval,
+                                                      journal_mode=self.journal_mode)
+        self.history_maintenance.start()
+    
+    def compact(self):
+        """
+        Rebuild the database with VACUUM, switching an existing database to
+        incremental auto-vacuum. Holds an exclusive lock for the duration,
+        so run it in a maintenance window, not from a server.
+        """
+        with self.pool.connection() as conn:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
     
     def save_conversion_history(self, amount: float, from_currency: str, 
                                to_currency: str, result: float):
         """Save conversion to history database."""
-        self.cursor.execute('''
-            INSERT INTO conversion_history 
-            (amount, from_currency, to_currency, result, conversion_date)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (amount, from_currency, to_currency, result, datetime.now()))
+        row = (amount, from_currency, to_currency, result, datetime.now())
+        
+        if self.history_writer is not None:
+            self.history_writer.put(row)
+            return
         
-        self.conn.commit()
+        with self.metrics.span("db_history"), self._commit_history.time(), \
+                self.pool.connection() as conn:
+            insert_history(conn, [row])
+    
+    def save_conversion_history_many(self, records: Sequence[Tuple[float, str, str, float]]):
+        """Save many conversions to history in a single transaction."""
+        if not records:
+            return
+        
+        now = datetime.now()
+        rows = [(amount, from_curr, to_curr, result, now)
+                for amount, from_curr, to_curr, result in records]
+        
+        if self.history_writer is not None:
+            self.history_writer.put_many(rows)
+            return
+        
+        with self.metrics.span("db_history"), self._commit_history_batch.time(), \
+                self.pool.connection() as conn:
+            insert_history(conn, rows)
     
     def get_conversion_history(self, limit: int = 10):
-        """Get recent conversion history."""
-        self.cursor.execute('''
-            SELECT amount, from_currency, to_currency, result, conversion_date
+        """Get recent conversion history, including rows not yet flushed and archived rows."""
+        history = [row[1:] for row in self._history_rows("", [], limit)]
+        
+        if self.history_writer is not None:
+            pending = [
+                (amount, from_curr, to_curr, result, date.isoformat(" "))
+                for amount, from_curr, to_curr, result, date in self.history_writer.pending_rows()
+            ]
+            if pending:
+                history = sorted(pending + history, key=lambda record: record[4], reverse=True)[:limit]
+        
+        return history
+    
+    def query_history(self, limit: int = 10, cursor: Optional[str] = None,
+                      from_currency: Optional[str] = None, to_currency: Optional[str] = None,
+                      since: Union[str, datetime, None] = None,
+                      until: Union[str, datetime, None] = None) -> Tuple[List[tuple], Optional[str]]:
+        """
+        Get one page of history, newest first, filtered by currency and by
+        conversion date in [since, until). Returns (rows, next_cursor);
+        next_cursor is None on the last page. Pages are keyed on
+        (conversion_date, id), so deep pages cost the same as the first,
+        and continue from the live table into the monthly archives.
+        Raises ValueError for a malformed cursor or date.
+        """
+        limit = max(1, min(int(limit), MAX_HISTORY_PAGE))
+        clauses = []
+        params = []
+        # With both codes the pair index serves filter and order; with only
+        # one, the unary + keeps SQLite walking the date index instead of
+        # collecting and sorting every row for that currency
+        prefix = "" if from_currency and to_currency else "+"
+        if from_currency:
+            clauses.append(f"{prefix}from_currency = ?")
+            params.append(from_currency)
+        if to_currency:
+            clauses.append(f"{prefix}to_currency = ?")
+            params.append(to_currency)
+        oldest = newest = None
+        if since is not None:
+            oldest = self._history_bound(since)
+            clauses.append("conversion_date >= ?")
+            params.append(oldest)
+        if until is not None:
+            newest = self._history_bound(until)
+            clauses.append("conversion_date < ?")
+            params.append(newest)
+        if cursor:
+            cursor_date, cursor_id = self.decode_history_cursor(cursor)
+            clauses.append("(conversion_date, id) < (?, ?)")
+            params.extend((cursor_date, cursor_id))
+            newest = min(newest, cursor_date) if newest is not None else cursor_date
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        
+        if self.history_writer is not None:
+            # Queued rows have no id yet; commit them so pages are stable
+            self.history_writer.flush()
+        
+        rows = self._history_rows(where, params, limit + 1, oldest, newest)
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self.encode_history_cursor(rows[-1][5], rows[-1][0])
+        return [row[1:] for row in rows], next_cursor
+    
+    def _history_rows(self, where: str, params: list, limit: int,
+                      oldest: Optional[str] = None, newest: Optional[str] = None) -> List[tuple]:
+        """
+        Up to limit (id, amount, from, to, result, conversion_date) rows,
+        newest first, from the live table and then, while the page is not
+        full, from archived months between oldest and newest.
+        """
+        sql = f'''
+            SELECT id, amount, from_currency, to_currency, result, conversion_date
             FROM conversion_history
-            ORDER BY conversion_date DESC
+            {where}
+            ORDER BY conversion_date DESC, id DESC
             LIMIT ?
-        ''', (limit,))
-        
-        return self.cursor.fetchall()
+        '''
+        with self.pool.connection() as conn:
+            rows = conn.execute(sql, params + [limit]).fetchall()
+        
+        for month in self.archive.months():
+            start, end = month_bounds(month)
+            if oldest is not None and end <= oldest:
+                break
+            if len(rows) == limit and rows[-1][5] >= end:
+                # Every row in this and older months is older than the page
+                break
+            if newest is not None and start > newest:
+                continue
+            if len(rows) == limit:
+                archived = self.archive.newest(month)
+                if archived is None:
+                    continue
+                if rows[-1][5] > archived:
+                    break
+            with self.metrics.span("history_archive"):
+                rows = merge_pages([rows, self.archive.query(month, sql, params + [limit])], limit)
+        return rows
+    
+    def iter_history(self, page_size: int = MAX_HISTORY_PAGE, **filters) -> Iterator[tuple]:
+        """Yield every history row matching filters (see query_history), page by page."""
+        cursor = None
+        while True:
+            rows, cursor = self.query_history(page_size, cursor, **filters)
+            yield from rows
+            if cursor is None:
+                return
+    
+    @staticmethod
+    def _history_bound(value: Union[str, datetime]) -> str:
+        """Normalize a date filter to the format conversion_date is stored in."""
+        if not isinstance(value, datetime):
+            value = datetime.fromisoformat(value)
+        return value.isoformat(" ")
+    
+    @staticmethod
+    def encode_history_cursor(conversion_date: str, row_id: int) -> str:
+        """Build the opaque cursor that resumes history after this row."""
+        return base64.urlsafe_b64encode(f"{conversion_date}|{row_id}".encode()).decode()
+    
+    @staticmethod
+    def decode_history_cursor(cursor: str) -> Tuple[str, int]:
+        """Inverse of encode_history_cursor; raises ValueError if malformed."""
+        try:
+            conversion_date, _, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().rpartition("|")
+            return conversion_date, int(row_id)
+        except ValueError:
+            raise ValueError("Invalid cursor") from None
+    
+    def get_volume_stats(self, granularity: str = "day", from_currency: Optional[str] = None,
+                         to_currency: Optional[str] = None,
+                         since: Union[str, datetime, None] = None,
+                         until: Union[str, datetime, None] = None, limit: int = 100) -> List[tuple]:
+        """
+        Get conversion volume per pair per hour or day from the rollups,
+        newest bucket first: (bucket, from, to, conversions, total_amount,
+        total_result). Rows still queued by the write-behind writer are
+        not counted until they are flushed.
+        """
+        with self.pool.connection() as conn:
+            return volume(conn, granularity, from_currency, to_currency, since, until, limit)
+    
+    def get_top_pairs(self, limit: int = 10, since: Union[str, datetime, None] = None,
+                      until: Union[str, datetime, None] = None) -> List[tuple]:
+        """Get the most converted pairs: (from, to, conversions, total_amount, total_result)."""
+        with self.pool.connection() as conn:
+            return top_pairs(conn, limit, since, until)
     
     def get_supported_currencies(self):
         """Get list of supported currencies."""
@@ -182,268 +977,35 @@ class CurrencyConverter:
         ]
         return currencies
     
+    def close(self):
+        """Stop background work, flush queued history and close the database."""
+        if getattr(self, 'events', None) is not None:
+            self.events.close()
+        if getattr(self, 'refresher', None) is not None:
+            self.refresher.stop()
+            self.refresher = None
+        if getattr(self, 'history_writer', None) is not None:
+            self.history_writer.close()
+            self.history_writer = None
+        if getattr(self, 'history_maintenance', None) is not None:
+            self.history_maintenance.stop()
+            self.history_maintenance = None
+        if getattr(self, '_provider', None) is not None:
+            self._provider.close()
+        if hasattr(self, 'pool'):
+            self.pool.close()
+    
     def __del__(self):
         """Cleanup database connection."""
-        if hasattr(self, 'conn'):
-            self.conn.close()
-
-
-class CurrencyConverterGUI:
-    def __init__(self, converter: CurrencyConverter):
-        self.converter = converter
-        
-        # Create main window
-        self.root = tk.Tk()
-        self.root.title("Currency Converter")
-        self.root.geometry("500x400")
-        self.root.configure(bg="#f0f0f0")
-        
-        self.setup_ui()
-    
-    def setup_ui(self):
-        """Setup the user interface."""
-        # Title
-        title_label = tk.Label(
-            self.root,
-            text="Currency Converter",
-            font=("Arial", 20, "bold"),
-            bg="#f0f0f0",
-            fg="#333"
-        )
-        title_label.pack(pady=20)
-        
-        # Amount frame
-        amount_frame = tk.Frame(self.root, bg="#f0f0f0")
-        amount_frame.pack(pady=10)
-        
-        tk.Label(
-            amount_frame,
-            text="Amount:",
-            font=("Arial", 12),
-            bg="#f0f0f0"
-        ).pack(side=tk.LEFT, padx=5)
-        
-        self.amount_var = tk.StringVar(value="1.00")
-        self.amount_entry = tk.Entry(
-            amount_frame,
-            textvariable=self.amount_var,
-            font=("Arial", 12),
-            width=15,
-            justify="right"
-        )
-        self.amount_entry.pack(side=tk.LEFT, padx=5)
-        
-        # Currency selection frame
-        currency_frame = tk.Frame(self.root, bg="#f0f0f0")
-        currency_frame.pack(pady=20)
-        
-        # From currency
-        from_frame = tk.Frame(currency_frame, bg="#f0f0f0")
-        from_frame.pack(side=tk.LEFT, padx=20)
-        
-        tk.Label(
-            from_frame,
-            text="From:",
-            font=("Arial", 12),
-            bg="#f0f0f0"
-        ).pack()
-        
-        self.from_currency = ttk.Combobox(
-            from_frame,
-            values=self.converter.get_supported_currencies(),
-            state="readonly",
-            width=10,
-            font=("Arial", 12)
-        )
-        self.from_currency.set("USD")
-        self.from_currency.pack(pady=5)
-        
-        # To currency
-        to_frame = tk.Frame(currency_frame, bg="#f0f0f0")
-        to_frame.pack(side=tk.LEFT, padx=20)
-        
-        tk.Label(
-            to_frame,
-            text="To:",
-            font=("Arial", 12),
-            bg="#f0f0f0"
-        ).pack()
-        
-        self.to_currency = ttk.Combobox(
-            to_frame,
-            values=self.converter.get_supported_currencies(),
-            state="readonly",
-            width=10,
-            font=("Arial", 12)
-        )
-        self.to_currency.set("EUR")
-        self.to_currency.pack(pady=5)
-        
-        # Swap button
-        swap_btn = tk.Button(
-            currency_frame,
-            text="↔",
-            font=("Arial", 12, "bold"),
-            command=self.swap_currencies,
-            bg="#4CAF50",
-            fg="white",
-            padx=10
-        )
-        swap_btn.pack(side=tk.LEFT, padx=10)
-        
-        # Convert button
-        convert_btn = tk.Button(
-            self.root,
-            text="Convert",
-            font=("Arial", 14, "bold"),
-            command=self.perform_conversion,
-            bg="#2196F3",
-            fg="white",
-            padx=30,
-            pady=10
-        )
-        convert_btn.pack(pady=20)
-        
-        # Result display
-        self.result_var = tk.StringVar(value="Result will appear here")
-        result_label = tk.Label(
-            self.root,
-            textvariable=self.result_var,
-            font=("Arial", 14, "bold"),
-            bg="#f0f0f0",
-            fg="#333"
-        )
-        result_label.pack(pady=10)
-        
-        # Last update label
-        self.update_var = tk.StringVar(value="")
-        update_label = tk.Label(
-            self.root,
-            textvariable=self.update_var,
-            font=("Arial", 9),
-            bg="#f0f0f0",
-            fg="#666"
-        )
-        update_label.pack()
-        
-        # History button
-        history_btn = tk.Button(
-            self.root,
-            text="View History",
-            font=("Arial", 10),
-            command=self.show_history,
-            bg="#FF9800",
-            fg="white"
-        )
-        history_btn.pack(pady=10)
-        
-        # Bind events
-        self.amount_entry.bind("<KeyRelease>", lambda e: self.perform_conversion())
-        self.from_currency.bind("<<ComboboxSelected>>", lambda e: self.perform_conversion())
-        self.to_currency.bind("<<ComboboxSelected>>", lambda e: self.perform_conversion())
-        
-        # Initial conversion
-        self.perform_conversion()
-    
-    def perform_conversion(self):
-        """Perform currency conversion and update display."""
-        try:
-            amount = float(self.amount_var.get())
-            from_curr = self.from_currency.get()
-            to_curr = self.to_currency.get()
-            
-            if not from_curr or not to_curr:
-                return
-            
-            result = self.converter.convert(amount, from_curr, to_curr)
-            
-            if result is not None:
-                self.result_var.set(f"{amount:.2f} {from_curr} = {result:.2f} {to_curr}")
-                
-                # Update last update time
-                if self.converter.last_update:
-                    update_time = self.converter.last_update.strftime("%Y-%m-%d %H:%M:%S")
-                    self.update_var.set(f"Last updated: {update_time}")
-                else:
-                    self.update_var.set("Using cached rates")
-            else:
-                self.result_var.set("Error: Could not get exchange rate")
-                self.update_var.set("")
-        
-        except ValueError:
-            self.result_var.set("Error: Invalid amount")
-            self.update_var.set("")
-    
-    def swap_currencies(self):
-        """Swap the from and to currencies."""
-        from_curr = self.from_currency.get()
-        to_curr = self.to_currency.get()
-        
-        self.from_currency.set(to_curr)
-        self.to_currency.set(from_curr)
-        self.perform_conversion()
-    
-    def show_history(self):
-        """Show conversion history in a new window."""
-        history_window = tk.Toplevel(self.root)
-        history_window.title("Conversion History")
-        history_window.geometry("500x400")
-        
-        # Title
-        tk.Label(
-            history_window,
-            text="Recent Conversions",
-            font=("Arial", 16, "bold")
-        ).pack(pady=10)
-        
-        # Text widget for history
-        history_text = tk.Text(history_window, height=15, width=60)
-        history_text.pack(padx=10, pady=10)
-        
-        # Get history
-        history = self.converter.get_conversion_history(limit=20)
-        
-        if not history:
-            history_text.insert(tk.END, "No conversion history found.")
-        else:
-            for record in history:
-                amount, from_curr, to_curr, result, date = record
-                history_text.insert(
-                    tk.END,
-                    f"{date}: {amount:.2f} {from_curr} → {result:.2f} {to_curr}\n"
-                )
-        
-        history_text.config(state=tk.DISABLED)
-        
-        # Close button
-        tk.Button(
-            history_window,
-            text="Close",
-            command=history_window.destroy
-        ).pack(pady=10)
-    
-    def run(self):
-        """Run the GUI application."""
-        self.root.mainloop()
+        self.close()
 
 
 def main():
-    """Main function to run the currency converter."""
-    print("Starting Currency Converter...")
-    
-    
-    API_KEY = None  
-    
-    try:
-        converter = CurrencyConverter(api_key=API_KEY)
-        app = CurrencyConverterGUI(converter)
-        app.run()
-    
-    except Exception as e:
-        print(f"Error starting application: {e}")
-        messagebox.showerror("Error", f"Failed to start application: {e}")
-        sys.exit(1)
+    """Main function to run the currency converter GUI."""
+    # The GUI (and tkinter) is only imported when it is actually launched
+    from currency_gui import main as run_gui
+    run_gui()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,430 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+import math
+import queue
+import sys
+import threading
+
+from currency_converter import CurrencyConverter
+
+class CurrencyConverterGUI:
+    """
+    Tk front end. Typing only updates a live preview, computed from the
+    in-memory rates after a short debounce and never written to history.
+    Anything that may hit the provider or the database runs on a worker
+    thread and reports back through root.after, so a slow provider never
+    freezes the window. History is written only when Convert is clicked.
+    With live_rates the window follows the converter's rate events and
+    redraws the shown conversion as soon as its rate changes.
+    """
+    
+    # Quiet period after the last keystroke before the preview updates
+    DEBOUNCE_MS = 250
+    
+    def __init__(self, converter: CurrencyConverter, live_rates: bool = True):
+        self.converter = converter
+        
+        # Create main window
+        self.root = tk.Tk()
+        self.root.title("Currency Converter")
+        self.root.geometry("500x400")
+        self.root.configure(bg="#f0f0f0")
+        
+        self._debounce_job = None
+        # Bumped on every input change; worker results for older inputs are dropped
+        self._generation = 0
+        self._jobs = queue.Queue()
+        self._worker = threading.Thread(target=self._run_jobs, name="gui-worker", daemon=True)
+        self._worker.start()
+        # (amount, from, to, result) on screen, and the base kept hot for live updates
+        self._shown = None
+        self._watched_base = None
+        self._rates_thread = None
+        self._closed = False
+        
+        self.setup_ui()
+        if live_rates:
+            self.subscribe_rates()
+    
+    def setup_ui(self):
+        """Setup the user interface."""
+        # Title
+        title_label = tk.Label(
+            self.root,
+            text="Currency Converter",
+            font=("Arial", 20, "bold"),
+            bg="#f0f0f0",
+            fg="#333"
+        )
+        title_label.pack(pady=20)
+        
+        # Amount frame
+        amount_frame = tk.Frame(self.root, bg="#f0f0f0")
+        amount_frame.pack(pady=10)
+        
+        tk.Label(
+            amount_frame,
+            text="Amount:",
+            font=("Arial", 12),
+            bg="#f0f0f0"
+        ).pack(side=tk.LEFT, padx=5)
+        
+        self.amount_var = tk.StringVar(value="1.00")
+        self.amount_entry = tk.Entry(
+            amount_frame,
+            textvariable=self.amount_var,
+            font=("Arial", 12),
+            width=15,
+            justify="right"
+        )
+        self.amount_entry.pack(side=tk.LEFT, padx=5)
+        
+        # Currency selection frame
+        currency_frame = tk.Frame(self.root, bg="#f0f0f0")
+        currency_frame.pack(pady=20)
+        
+        # From currency
+        from_frame = tk.Frame(currency_frame, bg="#f0f0f0")
+        from_frame.pack(side=tk.LEFT, padx=20)
+        
+        tk.Label(
+            from_frame,
+            text="From:",
+            font=("Arial", 12),
+            bg="#f0f0f0"
+        ).pack()
+        
+        self.from_currency = ttk.Combobox(
+            from_frame,
+            values=self.converter.get_supported_currencies(),
+            state="readonly",
+            width=10,
+            font=("Arial", 12)
+        )
+        self.from_currency.set("USD")
+        self.from_currency.pack(pady=5)
+        
+        # To currency
+        to_frame = tk.Frame(currency_frame, bg="#f0f0f0")
+        to_frame.pack(side=tk.LEFT, padx=20)
+        
+        tk.Label(
+            to_frame,
+            text="To:",
+            font=("Arial", 12),
+            bg="#f0f0f0"
+        ).pack()
+        
+        self.to_currency = ttk.Combobox(
+            to_frame,
+            values=self.converter.get_supported_currencies(),
+            state="readonly",
+            width=10,
+            font=("Arial", 12)
+        )
+        self.to_currency.set("EUR")
+        self.to_currency.pack(pady=5)
+        
+        # Swap button
+        swap_btn = tk.Button(
+            currency_frame,
+            text="↔",
+            font=("Arial", 12, "bold"),
+            command=self.swap_currencies,
+            bg="#4CAF50",
+            fg="white",
+            padx=10
+        )
+        swap_btn.pack(side=tk.LEFT, padx=10)
+        
+        # Convert button
+        convert_btn = tk.Button(
+            self.root,
+            text="Convert",
+            font=("Arial", 14, "bold"),
+            command=self.perform_conversion,
+            bg="#2196F3",
+            fg="white",
+            padx=30,
+            pady=10
+        )
+        convert_btn.pack(pady=20)
+        
+        # Result display
+        self.result_var = tk.StringVar(value="Result will appear here")
+        result_label = tk.Label(
+            self.root,
+            textvariable=self.result_var,
+            font=("Arial", 14, "bold"),
+            bg="#f0f0f0",
+            fg="#333"
+        )
+        result_label.pack(pady=10)
+        
+        # Last update label
+        self.update_var = tk.StringVar(value="")
+        update_label = tk.Label(
+            self.root,
+            textvariable=self.update_var,
+            font=("Arial", 9),
+            bg="#f0f0f0",
+            fg="#666"
+        )
+        update_label.pack()
+        
+        # History button
+        history_btn = tk.Button(
+            self.root,
+            text="View History",
+            font=("Arial", 10),
+            command=self.show_history,
+            bg="#FF9800",
+            fg="white"
+        )
+        history_btn.pack(pady=10)
+        
+        # Bind events
+        self.amount_entry.bind("<KeyRelease>", lambda e: self.schedule_preview())
+        self.amount_entry.bind("<Return>", lambda e: self.perform_conversion())
+        self.from_currency.bind("<<ComboboxSelected>>", lambda e: self.update_preview())
+        self.to_currency.bind("<<ComboboxSelected>>", lambda e: self.update_preview())
+        
+        # Initial preview
+        self.update_preview()
+    
+    def read_inputs(self):
+        """Return (amount, from, to) from the form, or None after showing an error."""
+        from_curr = self.from_currency.get()
+        to_curr = self.to_currency.get()
+        if not from_curr or not to_curr:
+            return None
+        try:
+            amount = float(self.amount_var.get())
+        except ValueError:
+            self.show_error("Error: Invalid amount")
+            return None
+        return amount, from_curr, to_curr
+    
+    def schedule_preview(self):
+        """Debounce keystrokes: update the preview once typing pauses."""
+        self._generation += 1
+        if self._debounce_job is not None:
+            self.root.after_cancel(self._debounce_job)
+        self._debounce_job = self.root.after(self.DEBOUNCE_MS, self.update_preview)
+    
+    def update_preview(self):
+        """Show the conversion for the current input without recording it."""
+        self._debounce_job = None
+        self._generation += 1
+        inputs = self.read_inputs()
+        if inputs is None:
+            return
+        amount, from_curr, to_curr = inputs
+        
+        self._watched_base = from_curr
+        # Fresh in-memory rate: no I/O at all
+        resolved = self.converter.rates.resolve(from_curr, to_curr)
+        if resolved is not None:
+            rate, base, _ = resolved
+            self.show_result(amount, from_curr, to_curr, amount * rate, preview=True)
+            age = self.converter.rates.age(base)
+            if age is not None and age <= self.converter.rate_ttl:
+                return
+        else:
+            self.result_var.set("Fetching rate...")
+            self.update_var.set("")
+        
+        # Missing or stale: look it up (and maybe fetch) off the Tk thread
+        generation = self._generation
+        
+        def lookup():
+            resolved = self.converter.resolve_rate(from_curr, to_curr)
+            self.post(self._preview_done, generation, amount, from_curr, to_curr, resolved)
+        
+        self._jobs.put(lookup)
+    
+    def _preview_done(self, generation, amount, from_curr, to_curr, resolved):
+        if generation != self._generation:
+            return  # The input changed while the rate was being fetched
+        if resolved is None:
+            self.show_error("Error: Could not get exchange rate")
+        else:
+            self.show_result(amount, from_curr, to_curr, amount * resolved[0], preview=True)
+    
+    def perform_conversion(self):
+        """Convert the current input and record it in history (Convert button)."""
+        if self._debounce_job is not None:
+            self.root.after_cancel(self._debounce_job)
+            self._debounce_job = None
+        self._generation += 1
+        inputs = self.read_inputs()
+        if inputs is None:
+            return
+        amount, from_curr, to_curr = inputs
+        generation = self._generation
+        self.update_var.set("Converting...")
+        
+        def convert():
+            result = self.converter.convert(amount, from_curr, to_curr)
+            self.post(self._conversion_done, generation, amount, from_curr, to_curr, result)
+        
+        self._jobs.put(convert)
+    
+    def _conversion_done(self, generation, amount, from_curr, to_curr, result):
+        if generation != self._generation:
+            return
+        if result is None:
+            self.show_error("Error: Could not get exchange rate")
+        else:
+            self.show_result(amount, from_curr, to_curr, result, preview=False)
+    
+    def show_result(self, amount, from_curr, to_curr, result, preview):
+        """Display a conversion result and the rate freshness."""
+        self._shown = (amount, from_curr, to_curr, result)
+        self.result_var.set(f"{amount:.2f} {from_curr} = {result:.2f} {to_curr}")
+        
+        # Update last update time
+        if self.converter.last_update:
+            update_time = self.converter.last_update.strftime("%Y-%m-%d %H:%M:%S")
+            status = f"Last updated: {update_time}"
+        else:
+            status = "Using cached rates"
+        if not preview:
+            status += " (saved to history)"
+        self.update_var.set(status)
+    
+    def show_error(self, message):
+        self._shown = None
+        self.result_var.set(message)
+        self.update_var.set("")
+    
+    def post(self, callback, *args):
+        """Run callback on the Tk thread; called from the worker."""
+        try:
+            self.root.after(0, callback, *args)
+        except (RuntimeError, tk.TclError):
+            pass  # Window already closed
+    
+    def _run_jobs(self):
+        """Worker loop: run lookups and conversions one at a time, off the Tk thread."""
+        while True:
+            job = self._jobs.get()
+            try:
+                job()
+            except Exception as e:
+                self.post(self.show_error, f"Error: {e}")
+    
+    def subscribe_rates(self):
+        """Follow the converter's rate events on a background thread."""
+        if self._rates_thread is not None:
+            return
+        self._rates_thread = threading.Thread(target=self._watch_rates, name="gui-rates", daemon=True)
+        self._rates_thread.start()
+    
+    def _watch_rates(self):
+        """Wait for rate events and hand them to the Tk thread."""
+        events = self.converter.events
+        events.subscribe()
+        try:
+            seq = events.seq
+            while not self._closed:
+                if not events.wait(seq, 1.0):
+                    # Keep the shown pair's table refreshed in the background
+                    refresher = self.converter.refresher
+                    if refresher is not None and self._watched_base:
+                        refresher.touch(self._watched_base)
+                    continue
+                changes = events.since(seq)
+                seq = changes[-1].seq if changes else events.seq
+                self.post(self._rates_changed)
+        finally:
+            events.unsubscribe()
+    
+    def _rates_changed(self):
+        """Rates changed: redraw the shown conversion if its rate moved."""
+        if self._shown is None or self._debounce_job is not None:
+            return  # Nothing shown yet, or a preview for new input is already due
+        amount, from_curr, to_curr, result = self._shown
+        resolved = self.converter.rates.resolve(from_curr, to_curr)
+        if resolved is None or math.isclose(amount * resolved[0], result, rel_tol=1e-12):
+            return
+        self.show_result(amount, from_curr, to_curr, amount * resolved[0], preview=True)
+        self.update_var.set(f"{self.update_var.get()} (rate changed)")
+    
+    def swap_currencies(self):
+        """Swap the from and to currencies."""
+        from_curr = self.from_currency.get()
+        to_curr = self.to_currency.get()
+        
+        self.from_currency.set(to_curr)
+        self.to_currency.set(from_curr)
+        self.update_preview()
+    
+    def show_history(self):
+        """Show conversion history in a new window."""
+        history_window = tk.Toplevel(self.root)
+        history_window.title("Conversion History")
+        history_window.geometry("500x400")
+        
+        # Title
+        tk.Label(
+            history_window,
+            text="Recent Conversions",
+            font=("Arial", 16, "bold")
+        ).pack(pady=10)
+        
+        # Text widget for history
+        history_text = tk.Text(history_window, height=15, width=60)
+        history_text.pack(padx=10, pady=10)
+        
+        # Get history
+        history = self.converter.get_conversion_history(limit=20)
+        
+        if not history:
+            history_text.insert(tk.END, "No conversion history found.")
+        else:
+            for record in history:
+                amount, from_curr, to_curr, result, date = record
+                history_text.insert(
+                    tk.END,
+                    f"{date}: {amount:.2f} {from_curr} → {result:.2f} {to_curr}\n"
+                )
+        
+        history_text.config(state=tk.DISABLED)
+        
+        # Close button
+        tk.Button(
+            history_window,
+            text="Close",
+            command=history_window.destroy
+        ).pack(pady=10)
+    
+    def run(self):
+        """Run the GUI application."""
+        try:
+            self.root.mainloop()
+        finally:
+            self._closed = True
+
+
+def main():
+    """Main function to run the currency converter."""
+    print("Starting Currency Converter...")
+    
+    
+    API_KEY = None  
+    
+    try:
+        # The refresher renews the shown pair's rates, which then redraw live
+        converter = CurrencyConverter(api_key=API_KEY, background_refresh=True)
+        app = CurrencyConverterGUI(converter)
+        app.run()
+    
+    except Exception as e:
+        print(f"Error starting application: {e}")
+        messagebox.showerror("Error", f"Failed to start application: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+
+class ConnectionPool:
+    """
+    Small pool of SQLite connections shared by request threads.
+
+    Each thread checks a connection out for the duration of one operation
+    and returns it afterwards, so a thread-per-request server reuses a
+    bounded set of connections instead of opening one per thread. Nested
+    checkouts on the same thread reuse the connection already held.
+    journal_mode, if given, is applied to every connection: WAL is stored
+    in the database file, but MEMORY and OFF only last per connection.
+    """
+
+    def __init__(self, db_path: str, size: int = 8, synchronous: str = "NORMAL",
+                 timeout: float = 30.0, journal_mode: Optional[str] = None):
+        self.db_path = db_path
+        self.size = size
+        self.synchronous = synchronous
+        self.journal_mode = journal_mode
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a new connection with the pool's pragmas applied."""
+        # Connections move between threads, but only one uses it at a time
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+        if self.journal_mode:
+            conn.execute(f"PRAGMA journal_mode={self.journal_mode}")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        """Take an idle connection, opening one if the pool is not full."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if len(self._connections) < self.size:
+                conn = self._connect()
+                self._connections.append(conn)
+                return conn
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No SQLite connection free after {self.timeout}s") from None
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Check out a connection for the current thread."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield conn
+            return
+
+        conn = self._acquire()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    def close(self):
+        """Close every connection owned by the pool."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
@@ -0,0 +1,438 @@
+"""
+Several rate sources behind one fetch(), with hedged requests.
+
+Sources are listed in order of preference. A fetch goes to the first
+source whose circuit breaker lets it through. If that source has not
+answered within its hedge delay (a high quantile of its recent response
+times), the same fetch is also sent to the next source and the first
+valid table wins. A source that fails outright is failed over from at
+once. Requests that lose the race are not cancelled; they finish in the
+background so their response times still reach the latency tracker.
+
+Each source has a circuit breaker: after failure_threshold consecutive
+failures (transport errors, 429 and 5xx) it is skipped for reset_timeout
+seconds, then a single probe request decides whether it closes again.
+A 4xx answer means the source is up, so it does not count as a failure.
+
+A source's breaker, latency window and counters (RateSource) are kept
+apart from the clients that talk to it, so a blocking and an asyncio
+provider for the same URLs can share them (sources=other.sources): both
+transports then see one health state per source, and its metrics are
+exported once.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Deque, Dict, List, Optional, Sequence
+from urllib.parse import urlsplit
+
+from rate_provider import RETRY_STATUSES, BaseRateProviderClient, RateProviderError, RateTable
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+# Gauge values for currency_upstream_circuit_state
+CIRCUIT_STATES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def backup_urls_from_env(environ) -> List[str]:
+    """Backup source URLs from CURRENCY_BACKUP_RATE_URLS (comma-separated)."""
+    return [url.strip() for url in environ.get("CURRENCY_BACKUP_RATE_URLS", "").split(",") if url.strip()]
+
+
+def source_clients(client_class, base_url: str, api_key: Optional[str] = None,
+                   backup_urls: Sequence[str] = (), **kwargs) -> List[BaseRateProviderClient]:
+    """
+    Provider clients for the primary and backup sources. The API key
+    belongs to the primary. With backups, each client retries only once:
+    failing over to the next source beats a longer backoff.
+    """
+    if backup_urls:
+        kwargs.setdefault("retries", 1)
+    return [client_class(base_url, api_key, **kwargs)] + [client_class(url, **kwargs) for url in backup_urls]
+
+
+def is_source_failure(error: RateProviderError) -> bool:
+    """True if an error says the source is unhealthy rather than the request being bad."""
+    return error.status is None or error.status in RETRY_STATUSES
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open probe."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now; claims the probe when half-open."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = HALF_OPEN
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.opened += 1
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Response times of a source's most recent requests."""
+
+    def __init__(self, window: int = 100):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Quantile of the window, or None before the first sample."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class RateSource:
+    """Circuit breaker, latency window and counters of one rate source, whatever the transport."""
+
+    def __init__(self, name: str, breaker: CircuitBreaker):
+        self.name = name
+        self.breaker = breaker
+        self.latency = LatencyTracker()
+        self.ok = 0
+        self.errors = 0
+        # Fetches that passed this source over because its circuit was open
+        self.skipped = 0
+        # Requests sent as a hedge or after the previous source failed,
+        # and tables this source delivered first
+        self.hedges = 0
+        self.failovers = 0
+        self.wins = 0
+
+    def record(self, seconds: float, error: Optional[RateProviderError] = None):
+        """Feed one finished request to the breaker and the latency window."""
+        if error is None:
+            self.ok += 1
+        else:
+            self.errors += 1
+        if error is not None and is_source_failure(error):
+            # Timeouts and refused connections say nothing about response time
+            self.breaker.record_failure()
+            return
+        self.breaker.record_success()
+        self.latency.observe(seconds)
+
+
+class BaseHedgedProvider:
+    """
+    Source selection, hedge deadlines and bookkeeping shared by the
+    blocking and asyncio variants. Duck-types the single provider client
+    (fetch, close, base_url, requests_sent, not_modified). clients[i]
+    talks to sources[i]; pass sources to share them with another provider.
+    """
+
+    def __init__(self, clients: Sequence[BaseRateProviderClient],
+                 sources: Optional[Sequence[RateSource]] = None, hedge_quantile: float = 0.95,
+                 min_hedge_delay: float = 0.05, max_hedge_delay: float = 2.0,
+                 initial_hedge_delay: float = 0.5, min_samples: int = 20,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0):
+        if not clients:
+            raise ValueError("At least one rate source is required")
+        if sources is None:
+            sources = [
+                RateSource(urlsplit(client.base_url).netloc or client.base_url,
+                           CircuitBreaker(failure_threshold, reset_timeout))
+                for client in clients
+            ]
+        elif len(sources) != len(clients):
+            raise ValueError("Expected one client per rate source")
+        self.clients = list(clients)
+        self.sources = list(sources)
+        self.hedge_quantile = hedge_quantile
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_delay = max_hedge_delay
+        # Used until a source has min_samples response times
+        self.initial_hedge_delay = initial_hedge_delay
+        self.min_samples = min_samples
+
+    @property
+    def base_url(self) -> str:
+        """URL of the primary source."""
+        return self.clients[0].base_url
+
+    @base_url.setter
+    def base_url(self, value: str):
+        self.clients[0].base_url = value
+
+    @property
+    def requests_sent(self) -> int:
+        """HTTP requests sent by this provider's clients."""
+        return sum(client.requests_sent for client in self.clients)
+
+    @property
+    def not_modified(self) -> int:
+        return sum(client.not_modified for client in self.clients)
+
+    @property
+    def hedged(self) -> int:
+        """Hedge requests sent to any source, by every provider sharing them."""
+        return sum(source.hedges for source in self.sources)
+
+    @property
+    def failovers(self) -> int:
+        return sum(source.failovers for source in self.sources)
+
+    def hedge_delay(self, source: RateSource) -> float:
+        """How long to wait on a source before hedging with the next one."""
+        if len(source.latency) < self.min_samples:
+            return self.initial_hedge_delay
+        delay = source.latency.quantile(self.hedge_quantile)
+        return min(max(delay, self.min_hedge_delay), self.max_hedge_delay)
+
+    def _next_source(self, position: int) -> Optional[int]:
+        """Index of the first source from position on that its breaker lets through."""
+        for i in range(position, len(self.sources)):
+            source = self.sources[i]
+            if source.breaker.allow():
+                return i
+            source.skipped += 1
+        return None
+
+    @staticmethod
+    def _error(base: str, errors: List[RateProviderError]) -> RateProviderError:
+        """The error to raise once every source has failed or been skipped."""
+        if not errors:
+            return RateProviderError(f"{base}: no rate source available (circuits open)")
+        # A definitive answer lets the converter negative-cache an unknown code
+        for error in errors:
+            if not is_source_failure(error):
+                return error
+        return errors[-1]
+
+    def collect_metrics(self):
+        """Scrape-time samples for Metrics.add_collector."""
+        requests = "Upstream requests per rate source"
+        samples = []
+        for source in self.sources:
+            labels = {"source": source.name}
+            samples += [
+                ("currency_upstream_source_requests_total", "counter", requests,
+                 dict(labels, result="ok"), source.ok),
+                ("currency_upstream_source_requests_total", "counter", requests,
+                 dict(labels, result="error"), source.errors),
+                ("currency_upstream_source_requests_total", "counter", requests,
+                 dict(labels, result="skipped"), source.skipped),
+                ("currency_upstream_hedge_requests_total", "counter",
+                 "Requests sent to a source because the one before it was slow", labels, source.hedges),
+                ("currency_upstream_source_wins_total", "counter",
+                 "Fetches answered by this source", labels, source.wins),
+                ("currency_upstream_circuit_state", "gauge",
+                 "Circuit breaker state (0 closed, 1 half-open, 2 open)", labels,
+                 CIRCUIT_STATES[source.breaker.state]),
+                ("currency_upstream_circuit_opened_total", "counter",
+                 "Times a source's circuit breaker opened", labels, source.breaker.opened),
+                ("currency_upstream_hedge_delay_seconds", "gauge",
+                 "Current wait before hedging past this source", labels, self.hedge_delay(source)),
+            ]
+            for q in (0.5, 0.95, 0.99):
+                value = source.latency.quantile(q)
+                if value is not None:
+                    samples.append(("currency_upstream_source_latency_seconds", "gauge",
+                                    "Recent response time quantiles per rate source",
+                                    dict(labels, quantile=str(q)), value))
+        samples += [
+            ("currency_upstream_hedged_fetches_total", "counter",
+             "Fetches that sent a hedge request", {}, self.hedged),
+            ("currency_upstream_failovers_total", "counter",
+             "Requests sent to the next source after a failure", {}, self.failovers),
+        ]
+        return samples
+
+
+class HedgedProvider(BaseHedgedProvider):
+    """Blocking hedged provider; requests to the sources run on a small thread pool."""
+
+    def __init__(self, clients: Sequence[BaseRateProviderClient], **kwargs):
+        super().__init__(clients, **kwargs)
+        pool_size = sum(getattr(client, "pool_size", 10) for client in clients)
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="rate-source")
+
+    def _attempt(self, i: int, base: str) -> RateTable:
+        source = self.sources[i]
+        start = time.perf_counter()
+        try:
+            table = self.clients[i].fetch(base)
+        except RateProviderError as e:
+            source.record(time.perf_counter() - start, e)
+            raise
+        source.record(time.perf_counter() - start)
+        return table
+
+    def fetch(self, base: str) -> RateTable:
+        """Fetch a base table from whichever usable source answers it first."""
+        errors = []
+        i = self._next_source(0)
+        if i is None:
+            raise self._error(base, errors)
+        position = i + 1
+        if position >= len(self.sources):
+            # Nothing to hedge with: skip the thread hand-off
+            table = self._attempt(i, base)
+            self.sources[i].wins += 1
+            return table
+
+        pending = {self._executor.submit(self._attempt, i, base): i}
+        hedge_at = time.monotonic() + self.hedge_delay(self.sources[i])
+        while pending:
+            timeout = max(hedge_at - time.monotonic(), 0.0) if position < len(self.sources) else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            failed = False
+            for future in done:
+                i = pending.pop(future)
+                try:
+                    table = future.result()
+                except RateProviderError as e:
+                    errors.append(e)
+                    failed = True
+                    continue
+                self.sources[i].wins += 1
+                return table
+
+            # Slow (no answer by the deadline) or failed: bring in the next source
+            i = self._next_source(position)
+            if i is None:
+                position = len(self.sources)
+                continue
+            position = i + 1
+            source = self.sources[i]
+            if failed:
+                source.failovers += 1
+            else:
+                source.hedges += 1
+            pending[self._executor.submit(self._attempt, i, base)] = i
+            hedge_at = time.monotonic() + self.hedge_delay(source)
+        raise self._error(base, errors)
+
+    def close(self):
+        """Close every source's connections."""
+        self._executor.shutdown(wait=False)
+        for client in self.clients:
+            client.close()
+
+
+class AsyncHedgedProvider(BaseHedgedProvider):
+    """Asyncio hedged provider over AsyncRateProviderClient sources."""
+
+    def __init__(self, clients: Sequence[BaseRateProviderClient], **kwargs):
+        super().__init__(clients, **kwargs)
+        # Requests that lost a race, kept referenced until they finish
+        self._stragglers = set()
+
+    async def _attempt(self, i: int, base: str) -> RateTable:
+        source = self.sources[i]
+        start = time.perf_counter()
+        try:
+            table = await self.clients[i].fetch(base)
+        except RateProviderError as e:
+            source.record(time.perf_counter() - start, e)
+            raise
+        source.record(time.perf_counter() - start)
+        return table
+
+    async def fetch(self, base: str) -> RateTable:
+        """Fetch a base table from whichever usable source answers it first."""
+        import asyncio
+
+        errors = []
+        i = self._next_source(0)
+        if i is None:
+            raise self._error(base, errors)
+        position = i + 1
+        if position >= len(self.sources):
+            table = await self._attempt(i, base)
+            self.sources[i].wins += 1
+            return table
+
+        pending: Dict["asyncio.Task", int] = {asyncio.ensure_future(self._attempt(i, base)): i}
+        hedge_at = time.monotonic() + self.hedge_delay(self.sources[i])
+        try:
+            while pending:
+                timeout = max(hedge_at - time.monotonic(), 0.0) if position < len(self.sources) else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                failed = False
+                for task in done:
+                    i = pending.pop(task)
+                    try:
+                        table = task.result()
+                    except RateProviderError as e:
+                        errors.append(e)
+                        failed = True
+                        continue
+                    self.sources[i].wins += 1
+                    return table
+
+                i = self._next_source(position)
+                if i is None:
+                    position = len(self.sources)
+                    continue
+                position = i + 1
+                source = self.sources[i]
+                if failed:
+                    source.failovers += 1
+                else:
+                    source.hedges += 1
+                pending[asyncio.ensure_future(self._attempt(i, base))] = i
+                hedge_at = time.monotonic() + self.hedge_delay(source)
+            raise self._error(base, errors)
+        finally:
+            # Let losers finish so their timings are recorded
+            for task in pending:
+                self._stragglers.add(task)
+                task.add_done_callback(self._straggler_done)
+
+    def _straggler_done(self, task):
+        self._stragglers.discard(task)
+        if not task.cancelled():
+            task.exception()
+
+    async def close(self):
+        """Cancel requests still in flight and close every source's connections."""
+        for task in list(self._stragglers):
+            task.cancel()
+        for client in self.clients:
+            await client.close()
@@ -0,0 +1,344 @@
+"""
+Bounded conversion history.
+
+The live conversion_history table keeps recent rows only. Rows that fall
+outside the retention policy (older than max_age_days, or beyond the
+newest max_rows) are moved, oldest first and a small batch per
+transaction, into one archive database per month next to the main
+database:
+
+    currency_converter.db
+    currency_converter-history-2026-09.db
+    currency_converter-history-2026-08.db
+
+Archives older than keep_months are deleted. The hourly/daily rollups
+stay in the main database, so volume statistics still cover everything.
+History queries read the live table first and continue into the archives,
+newest month first, only when a page is not full yet.
+"""
+import glob
+import logging
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_PATTERN = re.compile(r"-history-(\d{4}-\d{2})\.db$")
+
+ARCHIVE_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS conversion_history (
+        id INTEGER PRIMARY KEY,
+        amount REAL,
+        from_currency TEXT,
+        to_currency TEXT,
+        result REAL,
+        conversion_date TIMESTAMP
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_history_date ON conversion_history (conversion_date, id)",
+    '''
+    CREATE INDEX IF NOT EXISTS idx_history_pair_date
+    ON conversion_history (from_currency, to_currency, conversion_date, id)
+    ''',
+)
+
+
+class RetentionPolicy(NamedTuple):
+    """How much history the live table keeps; None means no limit."""
+    max_age_days: Optional[float] = None
+    max_rows: Optional[int] = None
+    # Archive months kept besides the current one; None keeps them all
+    keep_months: Optional[int] = None
+    # Rows moved per transaction, and the pause between transactions
+    batch_size: int = 500
+    pause: float = 0.05
+
+
+def retention_from_env(environ) -> Optional[RetentionPolicy]:
+    """
+    Build a policy from CURRENCY_HISTORY_MAX_AGE_DAYS, CURRENCY_HISTORY_MAX_ROWS
+    and CURRENCY_HISTORY_KEEP_MONTHS, or None if none of them is set.
+    """
+    max_age_days = environ.get("CURRENCY_HISTORY_MAX_AGE_DAYS")
+    max_rows = environ.get("CURRENCY_HISTORY_MAX_ROWS")
+    keep_months = environ.get("CURRENCY_HISTORY_KEEP_MONTHS")
+    if not (max_age_days or max_rows or keep_months):
+        return None
+    return RetentionPolicy(
+        max_age_days=float(max_age_days) if max_age_days else None,
+        max_rows=int(max_rows) if max_rows else None,
+        keep_months=int(keep_months) if keep_months else None
+    )
+
+
+def month_bounds(month: str) -> Tuple[str, str]:
+    """[start, end) of a "YYYY-MM" month in the format conversion_date is stored in."""
+    year, number = map(int, month.split("-"))
+    end = f"{year + 1}-01" if number == 12 else f"{year}-{number + 1:02d}"
+    return f"{month}-01", f"{end}-01"
+
+
+class HistoryArchive:
+    """Monthly archive databases next to the main database."""
+
+    def __init__(self, db_path: str):
+        root, _ = os.path.splitext(os.path.abspath(db_path))
+        self.directory = os.path.dirname(root)
+        self.prefix = f"{root}-history-"
+        # Listing and per-month newest row, reused while the files are unchanged
+        self._months: Tuple[Optional[int], List[str]] = (None, [])
+        self._newest: Dict[str, Tuple[Tuple[int, int], Optional[str]]] = {}
+
+    def path_for(self, month: str) -> str:
+        return f"{self.prefix}{month}.db"
+
+    def months(self) -> List[str]:
+        """Archived months, newest first."""
+        try:
+            stamp = os.stat(self.directory).st_mtime_ns
+        except OSError:
+            return []
+        cached_stamp, months = self._months
+        if stamp == cached_stamp:
+            return months
+        months = []
+        for path in glob.glob(glob.escape(self.prefix) + "*.db"):
+            match = ARCHIVE_PATTERN.search(path)
+            if match and path == self.path_for(match.group(1)):
+                months.append(match.group(1))
+        months.sort(reverse=True)
+        self._months = (stamp, months)
+        return months
+
+    def newest(self, month: str) -> Optional[str]:
+        """conversion_date of the newest row archived for a month."""
+        try:
+            stat = os.stat(self.path_for(month))
+        except OSError:
+            return None
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        cached = self._newest.get(month)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        rows = self.query(month, "SELECT MAX(conversion_date) FROM conversion_history", ())
+        newest = rows[0][0] if rows else None
+        self._newest[month] = (stamp, newest)
+        return newest
+
+    def query(self, month: str, sql: str, params: Iterable) -> List[tuple]:
+        """Run a read-only query against one month's archive."""
+        try:
+            conn = sqlite3.connect(f"file:{self.path_for(month)}?mode=ro", uri=True)
+        except sqlite3.OperationalError:
+            # Dropped by retention since months() listed it
+            return []
+        try:
+            return conn.execute(sql, list(params)).fetchall()
+        finally:
+            conn.close()
+
+    def drop(self, month: str):
+        for suffix in ("", "-journal", "-wal", "-shm"):
+            try:
+                os.remove(self.path_for(month) + suffix)
+            except FileNotFoundError:
+                pass
+
+
+def merge_pages(pages: Iterable[List[tuple]], limit: int) -> List[tuple]:
+    """
+    Merge (id, ..., conversion_date) rows from several partitions, newest
+    first, dropping a row that shows up twice while it is being moved.
+    """
+    seen = set()
+    merged = []
+    for row in sorted((row for page in pages for row in page),
+                      key=lambda row: (row[-1], row[0]), reverse=True):
+        if row[0] not in seen:
+            seen.add(row[0])
+            merged.append(row)
+            if len(merged) == limit:
+                break
+    return merged
+
+
+class HistoryMaintenance:
+    """
+    Background thread that applies a RetentionPolicy every interval
+    seconds and then returns freed pages to the filesystem with
+    incremental vacuum. It uses its own connection, since archives are
+    attached to it while rows are moved.
+    """
+
+    def __init__(self, db_path: str, archive: HistoryArchive, policy: RetentionPolicy,
+                 interval: float = 600.0, vacuum_pages: int = 256,
+                 journal_mode: Optional[str] = None):
+        self.db_path = db_path
+        self.journal_mode = journal_mode
+        self.archive = archive
+        self.policy = policy
+        self.interval = interval
+        self.vacuum_pages = vacuum_pages
+        self.archived = 0
+        self.dropped_months = 0
+        self.vacuumed_pages = 0
+        self.runs = 0
+
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        """Start the maintenance thread if it is not already running."""
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="history-maintenance", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the maintenance thread, after the batch in progress."""
+        with self._cond:
+            thread, self._thread = self._thread, None
+            self._stopped = True
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join()
+
+    def _run(self):
+        while True:
+            try:
+                self.run_once()
+            except sqlite3.Error as e:
+                # Busy or locked past the timeout; try again next interval
+                logger.warning("History maintenance error: %s", e)
+            with self._cond:
+                if not self._stopped:
+                    self._cond.wait(self.interval)
+                if self._stopped:
+                    return
+
+    def _sleep(self) -> bool:
+        """Pause between batches; False if stopped meanwhile."""
+        with self._cond:
+            if not self._stopped and self.policy.pause:
+                self._cond.wait(self.policy.pause)
+            return not self._stopped
+
+    def run_once(self) -> Tuple[int, int, int]:
+        """Apply the policy once; return (rows archived, months dropped, pages vacuumed)."""
+        conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+        try:
+            if self.journal_mode:
+                conn.execute(f"PRAGMA journal_mode={self.journal_mode}")
+            archived = self._archive_rows(conn)
+            dropped = self._drop_months()
+            vacuumed = self._vacuum(conn)
+        finally:
+            conn.close()
+        self.runs += 1
+        return archived, dropped, vacuumed
+
+    def _archive_rows(self, conn: sqlite3.Connection) -> int:
+        """Move rows outside the policy into their month's archive, a batch at a time."""
+        policy = self.policy
+        cutoff = None
+        if policy.max_age_days is not None:
+            cutoff = (datetime.now() - timedelta(days=policy.max_age_days)).isoformat(" ")
+        excess = 0
+        if policy.max_rows is not None:
+            (count,) = conn.execute("SELECT COUNT(*) FROM conversion_history").fetchone()
+            excess = max(count - policy.max_rows, 0)
+        if cutoff is None and not excess:
+            return 0
+
+        moved = 0
+        while True:
+            rows = conn.execute('''
+                SELECT id, substr(conversion_date, 1, 7), conversion_date
+                FROM conversion_history
+                ORDER BY conversion_date, id
+                LIMIT ?
+            ''', (policy.batch_size,)).fetchall()
+            # Oldest first: everything over the row cap, then anything past the age cutoff
+            due = [
+                (row_id, month) for i, (row_id, month, conversion_date) in enumerate(rows)
+                if i < excess or (cutoff is not None and conversion_date is not None and conversion_date < cutoff)
+            ]
+            if not due:
+                return moved
+
+            by_month = {}
+            for row_id, month in due:
+                by_month.setdefault(month or "0000-00", []).append(row_id)
+            for month, ids in by_month.items():
+                self._move(conn, month, ids)
+            moved += len(due)
+            excess = max(excess - len(due), 0)
+            self.archived += len(due)
+            if not self._sleep():
+                return moved
+
+    def _move(self, conn: sqlite3.Connection, month: str, ids: List[int]):
+        """Copy rows into a month's archive and delete them from the live table."""
+        conn.execute("ATTACH DATABASE ? AS archive", (self.archive.path_for(month),))
+        try:
+            for statement in ARCHIVE_SCHEMA:
+                conn.execute(statement.replace("IF NOT EXISTS ", "IF NOT EXISTS archive.", 1))
+            marks = ",".join("?" * len(ids))
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # OR IGNORE: a batch interrupted before its delete is simply redone
+                conn.execute(f'''
+                    INSERT OR IGNORE INTO archive.conversion_history
+                    SELECT id, amount, from_currency, to_currency, result, conversion_date
+                    FROM main.conversion_history WHERE id IN ({marks})
+                ''', ids)
+                conn.execute(f"DELETE FROM main.conversion_history WHERE id IN ({marks})", ids)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.execute("DETACH DATABASE archive")
+
+    def _drop_months(self) -> int:
+        """Delete archives older than keep_months."""
+        if self.policy.keep_months is None:
+            return 0
+        now = datetime.now()
+        index = now.year * 12 + now.month - 1 - self.policy.keep_months
+        oldest_kept = f"{index // 12:04d}-{index % 12 + 1:02d}"
+        dropped = 0
+        for month in self.archive.months():
+            if month < oldest_kept:
+                self.archive.drop(month)
+                dropped += 1
+        self.dropped_months += dropped
+        return dropped
+
+    def _vacuum(self, conn: sqlite3.Connection) -> int:
+        """Release free pages in small steps; a no-op unless auto_vacuum is INCREMENTAL."""
+        (mode,) = conn.execute("PRAGMA auto_vacuum").fetchone()
+        if mode != 2:
+            return 0
+        vacuumed = 0
+        while True:
+            (free,) = conn.execute("PRAGMA freelist_count").fetchone()
+            if not free:
+                return vacuumed
+            # executescript steps the pragma to completion; execute() would free one page
+            conn.executescript(f"PRAGMA incremental_vacuum({min(free, self.vacuum_pages)});")
+            (left,) = conn.execute("PRAGMA freelist_count").fetchone()
+            if left >= free:
+                return vacuumed
+            vacuumed += free - left
+            self.vacuumed_pages += free - left
+            if not self._sleep():
+                return vacuumed
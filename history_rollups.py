@@ -0,0 +1,168 @@
+import sqlite3
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+# Bucket granularity -> strftime format of the bucket start. Buckets are
+# stored as text in the same format as conversion_date, so they sort and
+# compare the same way.
+GRANULARITIES = {
+    "hour": "%Y-%m-%d %H:00:00",
+    "day": "%Y-%m-%d",
+}
+
+# Buckets returned by one query at most
+MAX_STATS_ROWS = 1000
+
+# (granularity, bucket, from_currency, to_currency) -> (conversions, total_amount, total_result)
+RollupDelta = Dict[Tuple[str, str, str, str], List[float]]
+
+
+def create_rollup_tables(conn: sqlite3.Connection):
+    """
+    Create the rollup table. If it did not exist yet, fill it from the
+    existing conversion_history once, in the caller's transaction.
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'history_rollups'"
+    ).fetchone()
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS history_rollups (
+            granularity TEXT,
+            bucket TEXT,
+            from_currency TEXT,
+            to_currency TEXT,
+            conversions INTEGER,
+            total_amount REAL,
+            total_result REAL,
+            PRIMARY KEY (granularity, bucket, from_currency, to_currency)
+        ) WITHOUT ROWID
+    ''')
+    if exists:
+        return
+
+    # One-off backfill; from here on rollups move with every history insert
+    for granularity, length in (("hour", 13), ("day", 10)):
+        suffix = ":00:00" if granularity == "hour" else ""
+        conn.execute(f'''
+            INSERT INTO history_rollups
+            SELECT ?, substr(conversion_date, 1, {length}) || '{suffix}',
+                   from_currency, to_currency, COUNT(*), SUM(amount), SUM(result)
+            FROM conversion_history
+            WHERE conversion_date IS NOT NULL
+              AND from_currency IS NOT NULL AND to_currency IS NOT NULL
+            GROUP BY 2, from_currency, to_currency
+        ''', (granularity,))
+
+
+def bucket_of(conversion_date: Union[str, datetime], granularity: str) -> str:
+    """Return the start of the bucket a conversion falls in."""
+    if not isinstance(conversion_date, datetime):
+        conversion_date = datetime.fromisoformat(conversion_date)
+    return conversion_date.strftime(GRANULARITIES[granularity])
+
+
+def rollup_delta(rows: Sequence[tuple]) -> RollupDelta:
+    """Aggregate (amount, from, to, result, conversion_date) rows into bucket deltas."""
+    delta: RollupDelta = {}
+    # Batches usually share a handful of timestamps; format each one once
+    buckets: Dict[object, List[Tuple[str, str]]] = {}
+    for amount, from_currency, to_currency, result, conversion_date in rows:
+        starts = buckets.get(conversion_date)
+        if starts is None:
+            starts = buckets[conversion_date] = [
+                (granularity, bucket_of(conversion_date, granularity)) for granularity in GRANULARITIES
+            ]
+        for granularity, bucket in starts:
+            key = (granularity, bucket, from_currency, to_currency)
+            totals = delta.get(key)
+            if totals is None:
+                delta[key] = [1, amount, result]
+            else:
+                totals[0] += 1
+                totals[1] += amount
+                totals[2] += result
+    return delta
+
+
+def insert_history(conn: sqlite3.Connection, rows: Sequence[tuple]):
+    """
+    Insert history rows and fold them into the rollups in one transaction,
+    so the rollups never disagree with the committed history. A batch only
+    touches one rollup row per pair and bucket.
+    """
+    delta = rollup_delta(rows)
+    with conn:
+        conn.executemany('''
+            INSERT INTO conversion_history
+            (amount, from_currency, to_currency, result, conversion_date)
+            VALUES (?, ?, ?, ?, ?)
+        ''', rows)
+        conn.executemany('''
+            INSERT INTO history_rollups
+            (granularity, bucket, from_currency, to_currency, conversions, total_amount, total_result)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (granularity, bucket, from_currency, to_currency) DO UPDATE SET
+                conversions = conversions + excluded.conversions,
+                total_amount = total_amount + excluded.total_amount,
+                total_result = total_result + excluded.total_result
+        ''', [key + tuple(totals) for key, totals in delta.items()])
+
+
+def _bucket_filters(granularity: str, from_currency: Optional[str], to_currency: Optional[str],
+                    since: Union[str, datetime, None],
+                    until: Union[str, datetime, None]) -> Tuple[str, list]:
+    """Build the WHERE clause shared by the stats queries."""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    clauses = ["granularity = ?"]
+    params: list = [granularity]
+    if from_currency:
+        clauses.append("from_currency = ?")
+        params.append(from_currency)
+    if to_currency:
+        clauses.append("to_currency = ?")
+        params.append(to_currency)
+    # Bounds snap to whole buckets: [bucket of since, bucket of until)
+    if since is not None:
+        clauses.append("bucket >= ?")
+        params.append(bucket_of(since, granularity))
+    if until is not None:
+        clauses.append("bucket < ?")
+        params.append(bucket_of(until, granularity))
+    return " AND ".join(clauses), params
+
+
+def volume(conn: sqlite3.Connection, granularity: str = "day",
+           from_currency: Optional[str] = None, to_currency: Optional[str] = None,
+           since: Union[str, datetime, None] = None, until: Union[str, datetime, None] = None,
+           limit: int = 100) -> List[tuple]:
+    """
+    Return (bucket, from, to, conversions, total_amount, total_result) rows,
+    newest bucket first. Raises ValueError for a bad granularity or date.
+    """
+    where, params = _bucket_filters(granularity, from_currency, to_currency, since, until)
+    return conn.execute(f'''
+        SELECT bucket, from_currency, to_currency, conversions, total_amount, total_result
+        FROM history_rollups
+        WHERE {where}
+        ORDER BY bucket DESC, from_currency, to_currency
+        LIMIT ?
+    ''', params + [max(1, min(limit, MAX_STATS_ROWS))]).fetchall()
+
+
+def top_pairs(conn: sqlite3.Connection, limit: int = 10,
+              since: Union[str, datetime, None] = None, until: Union[str, datetime, None] = None,
+              granularity: str = "day") -> List[tuple]:
+    """
+    Return (from, to, conversions, total_amount, total_result) for the most
+    converted pairs, summed over daily (or hourly) buckets.
+    """
+    where, params = _bucket_filters(granularity, None, None, since, until)
+    return conn.execute(f'''
+        SELECT from_currency, to_currency, SUM(conversions), SUM(total_amount), SUM(total_result)
+        FROM history_rollups
+        WHERE {where}
+        GROUP BY from_currency, to_currency
+        ORDER BY SUM(conversions) DESC, from_currency, to_currency
+        LIMIT ?
+    ''', params + [max(1, min(limit, MAX_STATS_ROWS))]).fetchall()
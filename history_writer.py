@@ -0,0 +1,226 @@
+import atexit
+import logging
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+from history_rollups import insert_history
+from metrics import Histogram
+
+# (amount, from_currency, to_currency, result, conversion_date)
+HistoryRow = Tuple[float, str, str, float, datetime]
+
+BACKPRESSURE_POLICIES = ("block", "drop")
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryWriter:
+    """
+    Write-behind logger for the conversion_history table (and its rollups).
+
+    Conversions are appended to a bounded in-memory queue and a background
+    thread inserts them in batches, committing once per batch. A batch is
+    flushed when it reaches batch_size rows or when flush_interval seconds
+    have passed since the oldest queued row, whichever comes first.
+
+    Durability window: rows that have been queued but not yet committed are
+    lost if the process dies without running close(). At most max_queue
+    rows, and normally no more than flush_interval seconds of history, are
+    at risk. close() is registered with atexit so a normal interpreter exit
+    flushes everything.
+
+    A batch whose insert fails (e.g. the database stays locked past the
+    busy timeout) is retried up to retries more times, retry_backoff
+    seconds apart and doubling; its rows stay in pending_rows() and
+    flush() waits for them meanwhile. A batch that still fails is logged
+    and counted in dropped.
+
+    Backpressure: when the queue is full, the "block" policy makes the
+    caller wait for the writer to catch up (up to block_timeout seconds,
+    after which the row is written synchronously), and the "drop" policy
+    discards the new row and counts it in dropped.
+
+    commit_histogram, if given, observes how long each batch commit takes.
+    """
+
+    def __init__(self, db_path: str, batch_size: int = 500, flush_interval: float = 1.0,
+                 max_queue: int = 10000, backpressure: str = "block",
+                 block_timeout: float = 5.0, synchronous: str = "NORMAL",
+                 commit_histogram: Optional[Histogram] = None, retries: int = 3,
+                 retry_backoff: float = 0.5, journal_mode: Optional[str] = None):
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"backpressure must be one of {', '.join(BACKPRESSURE_POLICIES)}")
+
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.backpressure = backpressure
+        self.block_timeout = block_timeout
+        self.synchronous = synchronous
+        self.journal_mode = journal_mode
+        self.commit_histogram = commit_histogram
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.dropped = 0
+        self.written = 0
+
+        self._pending = deque()
+        self._in_flight: List[HistoryRow] = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._oldest = None
+        self._flush_requested = False
+
+        self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def put(self, row: HistoryRow) -> bool:
+        """Queue one history row. Returns False if it was dropped."""
+        return self.put_many([row]) == 1
+
+    def put_many(self, rows: Sequence[HistoryRow]) -> int:
+        """Queue history rows. Returns the number of rows accepted."""
+        accepted = 0
+        overflow = []
+        with self._cond:
+            if self._closed:
+                overflow = list(rows)
+            else:
+                deadline = time.monotonic() + self.block_timeout
+                for row in rows:
+                    while len(self._pending) >= self.max_queue and self.backpressure == "block":
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.notify_all()
+                        self._cond.wait(remaining)
+                    if len(self._pending) >= self.max_queue:
+                        if self.backpressure == "drop":
+                            self.dropped += 1
+                            continue
+                        overflow.append(row)
+                        continue
+                    if not self._pending:
+                        self._oldest = time.monotonic()
+                    self._pending.append(row)
+                    accepted += 1
+                if len(self._pending) >= self.batch_size:
+                    self._cond.notify_all()
+
+        # Writer is closed or could not keep up: fall back to a direct write
+        if overflow:
+            self._write(overflow)
+            accepted += len(overflow)
+        return accepted
+
+    def pending_rows(self) -> List[HistoryRow]:
+        """Return rows that are queued or being written but not yet committed."""
+        with self._cond:
+            return self._in_flight + list(self._pending)
+
+    def flush(self, timeout: Optional[float] = None):
+        """Block until every row queued so far has been committed."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._pending or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+    def close(self):
+        """Flush outstanding rows and stop the background thread."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        atexit.unregister(self.close)
+
+    def _run(self):
+        """Background loop: wait for a full batch or the flush deadline, then write."""
+        conn = self._connect()
+        try:
+            while True:
+                with self._cond:
+                    while not self._closed:
+                        if len(self._pending) >= self.batch_size:
+                            break
+                        if self._pending and self._flush_requested:
+                            break
+                        if self._pending:
+                            wait = self._oldest + self.flush_interval - time.monotonic()
+                            if wait <= 0:
+                                break
+                        else:
+                            wait = None
+                        self._cond.wait(wait)
+
+                    if not self._pending:
+                        self._flush_requested = False
+                        if self._closed:
+                            return
+                        continue
+
+                    count = min(len(self._pending), self.batch_size)
+                    self._in_flight = [self._pending.popleft() for _ in range(count)]
+                    self._oldest = time.monotonic() if self._pending else None
+                    batch = self._in_flight
+                    # Wake producers blocked on a full queue
+                    self._cond.notify_all()
+
+                written = self._insert_batch(conn, batch)
+
+                with self._cond:
+                    if written:
+                        self.written += len(batch)
+                    else:
+                        self.dropped += len(batch)
+                    self._in_flight = []
+                    self._cond.notify_all()
+        finally:
+            conn.close()
+
+    def _insert_batch(self, conn: sqlite3.Connection, batch: List[HistoryRow]) -> bool:
+        """Commit one batch, retrying with backoff; False if it could not be written."""
+        for attempt in range(self.retries + 1):
+            start = time.perf_counter()
+            try:
+                insert_history(conn, batch)
+            except sqlite3.Error as e:
+                if attempt == self.retries:
+                    logger.error("History write failed, %d rows lost: %s", len(batch), e)
+                    return False
+                delay = self.retry_backoff * 2 ** attempt
+                logger.warning("History write failed, retrying in %.1f s: %s", delay, e)
+                time.sleep(delay)
+                continue
+            if self.commit_histogram is not None:
+                self.commit_histogram.observe(time.perf_counter() - start)
+            return True
+        return False
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the writer's own connection to the history database."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        if self.journal_mode:
+            conn.execute(f"PRAGMA journal_mode={self.journal_mode}")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        return conn
+
+    def _write(self, rows: Sequence[HistoryRow]):
+        """Write rows synchronously on the calling thread."""
+        conn = self._connect()
+        try:
+            insert_history(conn, rows)
+        finally:
+            conn.close()
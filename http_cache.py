@@ -0,0 +1,150 @@
+"""
+HTTP caching helpers shared by the Flask and ASGI servers: validators
+for rate responses, conditional request checks and a small LRU cache of
+resolved rates keyed by pair.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Hashable, NamedTuple, Optional, Tuple
+
+
+class CachedRate(NamedTuple):
+    """A resolved rate with the validators sent along with it."""
+    from_currency: str
+    to_currency: str
+    rate: float
+    # Currencies the rate was chained through
+    path: Tuple[str, ...]
+    updated: datetime
+    etag: str
+    last_modified: str
+    # time.monotonic() deadline after which the rate is no longer fresh
+    fresh_until: float
+    # RateMatrix.version the rate was resolved against
+    version: int
+
+    def payload(self) -> dict:
+        """The /rate response body; rate_age is computed at send time."""
+        return {
+            "from_currency": self.from_currency,
+            "to_currency": self.to_currency,
+            "rate": self.rate,
+            "path": list(self.path),
+            "rate_age": max((datetime.now() - self.updated).total_seconds(), 0.0)
+        }
+
+    def headers(self) -> Dict[str, str]:
+        """Validators and Cache-Control for the remaining freshness lifetime."""
+        max_age = max(int(self.fresh_until - time.monotonic()), 0)
+        return {
+            "ETag": self.etag,
+            "Last-Modified": self.last_modified,
+            "Cache-Control": f"public, max-age={max_age}"
+        }
+
+
+def http_date(value: datetime) -> str:
+    """Format a (naive local or aware) datetime as an HTTP date."""
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def make_cached_rate(from_currency: str, to_currency: str, rate: float, age: float,
+                     path: Tuple[str, ...], ttl: float, version: int) -> CachedRate:
+    """Build the cache entry for a freshly resolved rate."""
+    updated = datetime.now() - timedelta(seconds=age)
+    # Weak: the body also carries rate_age, which changes while the rate does not
+    digest = hashlib.sha1(f"{from_currency}:{to_currency}:{rate!r}:{'-'.join(path)}".encode()).hexdigest()[:20]
+    return CachedRate(
+        from_currency, to_currency, rate, path, updated,
+        f'W/"{digest}"', http_date(updated),
+        time.monotonic() + max(ttl - age, 0.0), version
+    )
+
+
+def static_response(payload, max_age: int = 86400):
+    """Precompute (body, headers) for a response that never changes while the process runs."""
+    body = json.dumps(payload).encode()
+    headers = {
+        "Content-Type": "application/json",
+        "ETag": '"' + hashlib.sha1(body).hexdigest()[:20] + '"',
+        "Cache-Control": f"public, max-age={max_age}"
+    }
+    return body, headers
+
+
+def not_modified(request_headers, etag: str, last_modified: Optional[str] = None) -> bool:
+    """
+    True if a conditional GET can be answered with 304. If-None-Match
+    takes precedence over If-Modified-Since, as RFC 9110 requires.
+    """
+    if_none_match = request_headers.get("If-None-Match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        wanted = etag[2:] if etag.startswith("W/") else etag
+        for candidate in if_none_match.split(","):
+            candidate = candidate.strip()
+            if candidate.startswith("W/"):
+                candidate = candidate[2:]
+            if candidate == wanted:
+                return True
+        return False
+
+    if_modified_since = request_headers.get("If-Modified-Since")
+    if if_modified_since and last_modified:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+class ResponseCache:
+    """
+    LRU cache of resolved rates. An entry is served only while its rate
+    is fresh and the rate matrix has not changed since it was resolved,
+    so a hit never needs the converter and never serves an outdated rate.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, CachedRate]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: int) -> Optional[CachedRate]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version and time.monotonic() < entry.fresh_until:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, entry: CachedRate) -> CachedRate:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def collect_metrics(self):
+        """Scrape-time samples for Metrics.add_collector."""
+        help = "Rate lookups answered by the HTTP response cache"
+        return [
+            ("currency_response_cache_lookups_total", "counter", help, {"result": "hit"}, self.hits),
+            ("currency_response_cache_lookups_total", "counter", help, {"result": "miss"}, self.misses),
+            ("currency_response_cache_entries", "gauge", "Rates held in the HTTP response cache",
+             {}, len(self._entries)),
+        ]
+
+    def __len__(self) -> int:
+        return len(self._entries)
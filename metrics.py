@@ -0,0 +1,251 @@
+import bisect
+import contextvars
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Histogram bucket upper bounds in seconds, from sub-millisecond SQLite
+# commits to multi-second provider timeouts
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (name, type, help, labels, value) reported by a collector at scrape time
+Sample = Tuple[str, str, str, Dict[str, str], float]
+
+# Spans of the request being handled in this thread or task, if tracing it
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("trace", default=None)
+
+
+class Counter:
+    """Monotonic counter."""
+
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    """Fixed-bucket histogram of observed values (usually seconds)."""
+
+    __slots__ = ("bounds", "counts", "sum", "count", "_lock")
+
+    def __init__(self, bounds: Iterable[float] = DEFAULT_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self) -> "_Timer":
+        """Context manager that observes the duration of its block."""
+        return _Timer(self)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile as the upper bound of the bucket it falls in."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class _Span:
+    __slots__ = ("trace", "name", "start")
+
+    def __init__(self, trace: list, name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.append((self.name, time.perf_counter() - self.start))
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Metrics:
+    """
+    In-process counters and histograms, rendered in the Prometheus text
+    format. Updating a metric costs a lock and an addition, so they can
+    sit on hot paths. Values other objects already track (queue sizes,
+    cache hits) are read at scrape time through collectors.
+
+    Per-request timing spans are off by default. Setting spans_enabled at
+    runtime turns them on for requests that start afterwards; the most
+    recent traces are kept in traces.
+    """
+
+    def __init__(self, spans_enabled: bool = False, max_traces: int = 100):
+        self.spans_enabled = spans_enabled
+        self.traces = deque(maxlen=max_traces)
+        # name -> (type, help, {labels: metric})
+        self._families: Dict[str, Tuple[str, str, Dict[Tuple[Tuple[str, str], ...], object]]] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+        self._lock = threading.Lock()
+
+    def _metric(self, kind: str, name: str, help: str, labels: Dict[str, str], factory):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = (kind, help, {})
+            elif family[0] != kind:
+                raise ValueError(f"{name} is already registered as a {family[0]}")
+            metric = family[2].get(key)
+            if metric is None:
+                metric = family[2][key] = factory()
+            return metric
+
+    def counter(self, name: str, help: str, **labels: str) -> Counter:
+        """Return the counter for name and labels, creating it on first use."""
+        return self._metric("counter", name, help, labels, Counter)
+
+    def histogram(self, name: str, help: str, buckets: Iterable[float] = DEFAULT_BUCKETS,
+                  **labels: str) -> Histogram:
+        """Return the histogram for name and labels, creating it on first use."""
+        return self._metric("histogram", name, help, labels, lambda: Histogram(buckets))
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]):
+        """Register a callable that reports extra samples at scrape time."""
+        self._collectors.append(collector)
+
+    def begin_trace(self) -> Optional[contextvars.Token]:
+        """Start collecting spans for the current request, if spans are enabled."""
+        if not self.spans_enabled:
+            return None
+        return _current_trace.set([])
+
+    def end_trace(self, token: Optional[contextvars.Token], name: str) -> List[Tuple[str, float]]:
+        """Stop collecting spans for the current request and return them."""
+        if token is None:
+            return []
+        spans = _current_trace.get()
+        _current_trace.reset(token)
+        self.traces.append({"name": name, "time": time.time(),
+                            "spans": [(span, round(seconds * 1000, 3)) for span, seconds in spans]})
+        return spans
+
+    @staticmethod
+    def span(name: str):
+        """Time a block as part of the current trace; a no-op when not tracing."""
+        trace = _current_trace.get()
+        if trace is None:
+            return _NO_SPAN
+        return _Span(trace, name)
+
+    def _samples(self) -> List[Tuple[str, str, str, List[Tuple[Dict[str, str], object]]]]:
+        """Return (name, type, help, [(labels, metric or value)]) for every family."""
+        with self._lock:
+            families = [
+                (name, kind, help, [(dict(key), metric) for key, metric in metrics.items()])
+                for name, (kind, help, metrics) in sorted(self._families.items())
+            ]
+        collected: Dict[str, Tuple[str, str, list]] = {}
+        for collector in self._collectors:
+            for name, kind, help, labels, value in collector():
+                collected.setdefault(name, (kind, help, []))[2].append((labels, value))
+        families += [(name, kind, help, values) for name, (kind, help, values) in sorted(collected.items())]
+        return families
+
+    def render_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        for name, kind, help, values in self._samples():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, metric in values:
+                if kind != "histogram":
+                    value = metric.value if isinstance(metric, Counter) else metric
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.bounds + (float("inf"),), metric.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else _number(bound)
+                    lines.append(f"{name}_bucket{_labels(dict(labels, le=le))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(metric.sum)}")
+                lines.append(f"{name}_count{_labels(labels)} {metric.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> List[str]:
+        """Human-readable one line per metric, for the CLI."""
+        lines = []
+        for name, kind, _, values in self._samples():
+            for labels, metric in values:
+                if kind != "histogram":
+                    value = metric.value if isinstance(metric, Counter) else metric
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                elif metric.count:
+                    lines.append(
+                        f"{name}{_labels(labels)} count={metric.count} "
+                        f"avg={metric.sum / metric.count * 1000:.2f}ms "
+                        f"p50<={metric.quantile(0.5) * 1000:g}ms p99<={metric.quantile(0.99) * 1000:g}ms"
+                    )
+        return lines
+
+
+def server_timing(spans: List[Tuple[str, float]]) -> str:
+    """Format spans as a Server-Timing header value."""
+    return ", ".join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in spans)
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
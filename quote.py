@@ -0,0 +1,49 @@
+"""
+Conversion quotes: everything a caller reports about a conversion,
+answered by a single rate lookup.
+"""
+from typing import NamedTuple, Optional, Tuple
+
+
+class Quote(NamedTuple):
+    """
+    One resolved conversion. As a NamedTuple it is immutable, has empty
+    __slots__ and costs a single allocation.
+    """
+    amount: float
+    from_currency: str
+    to_currency: str
+    rate: float
+    # to -> from rate, known without a second lookup
+    inverse: Optional[float]
+    result: float
+    # Seconds since the rate's (oldest) table was fetched
+    age: float
+    # Currencies the rate was chained through, e.g. ("GBP", "USD", "JPY")
+    path: Tuple[str, ...]
+
+    @classmethod
+    def from_route(cls, amount: float, from_currency: str, to_currency: str,
+                   rate: float, age: float, path: Tuple[str, ...]) -> "Quote":
+        """Build a quote from a resolve_route() result."""
+        return cls(amount, from_currency, to_currency, rate,
+                   1.0 / rate if rate else None, amount * rate, age, path)
+
+    def swapped(self) -> "Quote":
+        """The same amount converted the other way, from the inverse rate."""
+        inverse = self.inverse if self.inverse is not None else 0.0
+        return Quote(self.amount, self.to_currency, self.from_currency, inverse, self.rate,
+                     self.amount * inverse, self.age, self.path[::-1])
+
+    def payload(self) -> dict:
+        """The /convert response body."""
+        return {
+            "amount": self.amount,
+            "from_currency": self.from_currency,
+            "to_currency": self.to_currency,
+            "result": self.result,
+            "rate": self.rate,
+            "inverse_rate": self.inverse,
+            "rate_age": self.age,
+            "path": list(self.path)
+        }
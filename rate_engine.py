@@ -0,0 +1,369 @@
+import itertools
+import threading
+from array import array
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+# Marker for "no rate known" inside a base vector
+MISSING = float("nan")
+
+# Process-wide source of RateMatrix.version values, so a replaced matrix
+# never repeats the version of the one it replaced
+_versions = itertools.count(1)
+
+
+class Route(NamedTuple):
+    """How a rate was resolved."""
+    rate: float
+    # Currencies from source to target, e.g. ("GBP", "USD", "JPY")
+    path: Tuple[str, ...]
+    # The oldest table the rate depends on, and when it was stored
+    base: str
+    updated: datetime
+
+
+# Base-to-base leg, or a partial route: (hops, oldest table time, rate,
+# code indexes after the start, ending with the target base)
+_Leg = Tuple[int, datetime, float, Tuple[int, ...]]
+
+# Oldest table time of a route that has not used a table yet
+_NO_TABLE = datetime.max
+
+
+def _better(candidate: _Leg, current: Optional[_Leg]) -> bool:
+    """Fewer hops first, then the fresher oldest table."""
+    return current is None or (candidate[0], current[1]) < (current[0], candidate[1])
+
+
+class RateMatrix:
+    """
+    In-memory exchange rate engine.
+
+    Every currency code is mapped to an integer index once. For each base
+    currency fetched from the provider we keep one vector of rates indexed
+    by those integers, so a lookup never builds pair strings or recurses:
+    a direct or inverse rate is a single index, and a cross rate is one
+    division between two entries of the same base vector.
+
+    Reads take no lock. Writers serialize on a lock and never modify a
+    published vector in place: they build a new one and swap it into the
+    dict, so a concurrent reader sees either the old or the new table.
+
+    version changes whenever any table is published, so callers can keep
+    values derived from the matrix and check cheaply that they still hold.
+
+    Pairs that no single table covers are resolved through a graph of
+    legs between the stored bases, searched for the best path (fewest
+    hops, then freshest tables). Publishing a table only marks its legs
+    stale; they are recomputed the next time a lookup needs the graph,
+    so bulk loads and refreshes never pay for routing. Resolved cross
+    routes are memoized until the next publish, so a repeated lookup is
+    one dict access.
+    """
+
+    def __init__(self):
+        self.codes: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.vectors: Dict[int, array] = {}
+        self.updated: Dict[int, datetime] = {}
+        # Bases in the order they were loaded, used as pivots for cross rates
+        self.pivots: List[int] = []
+        self.version = next(_versions)
+        # from base -> {to base: best direct or bridged leg between them}
+        self._legs: Dict[int, Dict[int, _Leg]] = {}
+        # Bases published since their legs were last computed
+        self._stale_legs: Set[int] = set()
+        # Resolved cross routes, replaced (not cleared) on every publish
+        self._memo: Dict[Tuple[int, int], Optional[Route]] = {}
+        self._write_lock = threading.Lock()
+
+    def index_of(self, code: str) -> int:
+        """Return the index for a currency code, registering it if new (writers only)."""
+        idx = self.index.get(code)
+        if idx is None:
+            idx = len(self.codes)
+            self.codes.append(code)
+            self.index[code] = idx
+        return idx
+
+    def _copy_vector(self, base_idx: int) -> array:
+        """Return a private copy of the base vector, sized to cover every code."""
+        vector = self.vectors.get(base_idx)
+        if vector is None:
+            return array('d', [MISSING]) * len(self.codes)
+        vector = array('d', vector)
+        if len(vector) < len(self.codes):
+            vector.extend([MISSING] * (len(self.codes) - len(vector)))
+        return vector
+
+    def _publish(self, base_idx: int, vector: array, updated: datetime):
+        """Swap a finished vector in for readers."""
+        is_new = base_idx not in self.vectors
+        self.updated[base_idx] = updated
+        self.vectors[base_idx] = vector
+        if is_new:
+            self.pivots.append(base_idx)
+        self._stale_legs.add(base_idx)
+        self._memo = {}
+        self.version = next(_versions)
+
+    def _leg(self, from_base: int, to_base: int) -> Optional[_Leg]:
+        """Best single leg between two bases: a direct rate, else a bridge through a shared code."""
+        best = None
+        vector = self.vectors[from_base]
+        if to_base < len(vector) and vector[to_base] == vector[to_base]:
+            best = (1, self.updated[from_base], vector[to_base], (to_base,))
+        vector = self.vectors[to_base]
+        if from_base < len(vector) and vector[from_base] == vector[from_base] and vector[from_base]:
+            leg = (1, self.updated[to_base], 1 / vector[from_base], (to_base,))
+            if _better(leg, best):
+                best = leg
+        if best is not None:
+            return best
+
+        # from_base -> X -> to_base through any code both tables quote
+        source, target = self.vectors[from_base], self.vectors[to_base]
+        for idx in range(min(len(source), len(target))):
+            from_rate, to_rate = source[idx], target[idx]
+            if from_rate == from_rate and to_rate == to_rate and to_rate:
+                updated = min(self.updated[from_base], self.updated[to_base])
+                return 2, updated, from_rate / to_rate, (idx, to_base)
+        return None
+
+    def _base_graph(self) -> Dict[int, Dict[int, _Leg]]:
+        """Legs between stored bases, recomputing those touching a base published since the last call."""
+        with self._write_lock:
+            stale = self._stale_legs
+            if not stale:
+                return self._legs
+            # Rebuilt rather than updated in place: searches may still be reading the old graph
+            legs = {}
+            for start in self.pivots:
+                previous = self._legs.get(start, {}) if start not in stale else {}
+                row = {}
+                for end in self.pivots:
+                    if end == start:
+                        continue
+                    leg = self._leg(start, end) if end in stale or start in stale else previous.get(end)
+                    if leg is not None:
+                        row[end] = leg
+                legs[start] = row
+            self._legs = legs
+            self._stale_legs = set()
+            return legs
+
+    def rebuild_routes(self):
+        """Recompute every route, for matrices filled without set_base_rates."""
+        with self._write_lock:
+            self._stale_legs = set(self.pivots)
+            self._memo = {}
+            self.version = next(_versions)
+
+    def set_base_rates(self, base: str, rates: Dict[str, float],
+                       updated: Optional[datetime] = None):
+        """Store a full rate table for one base currency."""
+        with self._write_lock:
+            base_idx = self.index_of(base)
+            indexes = [(self.index_of(code), rate) for code, rate in rates.items()]
+            vector = self._copy_vector(base_idx)
+            for idx, rate in indexes:
+                vector[idx] = rate
+            vector[base_idx] = 1.0
+            self._publish(base_idx, vector, updated or datetime.now())
+
+    def set_rate(self, base: str, quote: str, rate: float,
+                 updated: Optional[datetime] = None):
+        """Store a single base -> quote rate."""
+        with self._write_lock:
+            base_idx = self.index_of(base)
+            quote_idx = self.index_of(quote)
+            vector = self._copy_vector(base_idx)
+            vector[quote_idx] = rate
+            vector[base_idx] = 1.0
+            self._publish(base_idx, vector, updated or self.updated.get(base_idx) or datetime.now())
+
+    def has_base(self, base: str) -> bool:
+        """Return True if a rate vector is stored for this base."""
+        idx = self.index.get(base)
+        return idx is not None and idx in self.vectors
+
+    def base_rates(self, base: str) -> Dict[str, float]:
+        """Return the known rates for a base currency as a dict."""
+        idx = self.index.get(base)
+        vector = self.vectors.get(idx) if idx is not None else None
+        if vector is None:
+            return {}
+        codes = self.codes
+        return {codes[i]: rate for i, rate in enumerate(vector) if rate == rate}
+
+    def age(self, base: str) -> Optional[float]:
+        """Return seconds since the base table was last updated, or None."""
+        idx = self.index.get(base)
+        updated = self.updated.get(idx) if idx is not None else None
+        if updated is None:
+            return None
+        return (datetime.now() - updated).total_seconds()
+
+    def rate(self, from_currency: str, to_currency: str) -> Optional[float]:
+        """Return the rate between two currencies, or None if not resolvable."""
+        resolved = self.resolve(from_currency, to_currency)
+        return resolved[0] if resolved is not None else None
+
+    def resolve(self, from_currency: str, to_currency: str) -> Optional[Tuple[float, str, datetime]]:
+        """
+        Return (rate, base, updated) for a pair, or None if not resolvable.
+        base is the oldest table the rate depends on and updated is when
+        that table was stored. Like route() without building the path.
+        """
+        if from_currency == to_currency:
+            return 1.0, from_currency, datetime.now()
+
+        from_idx = self.index.get(from_currency)
+        to_idx = self.index.get(to_currency)
+        if from_idx is None or to_idx is None:
+            return None
+
+        direct = self._direct(from_idx, to_idx)
+        if direct is not None:
+            rate, table = direct
+            return rate, self.codes[table], self.updated[table]
+
+        route = self._memo_route(from_idx, to_idx)
+        return (route.rate, route.base, route.updated) if route is not None else None
+
+    def route(self, from_currency: str, to_currency: str) -> Optional[Route]:
+        """Return the best Route for a pair, or None if not resolvable."""
+        if from_currency == to_currency:
+            return Route(1.0, (from_currency,), from_currency, datetime.now())
+
+        from_idx = self.index.get(from_currency)
+        to_idx = self.index.get(to_currency)
+        if from_idx is None or to_idx is None:
+            return None
+
+        direct = self._direct(from_idx, to_idx)
+        if direct is not None:
+            rate, table = direct
+            return Route(rate, (from_currency, to_currency), self.codes[table], self.updated[table])
+
+        return self._memo_route(from_idx, to_idx)
+
+    def _direct(self, from_idx: int, to_idx: int) -> Optional[Tuple[float, int]]:
+        """
+        One hop: (rate, table) from the source's own table or the inverse
+        from the target's, whichever table is fresher.
+        """
+        best = None
+        vector = self.vectors.get(from_idx)
+        if vector is not None and to_idx < len(vector):
+            rate = vector[to_idx]
+            if rate == rate:
+                best = rate, from_idx
+        vector = self.vectors.get(to_idx)
+        if vector is not None and from_idx < len(vector):
+            rate = vector[from_idx]
+            if rate == rate and rate and (best is None or self.updated[to_idx] > self.updated[from_idx]):
+                best = 1 / rate, to_idx
+        return best
+
+    def _memo_route(self, from_idx: int, to_idx: int) -> Optional[Route]:
+        """Cross route for a pair, resolved once per published version of the tables."""
+        # Taken before resolving: a route built from older tables must not
+        # land in the memo of a newer publish
+        memo = self._memo
+        key = (from_idx, to_idx)
+        try:
+            return memo[key]
+        except KeyError:
+            route = memo[key] = self._cross_route(from_idx, to_idx)
+            return route
+
+    def _cross_route(self, from_idx: int, to_idx: int) -> Optional[Route]:
+        """Best route for a pair no single table quotes directly."""
+        # Two hops: any base quoting both currencies, preferring the freshest
+        best_pivot = None
+        for pivot in self.pivots:
+            vector = self.vectors[pivot]
+            if from_idx < len(vector) and to_idx < len(vector):
+                from_rate = vector[from_idx]
+                to_rate = vector[to_idx]
+                if from_rate == from_rate and to_rate == to_rate and from_rate:
+                    if best_pivot is None or self.updated[pivot] > self.updated[best_pivot]:
+                        best_pivot = pivot
+        if best_pivot is not None:
+            vector = self.vectors[best_pivot]
+            codes = self.codes
+            return Route(vector[to_idx] / vector[from_idx],
+                         (codes[from_idx], codes[best_pivot], codes[to_idx]),
+                         codes[best_pivot], self.updated[best_pivot])
+
+        # More hops: enter the base graph at a table quoting the source,
+        # search it and leave from a table quoting the target
+        exits = self._anchors(to_idx)
+        entries = self._anchors(from_idx)
+        if not exits or not entries:
+            return None
+        reached = self._search(from_idx, entries, self._base_graph())
+        best = None
+        for exit_, exit_rate in exits:
+            reach = reached.get(exit_)
+            if reach is None or not reach[3]:
+                continue
+            if exit_ != to_idx:
+                reach = (reach[0] + 1, min(reach[1], self.updated[exit_]),
+                         reach[2] / exit_rate, reach[3] + (to_idx,))
+            if _better(reach, best):
+                best = reach
+        if best is None:
+            return None
+
+        path = (from_idx,) + best[3]
+        oldest = next(idx for idx in path if self.updated.get(idx) == best[1])
+        return Route(best[2], tuple(self.codes[idx] for idx in path), self.codes[oldest], best[1])
+
+    def _search(self, from_idx: int, entries: List[Tuple[int, float]],
+                legs: Dict[int, Dict[int, _Leg]]) -> Dict[int, _Leg]:
+        """
+        Best partial route from the source to every base it can reach,
+        settled a hop count at a time: among routes with the fewest hops
+        the one whose oldest table is freshest wins, and extending a
+        route never makes it better, so each base is final once its
+        layer is done.
+        """
+        layers: Dict[int, Dict[int, _Leg]] = {}
+        for entry, entry_rate in entries:
+            if entry == from_idx:
+                start = (0, _NO_TABLE, 1.0, ())
+            else:
+                start = (1, self.updated[entry], entry_rate, (entry,))
+            layer = layers.setdefault(start[0], {})
+            if _better(start, layer.get(entry)):
+                layer[entry] = start
+
+        reached: Dict[int, _Leg] = {}
+        hops = 0
+        while layers:
+            layer = {base: reach for base, reach in layers.pop(hops, {}).items() if base not in reached}
+            reached.update(layer)
+            for base, reach in layer.items():
+                for end, leg in legs.get(base, {}).items():
+                    if end in reached:
+                        continue
+                    candidate = (reach[0] + leg[0], min(reach[1], leg[1]),
+                                 reach[2] * leg[2], reach[3] + leg[3])
+                    following = layers.setdefault(candidate[0], {})
+                    if _better(candidate, following.get(end)):
+                        following[end] = candidate
+            hops += 1
+        return reached
+
+    def _anchors(self, idx: int) -> List[Tuple[int, float]]:
+        """(base, rate from idx to that base) for every table that can start or end a route at idx."""
+        anchors = [(idx, 1.0)] if idx in self.vectors else []
+        for pivot in self.pivots:
+            vector = self.vectors[pivot]
+            if pivot != idx and idx < len(vector):
+                rate = vector[idx]
+                if rate == rate and rate:
+                    anchors.append((pivot, 1 / rate))
+        return anchors
@@ -0,0 +1,359 @@
+"""
+Rate-change events for streaming clients.
+
+The converter publishes a RateEvent whenever a base table's rates change:
+a fetch, a cache write or a newer shared snapshot. An event carries a
+sequence number, the table's content version before and after the change
+(the versions /rates/<base> reports) and the rates that changed. The bus
+keeps the most recent events so a client that reconnects with
+Last-Event-ID receives exactly what it missed. While nobody is
+subscribed, changes are only counted (skip()), which costs nothing and
+still sends a returning client a fresh snapshot instead of a replay.
+
+Subscribers have no queues of their own. Each keeps a cursor into the
+shared event log, and waiters are woken together: threads through one
+Condition, coroutines through one asyncio.Event per event loop. An idle
+connection therefore costs no work per event until it is woken, and
+under the ASGI server it holds no thread either. RateStream turns the
+log into Server-Sent Events for one connection, optionally filtered to
+a few currency pairs.
+"""
+import itertools
+import json
+import logging
+import os
+import threading
+import weakref
+from collections import deque
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Comment line that keeps idle connections (and proxies) from timing out
+HEARTBEAT = ": keep-alive\n\n"
+# Reconnect delay suggested to EventSource clients, in milliseconds
+RETRY_MS = 3000
+MAX_STREAM_PAIRS = 50
+
+Pair = Tuple[str, str]
+
+
+def format_sse(event: str, data: dict, event_id: Optional[str] = None) -> str:
+    """Encode one Server-Sent Events message."""
+    head = f"id: {event_id}\n" if event_id else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+def parse_pairs(value: Optional[str]) -> Optional[List[Pair]]:
+    """Parse ?pairs=USD_EUR,GBP_JPY; None when no filter is given. Raises ValueError."""
+    if not value:
+        return None
+    pairs = []
+    for item in value.split(","):
+        from_currency, sep, to_currency = item.strip().upper().partition("_")
+        if not sep or not from_currency or not to_currency or from_currency == to_currency:
+            raise ValueError(f"Invalid pair: {item!r} (expected FROM_TO, e.g. USD_EUR)")
+        if (from_currency, to_currency) not in pairs:
+            pairs.append((from_currency, to_currency))
+    if len(pairs) > MAX_STREAM_PAIRS:
+        raise ValueError(f"At most {MAX_STREAM_PAIRS} pairs per stream")
+    return pairs
+
+
+class RateEvent(NamedTuple):
+    """One base table change."""
+    seq: int
+    base: str
+    updated: datetime
+    # Content version of the table after the change, and before it (None if new)
+    version: str
+    since: Optional[str]
+    changed: Dict[str, float]
+    # Encoded once when published, then sent as-is to every unfiltered stream
+    message: str
+
+
+class RateEventBus:
+    """
+    Log of recent rate changes with thread and asyncio wake-ups.
+    poll, if given, is called every poll_interval seconds while anyone
+    is subscribed; a converter following a shared snapshot uses it to
+    notice tables published by another process.
+    """
+
+    def __init__(self, history: int = 512, poll: Optional[Callable[[], object]] = None,
+                 poll_interval: float = 1.0):
+        # Event ids from another worker process never match this one's
+        self.epoch = os.urandom(4).hex()
+        self.poll = poll
+        self.poll_interval = poll_interval
+        self.published = 0
+        self.subscribers = 0
+        self._seq = 0
+        self._events: Deque[RateEvent] = deque(maxlen=history)
+        self._cond = threading.Condition()
+        # Event loop -> asyncio.Event its waiting coroutines share
+        self._loop_events = weakref.WeakKeyDictionary()
+        self._poller = None
+        self._closed = False
+        self._snapshot = (None, None)
+
+    @property
+    def seq(self) -> int:
+        """Sequence number of the latest event."""
+        return self._seq
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.epoch}-{seq}"
+
+    def parse_event_id(self, event_id: Optional[str]) -> Optional[int]:
+        """Sequence number from a Last-Event-ID this bus issued, else None."""
+        epoch, _, seq = (event_id or "").partition("-")
+        if epoch != self.epoch or not seq.isdigit() or int(seq) > self._seq:
+            return None
+        return int(seq)
+
+    def publish(self, base: str, updated: datetime, version: str, since: Optional[str],
+                changed: Dict[str, float]):
+        """Record a table change and wake every waiting stream."""
+        with self._cond:
+            self._seq += 1
+            seq = self._seq
+            data = {
+                "base": base,
+                "version": version,
+                "since": since,
+                "updated": updated.isoformat(),
+                "changed": changed
+            }
+            self._events.append(RateEvent(seq, base, updated, version, since, changed,
+                                          format_sse("rates", data, self.event_id(seq))))
+            self.published += 1
+            self._cond.notify_all()
+            loops = list(self._loop_events.keys())
+        for loop in loops:
+            try:
+                loop.call_soon_threadsafe(self._wake_loop, loop)
+            except RuntimeError:
+                pass  # Loop already closed
+
+    def skip(self):
+        """Record that rates changed without building an event (nobody is listening)."""
+        with self._cond:
+            self._seq += 1
+            # Older cursors can no longer be replayed
+            self._events.clear()
+
+    def since(self, seq: int) -> Optional[List[RateEvent]]:
+        """Events after seq, or None if some of them have already left the log."""
+        with self._cond:
+            if seq >= self._seq:
+                return []
+            if not self._events or self._events[0].seq > seq + 1:
+                return None
+            return list(itertools.islice(self._events, seq + 1 - self._events[0].seq, None))
+
+    def wait(self, seq: int, timeout: float) -> bool:
+        """Block until there is an event after seq; False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._seq > seq or self._closed, timeout) and not self._closed
+
+    async def wait_async(self, seq: int, timeout: float) -> bool:
+        """wait() for coroutines: all waiters on a loop share one asyncio.Event."""
+        import asyncio
+
+        if self._seq > seq:
+            return True
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            event = self._loop_events.get(loop)
+            if event is None:
+                event = self._loop_events[loop] = asyncio.Event()
+            # A publish before this loop's event was registered would not set it
+            if self._seq > seq:
+                return True
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self._seq > seq
+
+    def _wake_loop(self, loop):
+        """Runs on the loop: release the current waiters and start a new generation."""
+        with self._cond:
+            event = self._loop_events.get(loop)
+            if event is None:
+                return
+            self._loop_events[loop] = type(event)()
+        event.set()
+
+    def snapshot(self, key, build: Callable[[], str]) -> str:
+        """Encoded snapshot message for key, built once and shared by every new stream."""
+        cached_key, message = self._snapshot
+        if cached_key != key:
+            message = build()
+            self._snapshot = (key, message)
+        return message
+
+    def subscribe(self):
+        with self._cond:
+            self.subscribers += 1
+            if self.poll is not None and self._poller is None and not self._closed:
+                self._poller = threading.Thread(target=self._run_poll, name="rate-events-poll", daemon=True)
+                self._poller.start()
+
+    def unsubscribe(self):
+        with self._cond:
+            self.subscribers -= 1
+
+    def _run_poll(self):
+        """Poll for outside changes while there are subscribers."""
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed, self.poll_interval)
+                if self._closed or not self.subscribers:
+                    self._poller = None
+                    return
+            try:
+                self.poll()
+            except Exception as e:
+                logger.exception("Rate event poll error: %s", e)
+
+    def close(self):
+        """Stop polling and release blocked waiters."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def collect_metrics(self):
+        """Scrape-time samples for Metrics.add_collector."""
+        return [
+            ("currency_rate_events_total", "counter", "Rate change events published", {}, self.published),
+            ("currency_rate_stream_subscribers", "gauge", "Open rate event streams", {}, self.subscribers),
+        ]
+
+
+class RateStream:
+    """
+    One Server-Sent Events connection to a converter's rate events.
+    Without pairs it relays every table change ("rates" events, shaped
+    like a /rates delta) after a "snapshot" of all cached tables. With
+    pairs it sends a "rate" event whenever the resolved rate or route of
+    one of the pairs changes, starting with the current ones.
+    """
+
+    def __init__(self, converter, pairs: Optional[Sequence[Pair]] = None,
+                 last_event_id: Optional[str] = None):
+        self.converter = converter
+        self.bus: RateEventBus = converter.events
+        self.pairs = list(pairs) if pairs else None
+        self.seq = self.bus.seq
+        self._resume = self.bus.parse_event_id(last_event_id)
+        # pair -> (rate, path) last sent
+        self._sent: Dict[Pair, Tuple[float, Tuple[str, ...]]] = {}
+        # Subscribed in open(), from the response body, so a response that
+        # is never iterated (HEAD, an error before streaming) holds nothing
+        self._subscribed = False
+        self._closed = False
+
+    def open(self) -> List[str]:
+        """First messages: a retry hint, then what a reconnecting client missed or the current state."""
+        messages = [f"retry: {RETRY_MS}\n\n"]
+        if not self._subscribed and not self._closed:
+            self._subscribed = True
+            self.bus.subscribe()
+        self._touch()
+        if self.pairs is not None:
+            return messages + self._pair_messages()
+        if self._resume is not None:
+            events = self.bus.since(self._resume)
+            if events is not None:
+                self.seq = events[-1].seq if events else self._resume
+                return messages + [event.message for event in events]
+        self.seq = self.bus.seq
+        return messages + [self._snapshot()]
+
+    def wait(self, timeout: float) -> List[str]:
+        """Block until rates change; returns the messages to send, a heartbeat after timeout."""
+        if not self.bus.wait(self.seq, timeout):
+            self._touch()
+            return [HEARTBEAT]
+        return self._advance()
+
+    async def wait_async(self, timeout: float) -> List[str]:
+        """wait() for the ASGI server."""
+        if not await self.bus.wait_async(self.seq, timeout):
+            self._touch()
+            return [HEARTBEAT]
+        return self._advance()
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            if self._subscribed:
+                self.bus.unsubscribe()
+
+    def _advance(self) -> List[str]:
+        events = self.bus.since(self.seq)
+        if events is None:
+            # Fell behind the log: start over from the current state
+            self.seq = self.bus.seq
+            return self._pair_messages() if self.pairs is not None else [self._snapshot()]
+        if not events:
+            return []
+        self.seq = events[-1].seq
+        if self.pairs is not None:
+            return self._pair_messages()
+        return [event.message for event in events]
+
+    def _pair_messages(self) -> List[str]:
+        """A "rate" message for each pair whose resolved rate or route changed."""
+        matrix = self.converter.rates
+        event_id = self.bus.event_id(self.seq)
+        messages = []
+        for pair in self.pairs:
+            route = matrix.route(*pair)
+            if route is None:
+                continue
+            sent = (route.rate, route.path)
+            if self._sent.get(pair) == sent:
+                continue
+            self._sent[pair] = sent
+            messages.append(format_sse("rate", {
+                "from_currency": pair[0],
+                "to_currency": pair[1],
+                "rate": route.rate,
+                "path": list(route.path),
+                "updated": route.updated.isoformat()
+            }, event_id))
+        return messages
+
+    def _snapshot(self) -> str:
+        """Every cached table, shared by all streams opened at the same version."""
+        from rate_tables import table_version
+
+        matrix = self.converter.rates
+        seq = self.seq
+
+        def build():
+            tables = {}
+            for idx, updated in list(matrix.updated.items()):
+                base = matrix.codes[idx]
+                rates = matrix.base_rates(base)
+                tables[base] = {"version": table_version(rates), "updated": updated.isoformat(), "rates": rates}
+            return format_sse("snapshot", {"tables": tables}, self.bus.event_id(seq))
+
+        return self.bus.snapshot((seq, matrix.version), build)
+
+    def _touch(self):
+        """Keep the pairs' tables hot so the background refresher renews them."""
+        refresher = self.converter.refresher
+        if refresher is None or self.pairs is None:
+            return
+        matrix = self.converter.rates
+        for from_currency, _ in self.pairs:
+            if matrix.has_base(from_currency):
+                refresher.touch(from_currency)
+            else:
+                refresher.request(from_currency)
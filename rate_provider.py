@@ -0,0 +1,210 @@
+import logging
+import random
+import time
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://api.exchangerate-api.com/v4/latest/"
+
+# Responses worth retrying: rate limiting and server-side failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RateProviderError(Exception):
+    """
+    Raised when the rate provider cannot return a table.
+    status is the HTTP status when the provider answered, else None.
+    """
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class RateTable(NamedTuple):
+    """A base currency's rate table as returned by the provider."""
+    base: str
+    rates: Dict[str, float]
+    not_modified: bool
+
+
+class BaseRateProviderClient:
+    """
+    Transport-independent part of the provider client: URLs, conditional
+    request validators and response parsing. The ETag and Last-Modified of
+    every table are remembered and sent back as If-None-Match /
+    If-Modified-Since, so an unchanged table costs a 304 instead of a full
+    download. Transient failures (connection errors, timeouts, 429 and
+    5xx) are retried with exponential backoff and full jitter.
+    """
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, api_key: Optional[str] = None,
+                 timeout: float = 10.0, retries: int = 3, backoff: float = 0.25,
+                 max_backoff: float = 4.0, pool_size: int = 10):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.pool_size = pool_size
+        self.requests_sent = 0
+        self.not_modified = 0
+
+        # base -> (etag, last_modified, rates) of the last full response
+        self._validators: Dict[str, Tuple[Optional[str], Optional[str], Dict[str, float]]] = {}
+
+    def url_for(self, base: str) -> str:
+        """Return the provider URL for a base currency."""
+        if self.api_key:
+            # If you have a paid API key
+            return f"{self.base_url}{base}?api_key={self.api_key}"
+        # Free API (limited requests)
+        return f"{self.base_url}{base}"
+
+    def _conditional_headers(self, base: str) -> Dict[str, str]:
+        """Return revalidation headers for a previously fetched table."""
+        headers = {}
+        cached = self._validators.get(base)
+        if cached is not None:
+            etag, last_modified, _ = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def _retry_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given attempt."""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def _table_from_response(self, base: str, status: int, headers,
+                             load_json: Callable[[], dict]) -> RateTable:
+        """Turn a provider response into a RateTable, or raise RateProviderError."""
+        cached = self._validators.get(base)
+        if status == 304 and cached is not None:
+            self.not_modified += 1
+            return RateTable(base, cached[2], True)
+
+        if status >= 400:
+            raise RateProviderError(f"{base}: HTTP {status} from provider", status)
+        try:
+            rates = load_json().get('rates')
+        except (ValueError, AttributeError) as e:
+            raise RateProviderError(f"{base}: invalid response ({e})") from e
+        if not rates:
+            raise RateProviderError(f"{base}: response has no rates")
+
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if etag or last_modified:
+            self._validators[base] = (etag, last_modified, rates)
+        return RateTable(base, rates, False)
+
+
+class RateProviderClient(BaseRateProviderClient):
+    """
+    Blocking provider client. Keeps one requests.Session with a pooled
+    adapter so repeat fetches reuse TCP/TLS connections.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Imported here so processes that never fetch don't pay for requests
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self._transient_errors = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+        self._request_errors = requests.exceptions.RequestException
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def fetch(self, base: str) -> RateTable:
+        """Fetch a base table, revalidating a previously seen copy if possible."""
+        url = self.url_for(base)
+        headers = self._conditional_headers(base)
+        attempt = 0
+        while True:
+            try:
+                self.requests_sent += 1
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+                if response.status_code not in RETRY_STATUSES or attempt >= self.retries:
+                    return self._table_from_response(
+                        base, response.status_code, response.headers, response.json
+                    )
+                reason = f"HTTP {response.status_code}"
+            except self._transient_errors as e:
+                if attempt >= self.retries:
+                    raise RateProviderError(f"{base}: {e}") from e
+                reason = str(e)
+            except self._request_errors as e:
+                raise RateProviderError(f"{base}: {e}") from e
+
+            delay = self._retry_delay(attempt)
+            attempt += 1
+            logger.info("Retrying %s in %.2fs (attempt %d): %s", url, delay, attempt, reason)
+            time.sleep(delay)
+
+    def close(self):
+        """Close pooled connections."""
+        self.session.close()
+
+
+class AsyncRateProviderClient(BaseRateProviderClient):
+    """
+    Asyncio provider client built on httpx.AsyncClient, for the ASGI
+    server. Shares validators, parsing and retry policy with the blocking
+    client. The httpx client is created on first use so it binds to the
+    running event loop.
+    """
+
+    def __init__(self, *args, **kwargs):
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError("AsyncRateProviderClient requires httpx (pip install httpx)") from None
+        super().__init__(*args, **kwargs)
+        self.httpx = httpx
+        self.client = None
+
+    def _client(self):
+        if self.client is None:
+            limits = self.httpx.Limits(max_connections=self.pool_size,
+                                       max_keepalive_connections=self.pool_size)
+            self.client = self.httpx.AsyncClient(timeout=self.timeout, limits=limits)
+        return self.client
+
+    async def fetch(self, base: str) -> RateTable:
+        """Fetch a base table without blocking the event loop."""
+        import asyncio
+
+        url = self.url_for(base)
+        headers = self._conditional_headers(base)
+        attempt = 0
+        while True:
+            try:
+                self.requests_sent += 1
+                response = await self._client().get(url, headers=headers)
+                if response.status_code not in RETRY_STATUSES or attempt >= self.retries:
+                    return self._table_from_response(
+                        base, response.status_code, response.headers, response.json
+                    )
+                reason = f"HTTP {response.status_code}"
+            except self.httpx.TransportError as e:
+                if attempt >= self.retries:
+                    raise RateProviderError(f"{base}: {e!r}") from e
+                reason = repr(e)
+
+            delay = self._retry_delay(attempt)
+            attempt += 1
+            logger.info("Retrying %s in %.2fs (attempt %d): %s", url, delay, attempt, reason)
+            await asyncio.sleep(delay)
+
+    async def close(self):
+        """Close pooled connections."""
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
@@ -0,0 +1,107 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class RateRefresher:
+    """
+    Background refresher for cached base rate tables.
+
+    Request threads call touch() for every base they read, which marks it
+    as hot, and request() when they served a stale rate and want it
+    revalidated. A single scheduler thread refetches requested bases right
+    away and refreshes hot bases once they reach refresh_ahead * ttl of
+    age, so popular tables are renewed before they expire. Bases that have
+    not been read for hot_window seconds are left to expire.
+    """
+
+    def __init__(self, fetch: Callable[[str], Optional[dict]],
+                 age_of: Callable[[str], Optional[float]], ttl: float,
+                 refresh_ahead: float = 0.8, hot_window: Optional[float] = None,
+                 check_interval: Optional[float] = None):
+        self.fetch = fetch
+        self.age_of = age_of
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.hot_window = hot_window if hot_window is not None else ttl * 2
+        self.check_interval = check_interval if check_interval is not None else min(ttl / 10, 60.0)
+        self.refreshes = 0
+
+        self._hot: Dict[str, float] = {}
+        self._requested: Set[str] = set()
+        self._in_flight: Set[str] = set()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        """Start the scheduler thread if it is not already running."""
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="rate-refresher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the scheduler thread."""
+        with self._cond:
+            thread, self._thread = self._thread, None
+            self._stopped = True
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join()
+
+    def touch(self, base: str):
+        """Record that a base table was just read."""
+        self._hot[base] = time.monotonic()
+
+    def request(self, base: str):
+        """Ask for a base table to be refetched in the background."""
+        with self._cond:
+            if base in self._in_flight or base in self._requested:
+                return
+            self._requested.add(base)
+            self._cond.notify_all()
+        self.start()
+
+    def _due(self) -> Set[str]:
+        """Return requested bases plus hot bases close to expiry."""
+        now = time.monotonic()
+        due = set(self._requested)
+        self._requested.clear()
+        for base, last_read in list(self._hot.items()):
+            if now - last_read > self.hot_window:
+                self._hot.pop(base, None)
+                continue
+            age = self.age_of(base)
+            if age is not None and age >= self.ttl * self.refresh_ahead:
+                due.add(base)
+        return due - self._in_flight
+
+    def _run(self):
+        """Scheduler loop."""
+        while True:
+            with self._cond:
+                if self._stopped:
+                    return
+                if not self._requested:
+                    self._cond.wait(self.check_interval)
+                if self._stopped:
+                    return
+                due = self._due()
+                self._in_flight |= due
+
+            for base in due:
+                try:
+                    if self.fetch(base) is not None:
+                        self.refreshes += 1
+                except Exception:
+                    # e.g. the database is locked; keep the scheduler alive for the next round
+                    logger.exception("Background refresh of %s failed", base)
+                finally:
+                    with self._cond:
+                        self._in_flight.discard(base)
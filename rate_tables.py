@@ -0,0 +1,238 @@
+"""
+Whole base tables for the /rates/<base> endpoint, in JSON or a compact
+binary encoding, either in full or as a delta against a table version
+the client already holds.
+
+Binary layout (little-endian):
+
+    header   magic "CCRT", format, flags (1 = delta), code count,
+             updated (epoch seconds), base code, version, since version
+    index    u16 length, then the currency codes as comma-separated ASCII
+    rates    one float64 per code; in a delta NaN means the code was removed
+
+Versions are derived from the table's contents, so every worker serving
+the same rates reports the same version.
+"""
+import hashlib
+import json
+import struct
+import sys
+import threading
+import time
+from array import array
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from http_cache import http_date, not_modified
+
+JSON_MIMETYPE = "application/json"
+BINARY_MIMETYPE = "application/x-currency-rates"
+
+MAGIC = b"CCRT"
+FORMAT = 1
+FLAG_DELTA = 1
+HEADER = struct.Struct("<4sBBHd8s8s8s")
+INDEX_LENGTH = struct.Struct("<H")
+NO_VERSION = b"\0" * 8
+
+
+class TableVersion(NamedTuple):
+    """One version of a base table, as served."""
+    base: str
+    version: str
+    updated: datetime
+    rates: Dict[str, float]
+    # time.monotonic() deadline after which the table is no longer fresh
+    fresh_until: float
+    # RateMatrix.version the table was read from
+    matrix_version: int
+
+    def age(self) -> float:
+        return max((datetime.now() - self.updated).total_seconds(), 0.0)
+
+    def headers(self) -> Dict[str, str]:
+        """Caching headers shared by every representation of this version."""
+        max_age = max(int(self.fresh_until - time.monotonic()), 0)
+        return {
+            "Vary": "Accept",
+            "Last-Modified": http_date(self.updated),
+            "Cache-Control": f"public, max-age={max_age}"
+        }
+
+
+class WireTable(NamedTuple):
+    """A decoded binary response; since is None for a full table."""
+    base: str
+    version: str
+    since: Optional[str]
+    updated: datetime
+    rates: Dict[str, float]
+
+
+def negotiate(accept) -> Optional[str]:
+    """Pick JSON or binary for a werkzeug Accept header; JSON if there is none."""
+    if not accept:
+        return JSON_MIMETYPE
+    return accept.best_match([JSON_MIMETYPE, BINARY_MIMETYPE])
+
+
+def table_version(rates: Dict[str, float]) -> str:
+    """Content version of a rate table: 16 hex digits."""
+    codes = sorted(rates)
+    digest = hashlib.sha1(",".join(codes).encode("ascii"))
+    digest.update(array('d', [rates[code] for code in codes]).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def diff_tables(old: Dict[str, float], new: Dict[str, float]) -> Tuple[Dict[str, float], List[str]]:
+    """Return (changed or added rates, removed codes) turning old into new."""
+    changed = {code: rate for code, rate in new.items() if old.get(code) != rate}
+    removed = [code for code in old if code not in new]
+    return changed, removed
+
+
+def encode_json(table: TableVersion, since: Optional[TableVersion] = None) -> bytes:
+    """Full table, or a delta from since, as JSON."""
+    payload = {
+        "base": table.base,
+        "version": table.version,
+        "updated": table.updated.isoformat(),
+        "rate_age": table.age()
+    }
+    if since is None:
+        payload["rates"] = table.rates
+    else:
+        changed, removed = diff_tables(since.rates, table.rates)
+        payload.update(since=since.version, changed=changed, removed=removed)
+    return json.dumps(payload).encode()
+
+
+def encode_binary(table: TableVersion, since: Optional[TableVersion] = None) -> bytes:
+    """Full table, or a delta from since, in the packed binary layout."""
+    if since is None:
+        rates = table.rates
+    else:
+        changed, removed = diff_tables(since.rates, table.rates)
+        rates = dict(changed, **dict.fromkeys(removed, float("nan")))
+
+    index = ",".join(rates).encode("ascii")
+    header = HEADER.pack(
+        MAGIC, FORMAT, FLAG_DELTA if since is not None else 0, len(rates),
+        table.updated.timestamp(), table.base.encode("ascii"),
+        bytes.fromhex(table.version), bytes.fromhex(since.version) if since is not None else NO_VERSION
+    )
+    values = array('d', rates.values())
+    if sys.byteorder == "big":
+        values.byteswap()
+    return header + INDEX_LENGTH.pack(len(index)) + index + values.tobytes()
+
+
+def decode_binary(data: bytes) -> WireTable:
+    """Decode an encode_binary payload. Raises ValueError if it is not one."""
+    if len(data) < HEADER.size + INDEX_LENGTH.size:
+        raise ValueError("Not a rate table")
+    magic, fmt, flags, count, updated, base, version, since = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or fmt != FORMAT:
+        raise ValueError(f"Not a format {FORMAT} rate table")
+
+    offset = HEADER.size
+    (index_length,) = INDEX_LENGTH.unpack_from(data, offset)
+    offset += INDEX_LENGTH.size
+    index = data[offset:offset + index_length].decode("ascii")
+    codes = index.split(",") if index else []
+    offset += index_length
+    values = struct.unpack_from(f"<{count}d", data, offset)
+    if len(codes) != count:
+        raise ValueError("Rate table index does not match its rates")
+
+    return WireTable(
+        base.rstrip(b"\0").decode("ascii"), version.hex(),
+        since.hex() if flags & FLAG_DELTA else None,
+        datetime.fromtimestamp(updated), dict(zip(codes, values))
+    )
+
+
+def apply_table(rates: Dict[str, float], table: WireTable) -> Dict[str, float]:
+    """
+    Apply a decoded response to a client's copy of the table and return
+    the new copy: a full table replaces it, a delta is merged into it.
+    """
+    if table.since is None:
+        return dict(table.rates)
+    merged = dict(rates)
+    for code, rate in table.rates.items():
+        if rate != rate:
+            merged.pop(code, None)
+        else:
+            merged[code] = rate
+    return merged
+
+
+class RateTableCache:
+    """
+    The current version of each served base table plus the last few
+    versions before it, so deltas can be computed for clients that are a
+    little behind. Clients further behind than history get a full table.
+    """
+
+    def __init__(self, history: int = 16):
+        self.history = history
+        self._tables: Dict[str, Deque[TableVersion]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, base: str, matrix_version: int) -> Optional[TableVersion]:
+        """The current table for base, if still fresh and read from this matrix version."""
+        versions = self._tables.get(base)
+        if not versions:
+            return None
+        table = versions[-1]
+        if table.matrix_version != matrix_version or time.monotonic() >= table.fresh_until:
+            return None
+        return table
+
+    def put(self, base: str, rates: Dict[str, float], updated: datetime,
+            ttl: float, matrix_version: int) -> TableVersion:
+        """Record the table just read from the rate matrix and return it."""
+        age = (datetime.now() - updated).total_seconds()
+        table = TableVersion(base, table_version(rates), updated, rates,
+                             time.monotonic() + max(ttl - age, 0.0), matrix_version)
+        with self._lock:
+            versions = self._tables.setdefault(base, deque(maxlen=self.history))
+            if versions and versions[-1].version == table.version:
+                # Same rates, revalidated: replace rather than keep a duplicate
+                versions.pop()
+            versions.append(table)
+        return table
+
+    def find(self, base: str, version: str) -> Optional[TableVersion]:
+        """An earlier (or the current) version of a base table, if still kept."""
+        with self._lock:
+            versions = list(self._tables.get(base, ()))
+        for table in reversed(versions):
+            if table.version == version:
+                return table
+        return None
+
+    def respond(self, table: TableVersion, mimetype: str, since: Optional[str],
+                request_headers) -> Tuple[int, bytes, Dict[str, str]]:
+        """
+        Build (status, body, headers) for a /rates response: a delta if
+        since names a version still kept, 304 if the client is current,
+        otherwise the full table.
+        """
+        headers = table.headers()
+        previous = None
+        if since:
+            if since == table.version:
+                return 304, b"", headers
+            previous = self.find(table.base, since)
+        if previous is None:
+            # Only full tables are a stable representation worth validating
+            headers["ETag"] = f'"{table.version}"' if mimetype == JSON_MIMETYPE else f'"{table.version}.bin"'
+            if not_modified(request_headers, headers["ETag"], headers["Last-Modified"]):
+                return 304, b"", headers
+
+        encode = encode_binary if mimetype == BINARY_MIMETYPE else encode_json
+        headers["Content-Type"] = mimetype
+        return 200, encode(table, previous), headers
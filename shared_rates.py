@@ -0,0 +1,201 @@
+"""
+Binary rate snapshot shared by several worker processes.
+
+One publisher process writes the rate tables to a file (ideally on a
+tmpfs such as /dev/shm) and replaces it atomically whenever they change.
+Workers memory-map it read-only, so every worker on the host reads the
+same physical pages and sees the same rates. A worker starts without
+loading the rate cache from SQLite.
+
+Layout (native byte order; readers and the publisher share a host):
+
+    header   magic "CCRS", version, generation, published (epoch seconds),
+             code count, base count
+    codes    one 8-byte NUL-padded ASCII slot per currency code
+    bases    (code index, updated epoch seconds) per base table
+    rates    one float64 row per base, one column per code, NaN = unknown
+
+Run a publisher with:
+
+    python shared_rates.py --path /dev/shm/currency_rates.snap --bases USD EUR GBP
+
+and start the API workers with CURRENCY_RATE_SNAPSHOT=/dev/shm/currency_rates.snap.
+"""
+import argparse
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from datetime import datetime
+from typing import Optional, Tuple
+
+from rate_engine import RateMatrix
+
+MAGIC = b"CCRS"
+VERSION = 1
+HEADER = struct.Struct("=4sIQdII")
+CODE_SLOT = 8
+BASE_ENTRY = struct.Struct("=I4xd")
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def encode_snapshot(matrix: RateMatrix, generation: int) -> bytes:
+    """Serialize a rate matrix into the snapshot layout."""
+    codes = list(matrix.codes)
+    bases = [idx for idx in matrix.pivots if idx in matrix.vectors]
+    parts = [HEADER.pack(MAGIC, VERSION, generation, time.time(), len(codes), len(bases))]
+
+    slots = bytearray(CODE_SLOT * len(codes))
+    for i, code in enumerate(codes):
+        encoded = code.encode("ascii")
+        if len(encoded) > CODE_SLOT:
+            raise ValueError(f"Currency code too long for a snapshot: {code!r}")
+        slots[i * CODE_SLOT:i * CODE_SLOT + len(encoded)] = encoded
+    parts.append(bytes(slots))
+    parts.append(b"\0" * (_align(HEADER.size + len(slots)) - HEADER.size - len(slots)))
+
+    for idx in bases:
+        parts.append(BASE_ENTRY.pack(idx, matrix.updated[idx].timestamp()))
+
+    missing = array('d', [float("nan")])
+    for idx in bases:
+        vector = array('d', matrix.vectors[idx])
+        if len(vector) < len(codes):
+            vector.extend(missing * (len(codes) - len(vector)))
+        parts.append(vector[:len(codes)].tobytes())
+    return b"".join(parts)
+
+
+def write_snapshot(path: str, matrix: RateMatrix, generation: int):
+    """
+    Write a snapshot next to path and rename it into place, so readers
+    only ever map a complete file.
+    """
+    data = encode_snapshot(matrix, generation)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".rates-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def load_snapshot(path: str) -> Tuple[RateMatrix, int]:
+    """
+    Map a snapshot read-only and return (matrix, generation). The matrix's
+    base vectors are views into the mapping; writes to the matrix copy a
+    vector first, as they always do, so the shared pages are never touched.
+    Raises OSError if the file is missing and ValueError if it is not a
+    snapshot.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < HEADER.size:
+            raise ValueError(f"{path} is not a rate snapshot")
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, generation, _, n_codes, n_bases = HEADER.unpack_from(mapped, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} rate snapshot")
+
+    offset = HEADER.size
+    codes = [
+        mapped[offset + i * CODE_SLOT:offset + (i + 1) * CODE_SLOT].rstrip(b"\0").decode("ascii")
+        for i in range(n_codes)
+    ]
+    offset = _align(offset + n_codes * CODE_SLOT)
+    bases = [BASE_ENTRY.unpack_from(mapped, offset + i * BASE_ENTRY.size) for i in range(n_bases)]
+    offset += n_bases * BASE_ENTRY.size
+    rates = memoryview(mapped)[offset:offset + n_bases * n_codes * 8].cast('d')
+
+    matrix = RateMatrix()
+    matrix.codes = codes
+    matrix.index = {code: i for i, code in enumerate(codes)}
+    for row, (idx, updated) in enumerate(bases):
+        matrix.updated[idx] = datetime.fromtimestamp(updated)
+        matrix.vectors[idx] = rates[row * n_codes:(row + 1) * n_codes]
+        matrix.pivots.append(idx)
+    matrix.rebuild_routes()
+    return matrix, generation
+
+
+class SnapshotReader:
+    """
+    Follows a snapshot file. poll() is cheap enough to call on every
+    lookup: it stats the file at most once per check_interval seconds and
+    maps it again only when it has been replaced.
+    """
+
+    def __init__(self, path: str, check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.generation = None
+        self.reloads = 0
+        self._identity = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def poll(self) -> Optional[RateMatrix]:
+        """Return a newly mapped matrix if the snapshot changed, else None."""
+        now = time.monotonic()
+        if now < self._next_check or not self._lock.acquire(blocking=False):
+            return None
+        try:
+            self._next_check = now + self.check_interval
+            try:
+                stat = os.stat(self.path)
+            except OSError:
+                return None
+            identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if identity == self._identity:
+                return None
+            try:
+                matrix, generation = load_snapshot(self.path)
+            except (OSError, ValueError):
+                return None
+            self._identity = identity
+            self.generation = generation
+            self.reloads += 1
+            return matrix
+        finally:
+            self._lock.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish a shared rate snapshot for API workers")
+    parser.add_argument("--path", required=True, help="Snapshot file (e.g. /dev/shm/currency_rates.snap)")
+    parser.add_argument("--db", default="currency_converter.db", help="Converter database")
+    parser.add_argument("--bases", nargs="+", default=["USD"], help="Base tables to keep fresh")
+    parser.add_argument("--interval", type=float, default=300.0, help="Seconds between refreshes")
+    parser.add_argument("--api-key", help="API key for exchange rate service")
+    args = parser.parse_args()
+
+    from currency_converter import CurrencyConverter
+
+    converter = CurrencyConverter(api_key=args.api_key, db_path=args.db,
+                                  rate_ttl=args.interval, publish_snapshot=args.path)
+    # Cached rates go out straight away so workers can start before the first fetch
+    converter.publish_rates()
+    try:
+        while True:
+            for base in args.bases:
+                converter.fetch_base_rates(base)
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        converter.close()
+
+
+if __name__ == "__main__":
+    main()
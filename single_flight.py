@@ -0,0 +1,93 @@
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Call:
+    """One in-flight call that other threads can wait on."""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into a single execution.
+
+    The first caller for a key runs the function; every caller that
+    arrives while it is still running waits for it and receives the same
+    result (or exception). do() serves threads and do_async() serves
+    coroutines on one event loop. executed counts real executions and
+    coalesced counts calls that were answered by someone else's.
+    """
+
+    def __init__(self):
+        self.executed = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._async_calls: Dict[Hashable, "asyncio.Task"] = {}
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args) -> Any:
+        """Run fn(*args) once for all threads asking for key at the same time."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args) -> Any:
+        """
+        Await fn(*args) once for all coroutines asking for key at the same
+        time. The call runs as its own task, so a caller that is cancelled
+        (a client disconnecting) stops waiting without cancelling it for
+        the others.
+        """
+        # Imported lazily; only the async server needs it
+        import asyncio
+
+        task = self._async_calls.get(key)
+        if task is not None:
+            with self._lock:
+                self.coalesced += 1
+        else:
+            task = self._async_calls[key] = asyncio.ensure_future(fn(*args))
+            task.add_done_callback(lambda done: self._async_done(key, done))
+            with self._lock:
+                self.executed += 1
+        return await asyncio.shield(task)
+
+    def _async_done(self, key: Hashable, task: "asyncio.Task"):
+        if self._async_calls.get(key) is task:
+            del self._async_calls[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every caller was cancelled
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        """Return execution counters; coalesced is the number of calls saved."""
+        return {"executed": self.executed, "coalesced": self.coalesced}
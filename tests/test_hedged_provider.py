@@ -0,0 +1,136 @@
+"""
+Hedging, failover and circuit breaking against local stub providers.
+
+Run with: python -m pytest tests
+"""
+import os
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from currency_converter import CurrencyConverter
+from hedged_provider import CLOSED, HALF_OPEN, OPEN, HedgedProvider, source_clients
+from rate_provider import RateProviderClient
+from stub_provider import StubProvider
+
+HEDGE_DELAY = 0.1
+
+
+@pytest.fixture
+def stubs():
+    primary, backup = StubProvider(), StubProvider()
+    with primary, backup:
+        yield primary, backup
+
+
+def make_provider(stubs, **kwargs):
+    primary, backup = stubs
+    # No client-level retries, so every request a test expects is one the stub sees
+    clients = source_clients(RateProviderClient, primary.base_url,
+                             backup_urls=[backup.base_url], retries=0)
+    kwargs.setdefault("initial_hedge_delay", HEDGE_DELAY)
+    return HedgedProvider(clients, **kwargs)
+
+
+def test_fast_primary_is_not_hedged(stubs):
+    primary, backup = stubs
+    provider = make_provider(stubs)
+    try:
+        table = provider.fetch("USD")
+    finally:
+        provider.close()
+    assert table.rates["EUR"] == 0.92
+    assert provider.hedged == 0
+    assert (primary.requests, backup.requests) == (1, 0)
+
+
+def test_slow_primary_is_hedged_after_the_delay(stubs):
+    primary, backup = stubs
+    primary.latency = 1.0
+    provider = make_provider(stubs)
+    try:
+        start = time.perf_counter()
+        table = provider.fetch("USD")
+        elapsed = time.perf_counter() - start
+    finally:
+        provider.close()
+    assert table.rates["EUR"] == 0.92
+    # Sent to the backup once the delay passed, and answered well before the primary
+    assert HEDGE_DELAY <= elapsed < primary.latency
+    assert provider.hedged == 1
+    assert backup.requests == 1
+    assert [source.wins for source in provider.sources] == [0, 1]
+
+
+def test_failed_primary_fails_over_to_backup(stubs):
+    primary, backup = stubs
+    primary.failure_rate = 1.0
+    provider = make_provider(stubs)
+    try:
+        start = time.perf_counter()
+        table = provider.fetch("USD")
+        elapsed = time.perf_counter() - start
+    finally:
+        provider.close()
+    assert table.rates["EUR"] == 0.92
+    # A 503 moves on at once, without waiting for the hedge delay
+    assert elapsed < HEDGE_DELAY
+    assert provider.failovers == 1
+    assert provider.hedged == 0
+    assert provider.sources[0].errors == 1
+
+
+def test_breaker_opens_then_allows_one_probe(stubs):
+    primary, backup = stubs
+    primary.failure_rate = 1.0
+    provider = make_provider(stubs, failure_threshold=3, reset_timeout=0.2)
+    breaker = provider.sources[0].breaker
+    try:
+        for _ in range(3):
+            provider.fetch("USD")
+        assert breaker.state == OPEN
+
+        # While open, fetches go straight to the backup
+        sent = primary.requests
+        provider.fetch("USD")
+        assert primary.requests == sent
+        assert provider.sources[0].skipped == 1
+
+        # After reset_timeout a single request may probe the source
+        time.sleep(0.25)
+        assert breaker.allow()
+        assert breaker.state == HALF_OPEN
+        assert not breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == OPEN
+
+        # A successful probe closes it again
+        time.sleep(0.25)
+        primary.failure_rate = 0.0
+        provider.fetch("USD")
+        assert primary.requests == sent + 1
+        assert breaker.state == CLOSED
+    finally:
+        provider.close()
+
+
+def test_not_found_reaches_negative_cache(stubs, tmp_path):
+    primary, backup = stubs
+    converter = CurrencyConverter(db_path=str(tmp_path / "rates.db"), base_url=primary.base_url,
+                                  backup_urls=[backup.base_url])
+    try:
+        assert converter.fetch_base_rates("XAU") is None
+        assert "XAU" in converter.unknown_codes
+        # A 404 means the source is up: its breaker stays closed
+        assert all(source.breaker.state == CLOSED for source in converter.provider.sources)
+
+        sent = primary.requests + backup.requests
+        assert converter.get_exchange_rate("XAU", "USD") is None
+        assert primary.requests + backup.requests == sent
+    finally:
+        converter.close()
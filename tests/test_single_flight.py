@@ -0,0 +1,75 @@
+"""
+Coalescing of concurrent calls in SingleFlight.
+
+Run with: python -m pytest tests
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from single_flight import SingleFlight
+
+
+def test_async_waiters_share_one_call():
+    flights = SingleFlight()
+    calls = []
+
+    async def fetch(base):
+        calls.append(base)
+        await asyncio.sleep(0.05)
+        return {"base": base}
+
+    async def main():
+        return await asyncio.gather(*(flights.do_async("USD", fetch, "USD") for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert results == [{"base": "USD"}] * 5
+    assert calls == ["USD"]
+    assert flights.stats() == {"executed": 1, "coalesced": 4}
+
+
+def test_cancelled_leader_does_not_fail_waiters():
+    flights = SingleFlight()
+    calls = []
+
+    async def fetch(base):
+        calls.append(base)
+        await asyncio.sleep(0.05)
+        return {"base": base}
+
+    async def main():
+        leader = asyncio.ensure_future(flights.do_async("USD", fetch, "USD"))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(flights.do_async("USD", fetch, "USD"))
+        await asyncio.sleep(0.01)
+        # The leader's client disconnects while the fetch is in flight
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await waiter
+
+    assert asyncio.run(main()) == {"base": "USD"}
+    assert calls == ["USD"]
+
+
+def test_async_error_reaches_every_waiter():
+    flights = SingleFlight()
+
+    async def fetch(base):
+        await asyncio.sleep(0.01)
+        raise LookupError(base)
+
+    async def main():
+        return await asyncio.gather(*(flights.do_async("XAU", fetch, "XAU") for _ in range(3)),
+                                    return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, LookupError) for result in results)
+    # The key is released, so the next call runs again
+    assert flights.stats()["executed"] == 1
+    asyncio.run(main())
+    assert flights.stats()["executed"] == 2